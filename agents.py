@@ -1,32 +1,60 @@
-from crewai import Agent
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import threading
+from contextlib import contextmanager
+# config also loads .env (if there is one) before anything reads the environment
+import config
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 MODEL = "gpt-4o-mini"
 
+# Optional factory(temperature) -> LLM object that replaces the real model for every agent built afterwards
+# (benchmarks/tests plug a local stand-in in here, see benchmarks/mock_llm.py).
+_llm_override = None
+
+# Makes every agent built from now on use factory(temperature) as its LLM (None restores the real model).
+def set_llm_override(factory):
+    global _llm_override
+    _llm_override = factory
+
+# Returns the model settings every agent is built with.
+# Normally that is just model + temperature; when token streaming is on (config.STREAM_TOKENS),
+# the agent gets an explicit LLM object with stream=True so the UI can show tokens as they arrive.
+# model replaces MODEL (used for the per-stage fallback model, see call_policy.py).
+def llm_settings(temperature: float, model: str = None) -> dict:
+    if _llm_override is not None:
+        return {"llm": _llm_override(temperature)}
+    model = model or MODEL
+    if config.STREAM_TOKENS:
+        from crewai import LLM
+        return {"llm": LLM(model=model, temperature=temperature, stream=True)}
+    return {"model": model, "temperature": temperature}
+
+# Builds a CrewAI Agent. crewai is imported on the first call, not when this module is imported:
+# it takes seconds to load, and the UI, the queue API and matching import this module without building agents.
+def _agent(**settings):
+    from crewai import Agent
+    return Agent(**settings)
+
 # This function return Agent which parse the resume.
-def build_parser_agent():
-    return Agent(
+def build_parser_agent(model: str = None):
+    return _agent(
         role="Resume Parsing Specialist", # a human-friendly label describing the agent’s job
         goal="Extract clean, structured text from a resume suitable for ATS optimization.", # the agent’s short, explicit objective. Agents use this to guide behavior
         backstory=(
             "You efficiently clean resume text by removing artifacts and normalizing formatting. "
             "Focus on speed and accuracy - preserve all important content while removing noise."
         ), # extra context describing HOW the agent should behave (style, priorities). Here it emphasizes speed, accuracy, and removing noise
-        model = MODEL,
-        temperature=0.0, # sets the randomness of the model’s outputs = 0.0 which means deterministic/focused answers (good for parsing where you want consistent output).
+        # model + temperature; temperature = 0.0 sets the randomness of the model’s outputs to deterministic/focused answers (good for parsing where you want consistent output).
+        **llm_settings(0.0, model),
         max_iter=1, # limits the number of internal iterations the agent will run. 1 means do the job once
         max_execution_time=120, # maximum time (in seconds) the agent is allowed to run before being stopped (120 seconds here).
     )
 
 # This function returns an agent that rewrites or constructs resumes optimized for Applicant Tracking Systems (ATS).
 # This agent receives parsed/cleaned text and rewrites it to maximize ATS score and match job descriptions
-def build_ats_writer_agent():
-    return Agent(
+def build_ats_writer_agent(model: str = None):
+    return _agent(
         role="ATS Optimization Writer",
         goal="Create a high-scoring ATS-optimized resume that matches job requirements perfectly.",
         backstory=(
@@ -34,42 +62,39 @@ def build_ats_writer_agent():
             "You strategically place keywords, use strong action verbs, and quantify all achievements. "
             "You work quickly and deliver results that pass ATS systems."
         ),
-        model=MODEL,
-        temperature=0.3, # slightly more creative
+        **llm_settings(0.3, model), # slightly more creative
         max_iter=1,
         max_execution_time=120
     )
 
 # This function returns an agent that scores resumes for ATS compatibility and gives suggestions.
 # Use this agent to check how well a resume will perform and to get concrete improvements.
-def build_evaluator_agent():
-    return Agent(
+def build_evaluator_agent(model: str = None):
+    return _agent(
         role="ATS Evaluator",
         goal="Provide accurate ATS scores and actionable improvement recommendations.",
         backstory=(
             "You are a precise ATS scoring expert who quickly identifies gaps and provides specific, "
             "actionable recommendations. You focus on keyword density, section structure, and measurable achievements."
         ),
-        model=MODEL,
-        temperature=0.0,
+        **llm_settings(0.0, model),
         max_iter=1,
         max_execution_time=120
         
     )
 
-def build_refiner_agent():
-    return Agent(
+def build_refiner_agent(model: str = None):
+    return _agent(
         role="Bullet Point Refiner",
         goal="Transform bullet points into high-impact, ATS-optimized statements with strong metrics.",
         backstory="You excel at creating powerful bullet points that combine action verbs, specific achievements, and quantified results. You work efficiently to maximize impact.",
-        model=MODEL,
-        temperature=0.2,
+        **llm_settings(0.2, model),
         max_iter=1,
         max_execution_time=120
     )
 
-def build_cover_letter_agent():
-    return Agent(
+def build_cover_letter_agent(model: str = None):
+    return _agent(
         role="Cover Letter Writer",
         goal=" Generate a professional, personalized cover letter based on the user's resume and job description.",
         backstory=(
@@ -77,22 +102,85 @@ def build_cover_letter_agent():
             "cover letters that highlight the candidate’s strengths, achievements, and alignment "
             "with the company’s needs."
         ),
-        model=MODEL,
-        temperature=0.5,
+        **llm_settings(0.5, model),
         max_iter=1,
         max_execution_time=120
     )
 
-def build_skill_gap_agent():
-    return Agent(
+def build_skill_gap_agent(model: str = None):
+    return _agent(
         role="Skill Gap Analyst",
         goal="Identify missing and weak skills by comparing the resume with the job description.",
         backstory=(
             "You are an expert in job market skill analysis. You compare job descriptions "
             "with resumes and produce clear insights on missing skills and improvement areas."
         ),
-        model=MODEL,
-        temperature=0.3,
+        **llm_settings(0.3, model),
         max_iter=1,
         max_execution_time=120
-    )
\ No newline at end of file
+    )
+
+# Small, deterministic agent that only fixes malformed JSON (one cheap call instead of re-running a stage)
+def build_json_repair_agent(model: str = None):
+    return _agent(
+        role="JSON Repairer",
+        goal="Turn malformed model output into valid JSON that matches a given schema.",
+        backstory="You fix broken JSON. You never add, invent or drop information; you only repair the syntax and shape.",
+        **llm_settings(0.0, model),
+        max_iter=1,
+        max_execution_time=60
+    )
+
+# Reads a job description once and turns it into a compact JobProfile (shared by all candidates)
+def build_jd_analyst_agent(model: str = None):
+    return _agent(
+        role="Job Description Analyst",
+        goal="Extract the skills, requirements and keywords of a job posting into a compact profile.",
+        backstory="You are a technical recruiter who reads job postings quickly and separates hard requirements from nice-to-haves.",
+        **llm_settings(0.0, model),
+        max_iter=1,
+        max_execution_time=60
+    )
+
+# Agent builders by role name (used by AgentPool)
+AGENT_BUILDERS = {
+    "parser": build_parser_agent,
+    "writer": build_ats_writer_agent,
+    "refiner": build_refiner_agent,
+    "evaluator": build_evaluator_agent,
+    "cover_letter": build_cover_letter_agent,
+    "skill_gap": build_skill_gap_agent,
+    "json_repair": build_json_repair_agent,
+    "jd_analyst": build_jd_analyst_agent,
+}
+
+'''
+Keeps built agents around so they are reused across pipeline runs instead of being built every time.
+An agent is never used by two threads at once: lease() hands out an idle agent (or builds a new one
+when all of them are busy) and puts it back when the block ends.
+So the pool grows to the highest number of parallel calls per role and then stays that size.
+lease(role, model) hands out an agent of that role running on another model (e.g. a fallback model);
+those are pooled separately.
+'''
+class AgentPool:
+    def __init__(self, builders: dict = None):
+        self.builders = dict(builders or AGENT_BUILDERS)
+        self._idle = {role: [] for role in self.builders}
+        self._lock = threading.Lock()
+        self.built = 0 # how many agents this pool has built so far
+
+    @contextmanager
+    def lease(self, role: str, model: str = None):
+        key = role if model is None else (role, model)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            agent = idle.pop() if idle else None
+        if agent is None:
+            agent = self.builders[role](model) if model else self.builders[role]()
+            with self._lock:
+                self.built += 1
+        try:
+            yield agent
+        finally:
+            with self._lock:
+                idle.append(agent)
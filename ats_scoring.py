@@ -0,0 +1,216 @@
+'''
+Local, deterministic ATS scoring engine.
+
+This scores a resume against a job description with the same rubric the evaluator agent uses
+(keywords, structure, metrics, verbs, format), but in pure Python:
+    - it reads the FULL resume and JD (no truncation)
+    - the same input always gives the same score
+    - it runs in milliseconds instead of an LLM round-trip
+
+score_resume() returns the same JSON shape the evaluator task asks for:
+    {"overall_score": 0-100, "breakdown": {...1-5 per area...}, "missing_keywords": [...], "quick_wins": [...]}
+'''
+import re
+from collections import Counter
+
+from text_processing import JD_BOILERPLATE, lemmatize, terms, tokenize
+
+# How much each rubric area counts toward overall_score (sums to 1.0)
+WEIGHTS = {
+    "keywords": 0.35,
+    "structure": 0.20,
+    "metrics": 0.20,
+    "verbs": 0.15,
+    "format": 0.10,
+}
+
+# How many JD keywords we check the resume against
+MAX_JD_KEYWORDS = 40
+MAX_MISSING_KEYWORDS = 15
+
+# Section headings an ATS expects, with the common ways people write them
+SECTION_PATTERNS = {
+    "summary": r"summary|profile|objective|about me|professional summary",
+    "experience": r"experience|work experience|employment|work history|professional experience",
+    "education": r"education|academic background|qualifications",
+    "skills": r"skills|technical skills|core competencies|technologies|tech stack",
+    "projects": r"projects|personal projects|key projects",
+    "certifications": r"certifications?|licenses|courses",
+}
+CORE_SECTIONS = ("experience", "education", "skills")
+
+# Strong action verbs that should start a bullet
+ACTION_VERBS = """
+accelerated achieved administered analyzed architected automated boosted built championed coached
+collaborated configured consolidated coordinated created cut debugged decreased defined delivered
+deployed designed developed devised directed drove eliminated enabled engineered enhanced established
+evaluated executed expanded facilitated forecasted founded generated grew guided headed identified
+implemented improved increased initiated innovated integrated introduced launched led maintained
+managed maximized mentored migrated minimized modernized monitored negotiated optimized orchestrated
+organized oversaw owned partnered performed pioneered planned presented prioritized produced
+programmed published reduced refactored reengineered resolved restructured revamped saved scaled
+secured shipped simplified spearheaded standardized streamlined strengthened supervised supported
+tested trained transformed troubleshot upgraded validated won wrote
+""".split()
+ACTION_VERB_LEMMAS = frozenset(lemmatize(v) for v in ACTION_VERBS)
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪●◦‣]|\d+[.)])\s+")
+_METRIC_RE = re.compile(r"\d|%|\$|€|£")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+
+
+# Turns a 0..1 fraction into the 1-5 rubric scale.
+def _to_rubric(fraction: float) -> int:
+    return 1 + int(round(4 * max(0.0, min(1.0, fraction))))
+
+'''
+Picks the JD keywords worth checking.
+Each term is weighted by how often the JD mentions it; job title terms get a boost.
+Returns a list of (lemma, surface form, weight), heaviest first.
+'''
+def extract_jd_keywords(job_title: str, job_description: str, limit: int = MAX_JD_KEYWORDS) -> list:
+    counts = Counter()
+    surface = {}
+    for token in tokenize(job_description):
+        lemma_list = terms(token, JD_BOILERPLATE)
+        if not lemma_list:
+            continue
+        lemma = lemma_list[0]
+        counts[lemma] += 1
+        surface.setdefault(lemma, token)
+    for token in tokenize(job_title):
+        lemma_list = terms(token, JD_BOILERPLATE)
+        if not lemma_list:
+            continue
+        counts[lemma_list[0]] += 2
+        surface.setdefault(lemma_list[0], token)
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+    return [(lemma, surface[lemma], weight) for lemma, weight in ranked]
+
+# Returns the set of sections whose heading appears on its own line.
+def detect_sections(resume_text: str) -> set:
+    found = set()
+    for line in resume_text.splitlines():
+        heading = line.strip().strip(":#*-_= ").lower()
+        if not heading or len(heading) > 40:
+            continue
+        for section, pattern in SECTION_PATTERNS.items():
+            if re.fullmatch(pattern, heading):
+                found.add(section)
+    return found
+
+# Returns the bullet lines of the resume (without the bullet marker).
+def extract_bullets(resume_text: str) -> list:
+    bullets = []
+    for line in resume_text.splitlines():
+        if _BULLET_RE.match(line):
+            text = _BULLET_RE.sub("", line).strip()
+            if text:
+                bullets.append(text)
+    return bullets
+
+
+def _score_keywords(resume_terms: set, jd_keywords: list):
+    if not jd_keywords:
+        return 1.0, []
+    total = sum(w for _, _, w in jd_keywords)
+    covered = sum(w for lemma, _, w in jd_keywords if lemma in resume_terms)
+    missing = [word for lemma, word, _ in jd_keywords if lemma not in resume_terms]
+    return covered / total, missing[:MAX_MISSING_KEYWORDS]
+
+def _score_structure(sections: set) -> float:
+    core = sum(1 for s in CORE_SECTIONS if s in sections) / len(CORE_SECTIONS)
+    extra = 1.0 if "summary" in sections else 0.0
+    return 0.8 * core + 0.2 * extra
+
+def _score_metrics(bullets: list):
+    if not bullets:
+        return 0.0, 0
+    quantified = sum(1 for b in bullets if _METRIC_RE.search(b))
+    # Around half of the bullets carrying a number is already a strong resume
+    return min(1.0, quantified / (0.5 * len(bullets))), quantified
+
+def _score_verbs(bullets: list):
+    if not bullets:
+        return 0.0, 0
+    strong = 0
+    for b in bullets:
+        words = tokenize(b)
+        if words and lemmatize(words[0]) in ACTION_VERB_LEMMAS:
+            strong += 1
+    return strong / len(bullets), strong
+
+'''
+Formatting checks (each failed check costs part of the score):
+    1) contact info (email or phone) present
+    2) sensible length (250-1200 words)
+    3) no table/column artifacts (pipes, tabs)
+    4) no very long lines (usually broken paragraphs from PDF extraction)
+    5) uses bullets at all
+'''
+def _score_format(resume_text: str, bullets: list):
+    issues = []
+    if not (_EMAIL_RE.search(resume_text) or _PHONE_RE.search(resume_text)):
+        issues.append("Add contact details (email and phone) at the top.")
+    words = len(resume_text.split())
+    if words < 250:
+        issues.append(f"Resume is short ({words} words); expand experience bullets toward 400-800 words.")
+    elif words > 1200:
+        issues.append(f"Resume is long ({words} words); trim to the most relevant 1-2 pages.")
+    if "|" in resume_text or "\t" in resume_text:
+        issues.append("Remove tables/columns (pipes or tabs); many ATS parsers scramble them.")
+    if any(len(line) > 220 for line in resume_text.splitlines()):
+        issues.append("Break very long paragraphs into short bullet points.")
+    if not bullets:
+        issues.append("Use '-' bullet points for experience and achievements.")
+    return 1.0 - len(issues) / 5.0, issues
+
+'''
+Scores a resume against a job description.
+Returns {"overall_score", "breakdown", "missing_keywords", "quick_wins"}.
+'''
+def score_resume(resume_text: str, job_title: str, job_description: str) -> dict:
+    resume_terms = set(terms(resume_text))
+    jd_keywords = extract_jd_keywords(job_title, job_description)
+    sections = detect_sections(resume_text)
+    bullets = extract_bullets(resume_text)
+
+    keyword_frac, missing = _score_keywords(resume_terms, jd_keywords)
+    structure_frac = _score_structure(sections)
+    metrics_frac, quantified = _score_metrics(bullets)
+    verbs_frac, strong = _score_verbs(bullets)
+    format_frac, format_issues = _score_format(resume_text, bullets)
+
+    fractions = {
+        "keywords": keyword_frac,
+        "structure": structure_frac,
+        "metrics": metrics_frac,
+        "verbs": verbs_frac,
+        "format": format_frac,
+    }
+    overall = round(100 * sum(WEIGHTS[k] * fractions[k] for k in WEIGHTS))
+
+    # Quick wins: one concrete fix per weak area, weakest (by lost points) first
+    wins = {}
+    if missing:
+        wins["keywords"] = "Work these JD keywords into your bullets: " + ", ".join(missing[:5]) + "."
+    missing_sections = [s for s in CORE_SECTIONS if s not in sections]
+    if missing_sections:
+        wins["structure"] = "Add clear section headings: " + ", ".join(s.title() for s in missing_sections) + "."
+    elif "summary" not in sections:
+        wins["structure"] = "Add a short Summary section targeted at the role."
+    if bullets and quantified < len(bullets) / 2:
+        wins["metrics"] = f"Only {quantified}/{len(bullets)} bullets have numbers; add %, $, counts or time saved."
+    if bullets and strong < len(bullets):
+        wins["verbs"] = f"{len(bullets) - strong}/{len(bullets)} bullets don't start with a strong action verb (e.g. Led, Built, Reduced)."
+    if format_issues:
+        wins["format"] = format_issues[0]
+    ordered = sorted(wins, key=lambda k: -WEIGHTS[k] * (1 - fractions[k]))
+
+    return {
+        "overall_score": overall,
+        "breakdown": {k: _to_rubric(fractions[k]) for k in WEIGHTS},
+        "missing_keywords": missing,
+        "quick_wins": [wins[k] for k in ordered],
+    }
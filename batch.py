@@ -0,0 +1,277 @@
+'''
+Batch mode: run many resumes against many job descriptions.
+
+Typical workloads:
+    1) one candidate's resume against 50 open job descriptions
+    2) 500 applicants against one job description
+
+Work is shared across the batch:
+    - resume files are extracted in worker processes with a timeout and memory cap per file
+    - every resume is extracted and parsed (parse_resume_task) only once
+    - every job description is preprocessed and analyzed into a JobProfile only once
+    - the remaining stages run for each (resume, JD) pair with bounded concurrency
+    - all LLM calls go through the process-wide scheduler (RPM/TPM limits) as "batch" priority calls
+    - each finished pair is written to the output JSONL file right away
+    - with --export-zip, the final resumes and cover letters are exported as DOCX/PDF into one ZIP file
+
+CLI usage:
+    python batch.py --resumes resumes/ --jds jds.jsonl --out results.jsonl --workers 4 --rpm 120 --tpm 150000
+
+--resumes: a directory of .pdf/.docx/.txt files, or a JSONL file with {"id", "text"} or {"id", "path"} per line
+--jds:     a directory of .txt/.md files (file name = job title), or a JSONL file with
+           {"id", "job_title", "job_description"} per line
+'''
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+from crew import PIPELINE_MODES, get_job_profile, parse_resume, run_pipeline
+from file_tools.ingestion import ingest
+from prompt_budget import drop_page_furniture
+from file_tools.exporter import FORMATS, export_zip
+from scheduler import set_default_identity, set_limits
+
+RESUME_EXTENSIONS = (".pdf", ".docx", ".txt")
+JD_EXTENSIONS = (".txt", ".md")
+
+
+# Reads a JSONL file and returns one dict per non-empty line.
+def _read_jsonl(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# Extracts many resume files at once (cache + worker processes, see file_tools/ingestion.py): {path: result}.
+def _extract_files(paths: list) -> dict:
+    return {paths[result["index"]]: result for result in ingest(paths)}
+
+'''
+Loads resumes from a directory or a JSONL file.
+Returns a list of dicts: {"id": ..., "text": raw resume text}, plus "error" for files that could not be read
+(timeout, memory limit, broken file); those get empty text and are reported in the output.
+Raises ValueError for a JSONL row that has neither "text" nor "path", and for ids used by more than one row.
+'''
+def load_resumes(path: str) -> list:
+    if os.path.isdir(path):
+        rows = [{"id": name, "path": os.path.join(path, name)}
+                for name in sorted(os.listdir(path)) if name.lower().endswith(RESUME_EXTENSIONS)]
+    else:
+        base_dir = os.path.dirname(os.path.abspath(path))
+        rows = []
+        for i, row in enumerate(_read_jsonl(path)):
+            if "text" not in row and not row.get("path"):
+                raise ValueError(f"{path}: resume {row.get('id', i)!r} (row {i + 1}) has neither \"text\" nor \"path\"")
+            rows.append(dict(row, id=str(row.get("id", i)), path=os.path.join(base_dir, row["path"]) if row.get("path") else None))
+        ids = [row["id"] for row in rows]
+        duplicates = sorted({resume_id for resume_id in ids if ids.count(resume_id) > 1})
+        if duplicates: # results are keyed by resume id: two resumes with one id would get each other's output
+            raise ValueError(f"{path}: duplicate resume ids {', '.join(map(repr, duplicates))}")
+
+    extracted = _extract_files([row["path"] for row in rows if "text" not in row])
+    resumes = []
+    for row in rows:
+        if "text" in row:
+            resumes.append({"id": row["id"], "text": row["text"]})
+            continue
+        result = extracted[row["path"]]
+        resume = {"id": row["id"], "text": drop_page_furniture(result["text"], result.get("page_offsets"))}
+        if result["error"]:
+            resume["error"] = result["error"]
+        resumes.append(resume)
+    return resumes
+
+'''
+Loads job descriptions from a directory or a JSONL file.
+Returns a list of dicts: {"id": ..., "job_title": ..., "job_description": ...}
+For a directory, the file name (without extension) is used as the job title.
+'''
+def load_job_descriptions(path: str) -> list:
+    jds = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.lower().endswith(JD_EXTENSIONS):
+                with open(os.path.join(path, name), "r", encoding="utf-8", errors="ignore") as f:
+                    title = os.path.splitext(name)[0].replace("_", " ").replace("-", " ")
+                    jds.append({"id": name, "job_title": title, "job_description": f.read()})
+        return jds
+
+    for i, row in enumerate(_read_jsonl(path)):
+        jds.append({
+            "id": str(row.get("id", i)),
+            "job_title": row["job_title"],
+            "job_description": row["job_description"],
+        })
+    return jds
+
+# Normalizes a job description once so every pair gets the same, compact text.
+def preprocess_job_description(job_description: str) -> str:
+    text = job_description.replace("\r\n", "\n")
+    text = re.sub(r"[ \t]+", " ", text) # collapse runs of spaces/tabs
+    text = re.sub(r"\n{3,}", "\n\n", text) # at most one blank line in a row
+    return text.strip()
+
+'''
+Runs every resume against every job description.
+    1) parse each resume once (in parallel)
+    2) preprocess each JD once
+    3) run the rest of the pipeline for every pair with at most max_workers pairs at a time
+    4) append one JSON line per finished pair to output_path (in completion order)
+calls_per_minute / tokens_per_minute set the LLM call limits of the whole batch (None keeps the configured ones).
+While the batch runs, every call of this process is scheduled as tenant / priority (see scheduler.py; "batch"
+gives way to interactive runs); the previous default identity is restored when it returns.
+mode picks the pipeline mode ("staged" or "fused", None = config.PIPELINE_MODE).
+Returns the number of pairs that failed.
+'''
+def run_batch(resumes: list, jds: list, output_path: str, max_workers: int = config.BATCH_MAX_WORKERS,
+              calls_per_minute: int = None, mode: str = None, tokens_per_minute: int = None,
+              tenant: str = "batch", priority: str = "batch") -> int:
+    if calls_per_minute is not None or tokens_per_minute is not None:
+        set_limits(calls_per_minute, tokens_per_minute)
+    previous_identity = set_default_identity(tenant, priority)
+    try:
+        out_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(out_dir, exist_ok=True)
+        write_lock = threading.Lock()
+        failures = 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool, open(output_path, "a", encoding="utf-8") as out:
+            # Appends one result line and flushes so progress is visible while the batch runs.
+            def emit(record: dict):
+                with write_lock:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+
+            # 1) Parse each resume once (files that could not be extracted, or have no text, are reported, not run)
+            for resume in resumes:
+                if resume.get("error"):
+                    failures += len(jds)
+                    emit({"resume_id": resume["id"], "jd_id": None, "error": f"extraction failed: {resume['error']}"})
+                elif not resume["text"].strip():
+                    failures += len(jds)
+                    emit({"resume_id": resume["id"], "jd_id": None, "error": "no text: the resume is empty or has no extractable text (e.g. a scanned PDF)"})
+            parse_futures = {pool.submit(parse_resume, r["text"]): r for r in resumes if r["text"].strip()}
+            cleaned = {}
+            for future in as_completed(parse_futures):
+                resume = parse_futures[future]
+                try:
+                    cleaned[resume["id"]] = future.result()
+                except Exception as e:
+                    failures += len(jds)
+                    emit({"resume_id": resume["id"], "jd_id": None, "error": f"parse failed: {e}"})
+
+            # 2) Preprocess and profile each JD once (a failed profile is retried inside the pipeline)
+            prepared = [dict(jd, job_description=preprocess_job_description(jd["job_description"])) for jd in jds]
+            if config.USE_JOB_PROFILE:
+                profile_futures = {pool.submit(get_job_profile, jd["job_title"], jd["job_description"]): jd for jd in prepared}
+                for future in as_completed(profile_futures):
+                    if future.exception() is None:
+                        profile_futures[future]["job_profile"] = future.result()
+
+            # 3) Run every (resume, JD) pair
+            def run_pair(resume, jd):
+                timings = {}
+                result = run_pipeline(
+                    raw_resume_text=resume["text"],
+                    job_title=jd["job_title"],
+                    job_description=jd["job_description"],
+                    timings=timings,
+                    cleaned_resume=cleaned[resume["id"]],
+                    mode=mode,
+                    job_profile=jd.get("job_profile"),
+                    label=resume["id"],
+                )
+                return result, timings
+
+            pair_futures = {}
+            for resume in resumes:
+                if resume["id"] not in cleaned:
+                    continue
+                for jd in prepared:
+                    pair_futures[pool.submit(run_pair, resume, jd)] = (resume["id"], jd)
+
+            # 4) Stream results as each pair finishes
+            for future in as_completed(pair_futures):
+                resume_id, jd = pair_futures[future]
+                record = {"resume_id": resume_id, "jd_id": jd["id"], "job_title": jd["job_title"]}
+                try:
+                    (cleaned_text, rewritten, final_resume, evaluation, cover_letter, skill_gap), timings = future.result()
+                    record.update({
+                        "cleaned": cleaned_text,
+                        "rewritten": rewritten,
+                        "final_resume": final_resume,
+                        "evaluation": evaluation,
+                        "cover_letter": cover_letter,
+                        "skill_gap": skill_gap,
+                        "timings": timings,
+                    })
+                except Exception as e:
+                    failures += 1
+                    record["error"] = str(e)
+                emit(record)
+
+        return failures
+    finally: # later calls of this process (e.g. an app that imported run_batch) are not batch calls
+        set_default_identity(*previous_identity)
+
+'''
+Exports the final resume and cover letter of every successful pair in a results JSONL file
+as DOCX/PDF files, all packed into one ZIP (<resume_id>__<jd_id>_resume.docx, ..._cover_letter.pdf).
+If a pair appears more than once (re-runs append), the last result wins. Returns the number of pairs exported.
+'''
+def export_results(results_path: str, zip_path: str, formats: tuple = FORMATS) -> int:
+    latest = {}
+    for record in _read_jsonl(results_path):
+        if not record.get("error") and record.get("jd_id") is not None:
+            latest[(record["resume_id"], record["jd_id"])] = record
+
+    documents = []
+    for (resume_id, jd_id), record in latest.items():
+        stem = re.sub(r"[^\w.-]+", "_", f"{os.path.splitext(resume_id)[0]}__{os.path.splitext(jd_id)[0]}")
+        documents.append({"name": f"{stem}_resume", "text": record["final_resume"], "kind": "resume"})
+        if record.get("cover_letter"):
+            documents.append({"name": f"{stem}_cover_letter", "text": record["cover_letter"], "kind": "letter"})
+
+    os.makedirs(os.path.dirname(os.path.abspath(zip_path)), exist_ok=True)
+    with open(zip_path, "wb") as f:
+        f.write(export_zip(documents, formats))
+    return len(latest)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ATS pipeline for many resumes x many job descriptions.")
+    parser.add_argument("--resumes", required=True, help="Directory of resume files or a JSONL file")
+    parser.add_argument("--jds", required=True, help="Directory of job description files or a JSONL file")
+    parser.add_argument("--out", required=True, help="Output JSONL file (results are appended)")
+    parser.add_argument("--workers", type=int, default=config.BATCH_MAX_WORKERS, help="Pairs processed at the same time")
+    parser.add_argument("--rpm", type=int, default=None, help="Global limit on LLM calls per minute")
+    parser.add_argument("--tpm", type=int, default=None, help="Global limit on LLM tokens per minute")
+    parser.add_argument("--tenant", default="batch", help="Tenant name of this batch for fair queuing (see scheduler.py)")
+    parser.add_argument("--priority", choices=("batch", "interactive"), default="batch", help="Scheduling priority of the calls")
+    parser.add_argument("--mode", choices=PIPELINE_MODES, default=None, help="Pipeline mode (default: ATS_PIPELINE_MODE)")
+    parser.add_argument("--export-zip", default=None, help="Also write the final resumes + cover letters as DOCX/PDF into this ZIP")
+    parser.add_argument("--export-formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    args = parser.parse_args(argv)
+
+    try:
+        resumes = load_resumes(args.resumes)
+    except ValueError as e:
+        parser.error(str(e))
+    jds = load_job_descriptions(args.jds)
+    print(f"Loaded {len(resumes)} resumes and {len(jds)} job descriptions ({len(resumes) * len(jds)} pairs)")
+
+    start = time.perf_counter()
+    failures = run_batch(resumes, jds, args.out, max_workers=args.workers, calls_per_minute=args.rpm, mode=args.mode,
+                         tokens_per_minute=args.tpm, tenant=args.tenant, priority=args.priority)
+    print(f"Done in {time.perf_counter() - start:.1f}s, {failures} failed. Results: {args.out}")
+    if args.export_zip:
+        exported = export_results(args.out, args.export_zip, tuple(args.export_formats))
+        print(f"Exported {exported} pairs to {args.export_zip}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+'''
+Benchmark: per-run overhead of building agents + crews, with and without reuse.
+
+No model is called; this only measures what a run pays before the first request goes out:
+    fresh -> every run builds all six agents (what run_pipeline used to do)
+    reuse -> agents are leased from a warm AgentPool (what ResumePipeline does now)
+Both variants still build one Crew per stage, exactly like run_single_task.
+
+Usage (from the repo root):
+    python benchmarks/bench_agent_reuse.py --runs 50
+'''
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crewai import Crew, Process
+
+from agents import AGENT_BUILDERS, AgentPool
+
+
+def _build_crews(agents: list):
+    for agent in agents:
+        Crew(agents=[agent], tasks=[], process=Process.sequential, verbose=False)
+
+def run_fresh() -> float:
+    start = time.perf_counter()
+    agents = [build() for build in AGENT_BUILDERS.values()]
+    _build_crews(agents)
+    return time.perf_counter() - start
+
+def run_reuse(pool: AgentPool) -> float:
+    start = time.perf_counter()
+    agents = []
+    for role in AGENT_BUILDERS:
+        with pool.lease(role) as agent:
+            agents.append(agent)
+    _build_crews(agents)
+    return time.perf_counter() - start
+
+def _report(name: str, samples: list):
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(0.95 * len(ms)))]
+    print(f"{name:<7} mean={statistics.mean(ms):8.2f} ms  p50={statistics.median(ms):8.2f} ms  p95={p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    pool = AgentPool()
+    run_reuse(pool) # warm the pool (first run builds the agents once)
+
+    fresh = [run_fresh() for _ in range(args.runs)]
+    reuse = [run_reuse(pool) for _ in range(args.runs)]
+    _report("fresh", fresh)
+    _report("reuse", reuse)
+    print(f"agents built by the pool: {pool.built} (for {args.runs + 1} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+'''
+Offline benchmark suite: file extraction, DOCX export, cold start and the full pipeline, with no network and no cost.
+
+The LLM behind every agent is replaced by benchmarks/mock_llm.MockLLM (fixed latency + canned answers),
+and the inputs come from the synthetic corpus in benchmarks/corpus.py, so runs are repeatable.
+Benchmarks:
+    extract_pdf / extract_docx / extract_txt  -> file_loader.detect_and_extract (no extraction cache)
+    ingest_pool                               -> file_tools.ingestion.IngestionPool (all files, worker processes)
+    txt_to_docx                               -> utils.txt_to_docx_bytes
+    export_docx / export_pdf                  -> file_tools.exporter render_docx / render_pdf (uncached)
+    skill_match / skill_match10k              -> skill_taxonomy.SkillMatcher.find (bundled taxonomy / + 10k synthetic skills)
+    prompt_compress / prompt_budget           -> prompt_budget.compress_text / prepare_prompt_text (evaluate budget)
+    store_save / store_page / store_page_mid  -> results_store.ResultsStore save / first page / page in the middle
+    store_search / store_recent / store_diff  -> full-text search (relevance / newest first) and diff of two runs
+    pipeline_c1 / _c10 / _c100                -> crew.run_pipeline with 1, 10 and 100 runs at the same time
+    import_crew / _batch / _job_queue         -> cold import of the module in a fresh interpreter (startup.import_profile)
+Each reports p50/p95/mean latency (ms), throughput (operations per second) and the peak RSS of the
+process so far (MB; it only goes up, so later benchmarks include the memory of earlier ones).
+The stage cache, the rate limit and the results store are turned off so every run really goes through the pipeline.
+
+Usage (from the repo root):
+    python benchmarks/bench_suite.py --save benchmarks/baselines/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baselines/baseline.json
+    python benchmarks/bench_suite.py --only extract docx --rounds 20
+'''
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmarks must not read or fill the real caches, and must not be slowed down by configured LLM call
+# limits: with no RPM, TPM or concurrency limit there is no scheduler at all (scheduler.set_limits)
+os.environ["ATS_CACHE_ENABLED"] = "0"
+os.environ["ATS_LLM_CALLS_PER_MINUTE"] = "0"
+os.environ["ATS_LLM_TOKENS_PER_MINUTE"] = "0"
+os.environ["ATS_LLM_MAX_CONCURRENT_CALLS"] = "0"
+os.environ["ATS_EXTRACT_CACHE_DIR"] = ""
+os.environ["ATS_RESULTS_STORE"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import build_corpus
+from file_tools.file_loader import detect_and_extract
+from utils import txt_to_docx_bytes
+
+BENCHMARKS = ("extract", "docx", "skills", "prompt", "store", "startup", "pipeline")
+# Modules whose cold import time the startup benchmark tracks (what the app, batch runs and queue workers load first)
+STARTUP_MODULES = ("crew", "batch", "job_queue")
+
+
+# Highest resident memory of this process so far, in MB (None where the resource module is missing).
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1) # bytes on macOS, KB on Linux
+
+def _percentile(sorted_ms: list, q: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+def summarize(name: str, latencies: list, wall_seconds: float) -> dict:
+    ms = sorted(s * 1000 for s in latencies)
+    return {
+        "name": name,
+        "ops": len(ms),
+        "p50_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(_percentile(ms, 0.95), 3),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "throughput_per_s": round(len(ms) / wall_seconds, 2) if wall_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+'''
+Calls fn(item) for every item with at most concurrency calls at the same time.
+Returns (latency of every call in seconds, wall time of the whole batch).
+'''
+def run_timed(fn, items: list, concurrency: int = 1) -> tuple:
+    def timed(item):
+        start = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        latencies = [timed(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed, items))
+    return latencies, time.perf_counter() - start
+
+
+def bench_extract(resumes: list, rounds: int) -> list:
+    results = []
+    for ext in (".pdf", ".docx", ".txt"):
+        files = [r for r in resumes if r["id"].endswith(ext)] * rounds
+        latencies, wall = run_timed(lambda r: detect_and_extract(r["id"], r["bytes"]), files)
+        results.append(summarize(f"extract_{ext[1:]}", latencies, wall))
+
+    # Same files through the worker pool (per-file latency as measured in the worker; wall includes startup)
+    from file_tools.ingestion import IngestionPool
+    start = time.perf_counter()
+    with IngestionPool() as pool:
+        latencies = [r["seconds"] for r in pool.extract([(r["id"], r["bytes"]) for r in resumes] * rounds)]
+    results.append(summarize("ingest_pool", latencies, time.perf_counter() - start))
+    return results
+
+def bench_docx(resumes: list, rounds: int) -> list:
+    from file_tools.exporter import render_docx, render_pdf
+    results = []
+    for name, fn in (("txt_to_docx", txt_to_docx_bytes), ("export_docx", render_docx), ("export_pdf", render_pdf)):
+        latencies, wall = run_timed(lambda r: fn(r["text"]), resumes * rounds)
+        results.append(summarize(name, latencies, wall))
+    return results
+
+# Skill matching per resume, with the bundled taxonomy and with 10k extra synthetic skills (2 aliases each).
+def bench_skills(resumes: list, rounds: int) -> list:
+    from skill_taxonomy import SkillMatcher, load_taxonomy
+    taxonomy = load_taxonomy()
+    large = dict(taxonomy, **{f"Skill {i}": [f"skillterm{i}", f"synthetic tool {i}"] for i in range(10_000)})
+    results = []
+    for name, matcher in (("skill_match", SkillMatcher(taxonomy)), ("skill_match10k", SkillMatcher(large))):
+        latencies, wall = run_timed(lambda r: matcher.find(r["text"]), resumes * rounds)
+        results.append(summarize(name, latencies, wall))
+    return results
+
+# Prompt text preparation per resume: compression alone, and compression + token counting + the budget cut.
+def bench_prompt(resumes: list, rounds: int) -> list:
+    from prompt_budget import compress_text, prepare_prompt_text
+    results = []
+    for name, fn in (("prompt_compress", compress_text), ("prompt_budget", lambda t: prepare_prompt_text(t, "evaluate"))):
+        latencies, wall = run_timed(lambda r: fn(r["text"]), resumes * rounds)
+        results.append(summarize(name, latencies, wall))
+    return results
+
+'''
+Results store with store_runs runs (corpus resumes x JDs with varied outputs) in a temporary SQLite file:
+the save of every run, then rounds x 20 queries of each kind against the full store.
+'''
+def bench_store(resumes: list, jds: list, rounds: int, store_runs: int) -> list:
+    import tempfile
+    from results_store import ResultsStore
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultsStore(os.path.join(tmp, "results.sqlite3"))
+
+        def save(i):
+            resume, jd = resumes[i % len(resumes)], jds[i % len(jds)]
+            text = resume["text"] + f"\nRun {i}"
+            store.save(resume["text"], jd["job_title"], jd["job_description"],
+                       (text, text, text, f'{{"overall_score": {i % 100}}}', f"Dear hiring team, run {i}", "{}"))
+
+        latencies, wall = run_timed(save, list(range(store_runs)))
+        results.append(summarize("store_save", latencies, wall))
+        middle = str(store_runs // 2)
+        words = resumes[0]["text"].split()
+        queries = (("store_page", lambda _: store.list_runs()),
+                   ("store_page_mid", lambda _: store.list_runs(cursor=middle)),
+                   ("store_search", lambda i: store.search(words[i % len(words)])),
+                   ("store_recent", lambda i: store.search(words[i % len(words)], order="recent")),
+                   ("store_diff", lambda i: store.diff(1 + i % store_runs, store_runs - i % store_runs)))
+        for name, fn in queries:
+            latencies, wall = run_timed(fn, list(range(rounds * 20)))
+            results.append(summarize(name, latencies, wall))
+    return results
+
+# Cold start: wall time of importing each module in a new interpreter (python -X importtime), rounds times.
+def bench_startup(rounds: int) -> list:
+    from startup import import_profile
+    results = []
+    for module in STARTUP_MODULES:
+        latencies = [import_profile(module)["total_seconds"] for _ in range(rounds)]
+        results.append(summarize(f"import_{module}", latencies, sum(latencies)))
+    return results
+
+'''
+Runs the full pipeline on the mock LLM at each concurrency level.
+Every level runs max(2 x concurrency, min_runs) pipelines (resume/JD pairs taken round-robin from the corpus).
+'''
+def bench_pipeline(resumes: list, jds: list, levels: list, latency: float, jitter: float, min_runs: int, mode: str) -> list:
+    from mock_llm import install_mock_llm, uninstall_mock_llm
+    mocks = install_mock_llm(latency=latency, jitter=jitter)
+    try:
+        from crew import ResumePipeline
+        pipeline = ResumePipeline() # its own agent pool, built on the mock LLM
+
+        def run(pair):
+            resume, jd = pair
+            pipeline.run(resume["text"], jd["job_title"], jd["job_description"], mode=mode)
+
+        run((resumes[0], jds[0])) # warm-up: builds the agents and imports everything once
+        results = []
+        for level in levels:
+            n = max(2 * level, min_runs)
+            pairs = [(resumes[i % len(resumes)], jds[i % len(jds)]) for i in range(n)]
+            calls_before = sum(m.calls for m in mocks)
+            latencies, wall = run_timed(run, pairs, concurrency=level)
+            result = summarize(f"pipeline_c{level}", latencies, wall)
+            result["llm_calls_per_run"] = round((sum(m.calls for m in mocks) - calls_before) / n, 2)
+            results.append(result)
+        return results
+    finally:
+        uninstall_mock_llm()
+
+
+# Prints the change of every benchmark against a saved baseline (negative latency change = faster).
+def compare(results: list, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\nChange vs {baseline_path}:")
+    for r in results:
+        old = baseline.get(r["name"])
+        if old is None:
+            print(f"  {r['name']:<14} (not in baseline)")
+            continue
+        changes = []
+        for field in ("p50_ms", "p95_ms", "throughput_per_s"):
+            if old.get(field) and r.get(field) is not None:
+                changes.append(f"{field}={100 * (r[field] - old[field]) / old[field]:+.1f}%")
+        print(f"  {r['name']:<14} " + "  ".join(changes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks with a mock LLM backend.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--resumes", type=int, default=30, help="Synthetic resumes in the corpus")
+    parser.add_argument("--jds", type=int, default=5, help="Synthetic job descriptions in the corpus")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the corpus for extract/docx (imports for startup)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--store-runs", type=int, default=20000, help="Runs saved in the results store benchmark")
+    parser.add_argument("--min-runs", type=int, default=10, help="Minimum pipeline runs per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock LLM seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Mock LLM +- random latency (seconds)")
+    parser.add_argument("--mode", default=None, help="Pipeline mode (staged/fused, default: ATS_PIPELINE_MODE)")
+    parser.add_argument("--save", help="Write the results to this JSON file (a baseline)")
+    parser.add_argument("--compare", help="Compare against a baseline JSON file")
+    args = parser.parse_args(argv)
+
+    resumes, jds = build_corpus(args.resumes, args.jds)
+    results = []
+    if "extract" in args.only:
+        results += bench_extract(resumes, args.rounds)
+    if "docx" in args.only:
+        results += bench_docx(resumes, args.rounds)
+    if "skills" in args.only:
+        results += bench_skills(resumes, args.rounds)
+    if "prompt" in args.only:
+        results += bench_prompt(resumes, args.rounds)
+    if "store" in args.only:
+        results += bench_store(resumes, jds, args.rounds, args.store_runs)
+    if "startup" in args.only:
+        results += bench_startup(args.rounds)
+    if "pipeline" in args.only:
+        results += bench_pipeline(resumes, jds, args.concurrency, args.latency, args.jitter, args.min_runs, args.mode)
+
+    print(f"{'benchmark':<14} {'ops':>6} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10} {'peak RSS MB':>12}")
+    for r in results:
+        print(f"{r['name']:<14} {r['ops']:>6} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} "
+              f"{r['throughput_per_s'] or 0:>10.2f} {r['peak_rss_mb'] or 0:>12.1f}")
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "settings": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+'''
+Synthetic resumes and job descriptions for offline benchmarks.
+
+Everything is generated from a seed, so the same corpus comes out on every machine:
+    - resumes as .txt, .docx (python-docx) and .pdf (a small hand-written PDF, no extra dependency)
+    - job descriptions as .txt (file name = job title, like batch.py expects)
+Resume length is controlled by the number of jobs/bullets, so short and long resumes can be mixed.
+
+Usage (from the repo root):
+    python benchmarks/corpus.py benchmarks/corpus --resumes 30 --jds 5
+'''
+import argparse
+import io
+import os
+import random
+
+from docx import Document
+
+FIRST_NAMES = ["Jane", "John", "Priya", "Wei", "Carlos", "Amara", "Lena", "Omar", "Sofia", "Kenji"]
+LAST_NAMES = ["Doe", "Smith", "Patel", "Chen", "Garcia", "Okafor", "Novak", "Haddad", "Rossi", "Tanaka"]
+TITLES = ["Data Engineer", "Machine Learning Engineer", "Backend Developer", "Data Analyst", "DevOps Engineer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Hooli", "Stark Industries", "Wayne Analytics"]
+SKILLS = ["Python", "SQL", "Spark", "Airflow", "Kubernetes", "Docker", "AWS", "GCP", "TensorFlow", "PyTorch",
+          "Pandas", "Kafka", "Terraform", "PostgreSQL", "React", "Go", "Java", "Tableau", "dbt", "Snowflake"]
+VERBS = ["Built", "Designed", "Led", "Automated", "Optimized", "Migrated", "Launched", "Reduced", "Scaled", "Improved"]
+OBJECTS = ["data pipelines", "REST APIs", "ML models", "dashboards", "CI/CD workflows", "ETL jobs",
+           "feature stores", "microservices", "monitoring", "batch jobs"]
+
+
+def make_resume_text(seed: int, jobs: int = 3, bullets: int = 4) -> str:
+    rnd = random.Random(seed)
+    name = f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+    lines = [
+        name.upper(),
+        f"{name.split()[0].lower()}@example.com | +1 555 {rnd.randint(100, 999)} {rnd.randint(1000, 9999)} | Springfield, USA",
+        "",
+        "SUMMARY",
+        f"{rnd.choice(TITLES)} with {rnd.randint(2, 12)} years of experience in {', '.join(rnd.sample(SKILLS, 3))}.",
+        "",
+        "EXPERIENCE",
+    ]
+    for job in range(jobs):
+        lines.append(f"{rnd.choice(TITLES)} - {rnd.choice(COMPANIES)} ({2023 - 2 * job - 2} - {2023 - 2 * job})")
+        for _ in range(bullets):
+            lines.append(f"- {rnd.choice(VERBS)} {rnd.choice(OBJECTS)} with {rnd.choice(SKILLS)}, "
+                         f"cutting costs by {rnd.randint(5, 60)}% for {rnd.randint(2, 40)} teams")
+        lines.append("")
+    lines += [
+        "SKILLS",
+        ", ".join(rnd.sample(SKILLS, 8)),
+        "",
+        "EDUCATION",
+        f"B.Sc. Computer Science, State University ({rnd.randint(2005, 2018)})",
+    ]
+    return "\n".join(lines)
+
+def make_job_description(seed: int) -> tuple:
+    rnd = random.Random(seed)
+    title = rnd.choice(TITLES)
+    required, preferred = rnd.sample(SKILLS, 5), rnd.sample(SKILLS, 3)
+    text = "\n".join([
+        f"We are hiring a {title} to join {rnd.choice(COMPANIES)}.",
+        "",
+        "Responsibilities:",
+        *(f"- {rnd.choice(VERBS)} {rnd.choice(OBJECTS)} at scale" for _ in range(5)),
+        "",
+        "Requirements:",
+        *(f"- {rnd.randint(2, 6)}+ years with {skill}" for skill in required),
+        "",
+        f"Nice to have: {', '.join(preferred)}.",
+    ])
+    return title, text
+
+
+def make_docx_bytes(text: str) -> bytes:
+    doc = Document()
+    for line in text.splitlines():
+        doc.add_paragraph(line)
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+'''
+Writes text as a simple PDF (Helvetica 10pt, lines_per_page lines per page).
+The file is built by hand (objects + xref table), so pypdf can read it and no PDF library is needed.
+'''
+def make_pdf_bytes(text: str, lines_per_page: int = 60) -> bytes:
+    lines = text.splitlines() or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+    first_page = 4 # objects 1-3: catalog, page tree, font; then (page, content) per page
+    page_ids = [first_page + 2 * i for i in range(len(pages))]
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for page_id, page_lines in zip(page_ids, pages):
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td\n" + "".join(f"({_pdf_escape(l)}) Tj T*\n" for l in page_lines) + "ET"
+        stream = stream.encode("latin-1", errors="replace")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >>"
+                       f" /Contents {page_id + 1} 0 R >>".encode())
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    out.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+# Renders text in one of the supported formats: returns the file bytes.
+def render(text: str, ext: str) -> bytes:
+    if ext == ".pdf":
+        return make_pdf_bytes(text)
+    if ext == ".docx":
+        return make_docx_bytes(text)
+    return text.encode("utf-8")
+
+
+'''
+Generates the corpus in memory.
+Returns (resumes, jds):
+    resumes: list of {"id": file name, "text": plain text, "bytes": file bytes}, cycling through .pdf/.docx/.txt;
+             every fifth resume is long (8 jobs x 8 bullets) so chunking is exercised too
+    jds:     list of {"id", "job_title", "job_description"}
+'''
+def build_corpus(n_resumes: int = 30, n_jds: int = 5, seed: int = 0) -> tuple:
+    resumes = []
+    for i in range(n_resumes):
+        ext = (".pdf", ".docx", ".txt")[i % 3]
+        long_resume = i % 5 == 4
+        text = make_resume_text(seed + i, jobs=8 if long_resume else 3, bullets=8 if long_resume else 4)
+        resumes.append({"id": f"resume_{i:03d}{ext}", "text": text, "bytes": render(text, ext)})
+    jds = []
+    for i in range(n_jds):
+        title, text = make_job_description(seed + 1000 + i)
+        jds.append({"id": f"jd_{i:03d}.txt", "job_title": title, "job_description": text})
+    return resumes, jds
+
+# Writes the corpus to directory/resumes/ and directory/jds/ (the layout batch.py reads).
+def write_corpus(directory: str, n_resumes: int = 30, n_jds: int = 5, seed: int = 0):
+    resumes, jds = build_corpus(n_resumes, n_jds, seed)
+    os.makedirs(os.path.join(directory, "resumes"), exist_ok=True)
+    os.makedirs(os.path.join(directory, "jds"), exist_ok=True)
+    for resume in resumes:
+        with open(os.path.join(directory, "resumes", resume["id"]), "wb") as f:
+            f.write(resume["bytes"])
+    for i, jd in enumerate(jds):
+        name = f"{jd['job_title'].replace(' ', '_')}_{i}.txt"
+        with open(os.path.join(directory, "jds", name), "w", encoding="utf-8") as f:
+            f.write(jd["job_description"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic resume/JD corpus.")
+    parser.add_argument("directory")
+    parser.add_argument("--resumes", type=int, default=30)
+    parser.add_argument("--jds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_corpus(args.directory, args.resumes, args.jds, args.seed)
+    print(f"Wrote {args.resumes} resumes and {args.jds} job descriptions to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+'''
+A local stand-in for the OpenAI model, for offline benchmarks (no network, no cost).
+
+MockLLM answers every call after a configurable delay with a canned response picked from the prompt:
+    - structured stages (fused, evaluation, skill gap, job profile, JSON repair) get valid JSON for their schema
+    - the cover letter stage gets a short letter
+    - parse / rewrite / refine get a resume-shaped text of about response_chars characters
+It can also misbehave on purpose, to exercise the call policy (call_policy.py): a share of calls
+fails with a 429 (error_rate) or takes slow_latency seconds instead of latency (slow_rate).
+install_mock_llm() plugs it in through agents.set_llm_override, so every agent built afterwards
+(including the ones in AgentPool) uses it; the rest of the pipeline runs unchanged.
+'''
+import json
+import random
+import threading
+import time
+
+try:
+    from crewai import BaseLLM # custom LLM base class (newer CrewAI versions)
+except ImportError:
+    from crewai import LLM as BaseLLM
+
+from agents import set_llm_override
+
+MOCK_MODEL = "mock/gpt-4o-mini"
+
+
+# What a rate-limited API call raises (same status_code attribute as the OpenAI / LiteLLM errors)
+class MockRateLimitError(Exception):
+    status_code = 429
+
+RESUME_LINE = "- Built data pipelines in Python and SQL that cut reporting time by 40% for 12 teams"
+
+# (substring of the prompt, response) pairs; the first match wins
+CANNED_RESPONSES = [
+    ("analyze this job posting", json.dumps({
+        "job_title": "Data Engineer",
+        "seniority": "senior",
+        "summary": "Builds batch and streaming data pipelines.",
+        "required_skills": ["python", "sql", "airflow"],
+        "preferred_skills": ["kubernetes"],
+        "must_haves": ["5+ years with Python"],
+        "keywords": [{"term": "python", "weight": 5}, {"term": "airflow", "weight": 3}],
+    })),
+    ("cleaned_resume", json.dumps({
+        "cleaned_resume": "JANE DOE\nEXPERIENCE\n" + RESUME_LINE,
+        "rewritten_resume": "JANE DOE\nEXPERIENCE\n" + RESUME_LINE,
+        "final_resume": "JANE DOE\nEXPERIENCE\n" + RESUME_LINE,
+    })),
+    ("matched_skills", json.dumps({
+        "matched_skills": ["python", "sql"],
+        "missing_skills": ["kubernetes", "airflow"],
+        "weak_skills": ["spark"],
+        "priority_gaps": [{"skill": "airflow", "reason": "Named as a must-have in the job description."}],
+        "recommendations": ["Add an Airflow project with measurable results."],
+    })),
+    ("return json with one field: recommendations", json.dumps({
+        "recommendations": ["Add an Airflow project with measurable results.", "Show Kubernetes in an experience bullet."],
+    })),
+    ("overall_score", json.dumps({
+        "overall_score": 72,
+        "breakdown": {"keywords": 3, "structure": 4, "metrics": 4, "verbs": 4, "format": 4},
+        "missing_keywords": ["airflow", "kubernetes"],
+        "quick_wins": ["Mention Airflow in the summary."],
+    })),
+    ("cover letter", "Dear Hiring Manager,\n\nI am excited to apply for this role. " * 3 + "\n\nSincerely,\nJane Doe"),
+]
+
+
+'''
+A fake model with fixed latency and canned answers.
+    latency:        seconds per call
+    jitter:         +- random spread added to latency (seconds)
+    responses:      list of (prompt substring, response) pairs, checked before CANNED_RESPONSES
+    response_chars: length of the default (resume-shaped) response
+    error_rate:     share of calls that fail with MockRateLimitError (429)
+    slow_rate:      share of calls that take slow_latency seconds (tail latency)
+'''
+class MockLLM(BaseLLM):
+    def __init__(self, model: str = MOCK_MODEL, temperature: float = 0.0, latency: float = 0.5,
+                 jitter: float = 0.0, responses: list = None, response_chars: int = 1200, seed: int = None,
+                 error_rate: float = 0.0, slow_rate: float = 0.0, slow_latency: float = 5.0):
+        super().__init__(model=model, temperature=temperature)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.responses = list(responses or []) + CANNED_RESPONSES
+        self.default_response = "JANE DOE\nEXPERIENCE\n" + "\n".join(
+            [RESUME_LINE] * max(1, response_chars // (len(RESUME_LINE) + 1)))
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            if self._random.random() < self.slow_rate:
+                delay = self.slow_latency
+        if fail:
+            time.sleep(min(delay, 0.05))
+            raise MockRateLimitError("Rate limit reached (mock)")
+        time.sleep(delay)
+        prompt = messages if isinstance(messages, str) else "\n".join(str(m.get("content", "")) for m in messages)
+        lowered = prompt.lower()
+        for needle, response in self.responses:
+            if needle.lower() in lowered:
+                return response
+        return self.default_response
+
+    # Structured outputs must be parsed from the text answer (there is no real tool calling).
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128_000
+
+
+'''
+Makes every agent built from now on use a MockLLM (one per agent, same settings).
+failures are passed on to MockLLM (error_rate, slow_rate, slow_latency).
+Returns the list of created mocks (to count calls afterwards). Call uninstall_mock_llm() to go back.
+'''
+def install_mock_llm(latency: float = 0.5, jitter: float = 0.0, responses: list = None, response_chars: int = 1200,
+                     **failures) -> list:
+    created = []
+
+    def factory(temperature):
+        llm = MockLLM(temperature=temperature, latency=latency, jitter=jitter,
+                      responses=responses, response_chars=response_chars, **failures)
+        created.append(llm)
+        return llm
+
+    set_llm_override(factory)
+    return created
+
+def uninstall_mock_llm():
+    set_llm_override(None)
@@ -0,0 +1,157 @@
+'''
+Simulation of the LLM call scheduler (scheduler.py) against a fake rate-limited backend, on a simulated clock.
+
+Nothing sleeps and nothing calls a model: time only moves when the simulation advances the clock, so a
+10-minute workload runs in well under a second and gives the same numbers on every run (fixed seed).
+    - FakeBackend: a provider with RPM and TPM limits (token buckets that hold one minute of quota, like
+      OpenAI's); a call over the limit gets a 429 and is retried after retry_seconds
+    - workload: one batch tenant submits batch_calls calls at t=0; users interactive tenants each make a
+      call every user_interval seconds (one pipeline stage after another) for duration seconds
+Reported per priority class: calls, 429s, queue wait p50/p95/max, plus the time the whole batch took.
+--no-scheduler sends every call right away (what happens without the scheduler) for comparison.
+
+Usage (from the repo root):
+    python benchmarks/sim_scheduler.py
+    python benchmarks/sim_scheduler.py --rpm 500 --tpm 200000 --batch-calls 2000 --users 10
+    python benchmarks/sim_scheduler.py --no-scheduler
+'''
+import argparse
+import heapq
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import LLMScheduler, SimulatedClock, TokenBucket
+
+
+class FakeBackend:
+    def __init__(self, rpm: float, tpm: float, clock, latency: float = 3.0, jitter: float = 1.0, seed: int = 0):
+        self.clock = clock
+        self.requests = TokenBucket(rpm, rpm, clock.now())
+        self.tokens = TokenBucket(tpm, tpm, clock.now())
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.rejected = 0
+
+    # Starts a call: returns its duration in seconds, or None for a 429 (over the RPM or TPM limit).
+    def call(self, tokens: int):
+        now = self.clock.now()
+        if self.requests.time_until(1, now) > 0 or self.tokens.time_until(tokens, now) > 0:
+            self.rejected += 1
+            return None
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        return max(0.1, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+# Calls as (arrival time, tenant, priority, estimated tokens), sorted by arrival.
+def build_workload(batch_calls: int, users: int, user_interval: float, duration: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    calls = [(0.0, "batch", "batch", rng.randint(800, 2500)) for _ in range(batch_calls)]
+    for user in range(users):
+        t = rng.uniform(0, user_interval)
+        while t < duration:
+            calls.append((t, f"user{user}", "interactive", rng.randint(800, 2500)))
+            t += user_interval
+    return sorted(calls, key=lambda c: c[0])
+
+'''
+Runs the workload and returns {priority: {"calls", "rejected", "wait_p50", "wait_p95", "wait_max", "done_at"}}.
+Waits include the time lost to 429 retries. With use_scheduler=False calls go straight to the backend.
+'''
+def simulate(workload: list, rpm: float, tpm: float, use_scheduler: bool = True, retry_seconds: float = 2.0,
+             seed: int = 0) -> dict:
+    clock = SimulatedClock()
+    backend = FakeBackend(rpm, tpm, clock, seed=seed)
+    scheduler = LLMScheduler(rpm, tpm, clock=clock) if use_scheduler else None
+    arrivals = list(reversed(workload)) # pop() from the end = earliest first
+    events = [] # (time, seq, kind, data): "end" of a running call, "retry" after a 429
+    seq = 0
+    results = {}
+
+    def start(call, ticket, arrived):
+        nonlocal seq
+        tenant, priority, tokens = call
+        row = results.setdefault(priority, {"calls": 0, "rejected": 0, "waits": [], "done_at": 0.0})
+        duration = backend.call(tokens)
+        seq += 1
+        if duration is None:
+            row["rejected"] += 1
+            if ticket is not None:
+                scheduler.release(ticket)
+            heapq.heappush(events, (clock.now() + retry_seconds, seq, "retry", (call, arrived)))
+            return
+        row["calls"] += 1
+        row["waits"].append(clock.now() - arrived)
+        heapq.heappush(events, (clock.now() + duration, seq, "end", (ticket, tokens, priority)))
+
+    tickets = {} # ticket -> (call, arrival time)
+
+    def submit(call, arrived):
+        if scheduler is None:
+            start(call, None, arrived)
+        else:
+            tickets[scheduler.submit(call[2], call[0], call[1])] = (call, arrived)
+
+    while arrivals or events or (scheduler is not None and tickets):
+        now = clock.now()
+        while events and events[0][0] <= now:
+            _, _, kind, data = heapq.heappop(events)
+            if kind == "end":
+                ticket, tokens, priority = data
+                results[priority]["done_at"] = now
+                if ticket is not None:
+                    scheduler.release(ticket, tokens)
+            else:
+                submit(*data)
+        while arrivals and arrivals[-1][0] <= now:
+            arrived, tenant, priority, tokens = arrivals.pop()
+            submit((tenant, priority, tokens), arrived)
+        if scheduler is not None:
+            for ticket in scheduler.dispatch():
+                call, arrived = tickets.pop(ticket)
+                start(call, ticket, arrived)
+
+        candidates = [t for t in (arrivals[-1][0] if arrivals else None, events[0][0] if events else None,
+                                  scheduler.next_dispatch_time() if scheduler is not None else None) if t is not None]
+        if not candidates:
+            break
+        clock.advance(max(0.0, min(candidates) - now) or 1e-6)
+
+    return {priority: {"calls": row["calls"], "rejected": row["rejected"],
+                       "wait_p50": round(_percentile(row["waits"], 0.5), 2),
+                       "wait_p95": round(_percentile(row["waits"], 0.95), 2),
+                       "wait_max": round(max(row["waits"], default=0.0), 2),
+                       "done_at": round(row["done_at"], 1)}
+            for priority, row in sorted(results.items())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate the LLM call scheduler on a fake rate-limited backend.")
+    parser.add_argument("--rpm", type=float, default=300, help="Provider (and scheduler) requests per minute")
+    parser.add_argument("--tpm", type=float, default=150_000, help="Provider (and scheduler) tokens per minute")
+    parser.add_argument("--batch-calls", type=int, default=1000, help="Calls the batch tenant submits at t=0")
+    parser.add_argument("--users", type=int, default=5, help="Interactive tenants")
+    parser.add_argument("--user-interval", type=float, default=8.0, help="Seconds between calls of one user")
+    parser.add_argument("--duration", type=float, default=300.0, help="Seconds the interactive users keep calling")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-scheduler", action="store_true", help="Send every call right away (baseline)")
+    args = parser.parse_args(argv)
+
+    workload = build_workload(args.batch_calls, args.users, args.user_interval, args.duration, args.seed)
+    results = simulate(workload, args.rpm, args.tpm, use_scheduler=not args.no_scheduler, seed=args.seed)
+    print(f"{'priority':<12} {'calls':>6} {'429s':>6} {'wait p50 s':>11} {'wait p95 s':>11} {'wait max s':>11} {'last done s':>12}")
+    for priority, row in results.items():
+        print(f"{priority:<12} {row['calls']:>6} {row['rejected']:>6} {row['wait_p50']:>11.2f} {row['wait_p95']:>11.2f} "
+              f"{row['wait_max']:>11.2f} {row['done_at']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+'''
+Call policy for LLM calls: per-stage timeouts, retries with backoff, hedged requests and a fallback model.
+
+call_with_policy(stage, call) runs call(model, attempt, hedge) (one LLM call, see crew.run_policy_call):
+    1) every call runs in its own thread and is abandoned after config.STAGE_TIMEOUTS[stage] seconds
+    2) on 429 / 5xx / connection errors / timeouts it is retried with jittered exponential backoff
+       (config.CALL_MAX_RETRIES times; a Retry-After header from the server is respected)
+    3) with config.HEDGE_REQUESTS on, a second identical call is started once the first one runs longer
+       than the stage's p95 latency; the first answer wins
+    4) once the retries are used up, the stage switches to config.FALLBACK_MODELS[stage] (if set)
+       and gets the same retries there
+Other errors (bad request, auth, ...) are raised right away.
+An abandoned call cannot be killed; it finishes in the background and its answer is ignored. Its attempt is
+cancelled, though (CallAttempt.cancel): a call still waiting for its turn in the LLM call scheduler leaves
+the queue. One that is already running keeps its scheduler ticket until its request really ends, so abandoned
+calls still count against the concurrency and token limits.
+With queued=True the timeout starts when the call gets its turn (mark_call_started()), not while it waits
+in the scheduler queue: under tight rate limits the wait can be much longer than the stage timeout.
+'''
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+import config
+
+# HTTP status codes worth retrying
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+# Exception class names (OpenAI / LiteLLM / httpx) that mean "try again"
+RETRYABLE_NAMES = ("RateLimit", "Timeout", "ServiceUnavailable", "InternalServer", "APIConnection", "ConnectError",
+                   "Overloaded")
+
+
+class CallTimeout(Exception):
+    pass
+
+
+# True if the error is temporary (rate limit, server error, network, timeout) and the call can be retried.
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (CallTimeout, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        try:
+            return int(status) in RETRYABLE_STATUS
+        except (TypeError, ValueError):
+            pass
+    name = type(error).__name__
+    return any(part in name for part in RETRYABLE_NAMES)
+
+# Seconds the server asked us to wait (Retry-After header), or None.
+def retry_after(error: Exception):
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+# "Full jitter" exponential backoff: a random wait between 0 and base * 2^attempt (capped).
+def backoff_delay(attempt: int, error: Exception = None) -> float:
+    delay = random.uniform(0, min(config.BACKOFF_MAX_SECONDS, config.BACKOFF_BASE_SECONDS * 2 ** attempt))
+    asked = retry_after(error) if error is not None else None
+    return min(config.BACKOFF_MAX_SECONDS, max(delay, asked)) if asked else delay
+
+def stage_timeout(stage: str) -> float:
+    return config.STAGE_TIMEOUTS.get(stage, config.STAGE_TIMEOUTS.get("*", 60.0))
+
+def fallback_model(stage: str):
+    return config.FALLBACK_MODELS.get(stage) or config.FALLBACK_MODELS.get("*") or None
+
+
+'''
+Rolling window of successful call latencies per stage; hedge_deadline() is the stage's p95
+(or config.HEDGE_DEFAULT_SECONDS until enough samples exist).
+'''
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def hedge_deadline(self, stage: str) -> float:
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if len(samples) < config.HEDGE_MIN_SAMPLES:
+            return config.HEDGE_DEFAULT_SECONDS
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+_latency = LatencyTracker()
+
+def get_latency_tracker() -> LatencyTracker:
+    return _latency
+
+
+'''
+State of one call thread, shared with the code it runs (current_attempt()):
+    - started: set by mark_call_started() once the call really starts (it had its turn in the scheduler)
+    - cancel(): the policy gave up on the call; the callbacks registered with on_cancel() run once
+'''
+class CallAttempt:
+    def __init__(self):
+        self.created = time.monotonic()
+        self.started = threading.Event()
+        self.started_at = None
+        self.cancelled = False
+        self._on_cancel = []
+        self._lock = threading.Lock()
+
+    def mark_started(self):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.started.set()
+
+    # Time the call started (when it was created if it never said so).
+    def began(self) -> float:
+        return self.started_at if self.started_at is not None else self.created
+
+    # Runs fn() when the attempt is cancelled (right away if it already is).
+    def on_cancel(self, fn):
+        with self._lock:
+            if not self.cancelled:
+                self._on_cancel.append(fn)
+                return
+        fn()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._on_cancel = self._on_cancel, []
+        for fn in callbacks:
+            fn()
+
+_local = threading.local()
+
+# The CallAttempt of the call running in this thread, or None outside call_with_policy.
+def current_attempt():
+    return getattr(_local, "attempt", None)
+
+# Tells the policy that the call of this thread starts now (its timeout runs from here, see the module docstring).
+def mark_call_started():
+    attempt = current_attempt()
+    if attempt is not None:
+        attempt.mark_started()
+
+# Runs fn() in a new daemon thread and returns a Future for its result (the thread can be abandoned).
+# future.attempt is the CallAttempt of that thread.
+def start_call(fn) -> Future:
+    future = Future()
+    future.attempt = CallAttempt()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        _local.attempt = future.attempt
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name="llm-call", daemon=True).start()
+    return future
+
+'''
+One attempt: call(hedge=False) with a timeout, plus an optional hedge call(hedge=True) after the p95 deadline.
+Returns the first successful answer; raises CallTimeout, or the error of the last call that failed.
+With queued=True the timeout (and the hedge deadline) count from mark_call_started() of the first call.
+Calls still running when the attempt ends are cancelled (see CallAttempt).
+'''
+def _attempt(stage: str, call, timeout: float, queued: bool = False) -> str:
+    futures = [start_call(lambda: call(False))]
+    started = list(futures)
+    try:
+        first = futures[0]
+        if queued:
+            while not first.attempt.started.wait(0.05) and not first.done():
+                pass
+        start = first.attempt.began()
+        if config.HEDGE_REQUESTS:
+            deadline = _latency.hedge_deadline(stage)
+            if deadline < timeout:
+                done, _ = wait(futures, timeout=max(0.0, start + deadline - time.monotonic()))
+                if not done:
+                    futures.append(start_call(lambda: call(True)))
+                    started.append(futures[-1])
+
+        error = None
+        while futures:
+            remaining = timeout - (time.monotonic() - start)
+            done, _ = wait(futures, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                raise CallTimeout(f"Stage '{stage}' did not answer within {timeout:g}s")
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    _latency.observe(stage, time.monotonic() - future.attempt.began())
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        for future in started:
+            if not future.done():
+                future.attempt.cancel()
+
+'''
+Runs one LLM call of a stage under the policy (see the module docstring).
+call(model, attempt, hedge) must make the call with the given model (None = the agent's normal model)
+and return its output; attempt counts retries on that model, hedge is True for the extra hedged call.
+queued=True: call waits for a scheduler turn first and calls mark_call_started() once it has it.
+'''
+def call_with_policy(stage: str, call, queued: bool = False) -> str:
+    timeout = stage_timeout(stage)
+    models = [None]
+    if fallback_model(stage):
+        models.append(fallback_model(stage))
+
+    error = None
+    for model in models:
+        for attempt in range(config.CALL_MAX_RETRIES + 1):
+            try:
+                return _attempt(stage, lambda hedge: call(model, attempt, hedge), timeout, queued)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                error = e
+                if attempt < config.CALL_MAX_RETRIES:
+                    time.sleep(backoff_delay(attempt, e))
+    raise error
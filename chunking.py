@@ -0,0 +1,91 @@
+'''
+Section-aware chunking of long resumes.
+
+Instead of cutting the resume at a fixed number of characters, the text is:
+    1) split on detected section headings (Experience, Education, Skills, ...)
+    2) packed, section by section, into chunks that stay under a token budget
+    3) a section that is bigger than the budget on its own is split between lines (bullets stay whole)
+Each chunk can then be sent to the LLM in parallel and the outputs are merged back in the original order,
+so every part of a multi-page resume is processed and cost grows linearly with its length.
+'''
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from ats_scoring import SECTION_PATTERNS
+from tokens import count_tokens
+
+_HEADING_RE = re.compile(r"(?:%s)" % "|".join(SECTION_PATTERNS.values()))
+
+
+# A line is a heading if it is a known section name, or a short ALL-CAPS line.
+def is_heading(line: str) -> bool:
+    text = line.strip().strip(":#*-_= ")
+    if not text or len(text) > 40:
+        return False
+    if _HEADING_RE.fullmatch(text.lower()):
+        return True
+    letters = [c for c in text if c.isalpha()]
+    return len(letters) >= 4 and all(c.isupper() for c in letters) and len(text.split()) <= 4
+
+'''
+Splits resume text into sections.
+Returns a list of section texts in order; each section starts with its heading line
+(the text before the first heading, usually name + contact details, is its own section).
+'''
+def split_sections(text: str) -> list:
+    sections = []
+    current = []
+    for line in text.splitlines():
+        if is_heading(line) and any(l.strip() for l in current):
+            sections.append("\n".join(current).strip("\n"))
+            current = []
+        current.append(line)
+    if any(l.strip() for l in current):
+        sections.append("\n".join(current).strip("\n"))
+    return sections
+
+# Splits one oversized section between lines so each piece fits max_tokens.
+def _split_section(section: str, max_tokens: int) -> list:
+    pieces, current, current_tokens = [], [], 0
+    for line in section.splitlines():
+        line_tokens = count_tokens(line) + 1
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+'''
+Packs the sections of a resume into chunks of at most max_tokens tokens
+(a single line longer than the budget is kept whole rather than cut mid-word).
+Returns a list of chunk texts in original order.
+'''
+def chunk_resume(text: str, max_tokens: int) -> list:
+    chunks, current, current_tokens = [], [], 0
+    for section in split_sections(text):
+        section_tokens = count_tokens(section) + 2
+        pieces = [section] if section_tokens <= max_tokens else _split_section(section, max_tokens)
+        for piece in pieces:
+            piece_tokens = count_tokens(piece) + 2
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks or [text]
+
+# Runs fn(index, chunk) for every chunk in parallel and returns the outputs in chunk order.
+def map_chunks(fn, chunks: list, max_workers: int = 4) -> list:
+    if len(chunks) == 1:
+        return [fn(0, chunks[0])]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        return list(pool.map(fn, range(len(chunks)), chunks))
+
+# Joins processed chunks back into one document.
+def merge_chunks(outputs: list) -> str:
+    return "\n\n".join(o.strip() for o in outputs if o and o.strip())
@@ -0,0 +1,220 @@
+'''
+Central settings for the pipeline.
+Every value can be overridden with an environment variable (or a line in .env),
+so the same code runs locally, in Docker and in batch jobs without edits.
+'''
+import os
+
+# ---- .env ----
+# Loaded here, before any value below is read (and only when the file exists, so python-dotenv
+# is not imported for nothing). Variables that are already set in the environment win.
+for _env_path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"), ".env"):
+    if os.path.isfile(_env_path):
+        from dotenv import load_dotenv
+        load_dotenv(_env_path)
+        break
+
+# Reads "stage=value,stage=value" settings (e.g. ATS_STAGE_TIMEOUTS="rewrite=45,cover_letter=30").
+def _stage_map(value: str, cast=str) -> dict:
+    pairs = (item.split("=", 1) for item in value.split(",") if "=" in item)
+    return {stage.strip(): cast(v.strip()) for stage, v in pairs}
+
+# ---- Stage result cache ----
+# Turns the stage cache on/off (set ATS_CACHE_ENABLED=0 to always call the LLM)
+CACHE_ENABLED = os.getenv("ATS_CACHE_ENABLED", "1") != "0"
+# Where the SQLite cache file lives
+CACHE_PATH = os.getenv("ATS_CACHE_PATH", os.path.join(".ats_cache", "stage_cache.sqlite3"))
+# How long a cached stage output stays valid (seconds). Default: 7 days
+CACHE_TTL_SECONDS = int(os.getenv("ATS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Size limits; when exceeded the least recently used entries are evicted
+CACHE_MAX_ENTRIES = int(os.getenv("ATS_CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.getenv("ATS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+# Only deterministic stages (temperature 0.0) are cached by default.
+# Set ATS_CACHE_ALL_STAGES=1 to also cache the creative stages (rewrite, cover letter, ...).
+CACHE_ALL_STAGES = os.getenv("ATS_CACHE_ALL_STAGES", "0") == "1"
+
+# ---- LLM call scheduler / rate limits (see scheduler.py) ----
+# Limits on LLM calls across all threads of this process (0 = no limit): requests per minute,
+# tokens per minute (prompt + completion, estimated before each call) and calls in flight at the same time
+LLM_CALLS_PER_MINUTE = int(os.getenv("ATS_LLM_CALLS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("ATS_LLM_TOKENS_PER_MINUTE", "0"))
+LLM_MAX_CONCURRENT_CALLS = int(os.getenv("ATS_LLM_MAX_CONCURRENT_CALLS", "0"))
+# How many seconds' worth of the per-minute limits may start back-to-back
+SCHEDULER_BURST_SECONDS = float(os.getenv("ATS_SCHEDULER_BURST_SECONDS", "6"))
+# Priority of calls whose run does not set one ("interactive" or "batch"; batch.py runs as "batch")
+SCHEDULER_DEFAULT_PRIORITY = os.getenv("ATS_SCHEDULER_DEFAULT_PRIORITY", "interactive")
+# A batch call that has waited this long goes ahead of the interactive calls (0 = strict priority)
+SCHEDULER_BATCH_MAX_WAIT_SECONDS = float(os.getenv("ATS_SCHEDULER_BATCH_MAX_WAIT_SECONDS", "60"))
+# Tokens CrewAI adds around every task prompt (its system / format instructions), for the up-front estimate
+SCHEDULER_PROMPT_OVERHEAD_TOKENS = int(os.getenv("ATS_SCHEDULER_PROMPT_OVERHEAD_TOKENS", "250"))
+# Expected answer tokens per stage, for the same estimate (e.g. ATS_SCHEDULER_COMPLETION_TOKENS="fused=2000")
+SCHEDULER_COMPLETION_TOKENS = {
+    "*": 400, "parse": 600, "rewrite": 600, "refine": 600, "fused": 1500, "evaluate": 250,
+    "cover_letter": 450, "skill_gap": 300, "json_repair": 400, "job_profile": 400,
+    **_stage_map(os.getenv("ATS_SCHEDULER_COMPLETION_TOKENS", ""), int),
+}
+
+# ---- Batch mode ----
+# How many resume/JD pairs run at the same time in batch mode
+BATCH_MAX_WORKERS = int(os.getenv("ATS_BATCH_MAX_WORKERS", "4"))
+
+# ---- Evaluation ----
+# The ATS score is computed locally (ats_scoring.py). Set ATS_USE_LLM_EVALUATOR=1 to also
+# ask the evaluator agent for a second opinion (adds one LLM call per run).
+USE_LLM_EVALUATOR = os.getenv("ATS_USE_LLM_EVALUATOR", "0") == "1"
+
+# ---- Skill gap ----
+# Matched / missing / weak skills are found locally with the skill taxonomy (skill_taxonomy.py) and the LLM
+# only writes the recommendations. Set ATS_LOCAL_SKILL_GAP=0 to let the LLM do the whole analysis again.
+LOCAL_SKILL_GAP = os.getenv("ATS_LOCAL_SKILL_GAP", "1") == "1"
+# Set ATS_SKILL_GAP_LLM_RECOMMENDATIONS=0 to write the recommendations locally too (no LLM call at all)
+SKILL_GAP_LLM_RECOMMENDATIONS = os.getenv("ATS_SKILL_GAP_LLM_RECOMMENDATIONS", "1") == "1"
+# Optional JSON file with extra skills: {"Canonical Name": ["alias", ...]}
+SKILL_TAXONOMY_PATH = os.getenv("ATS_SKILL_TAXONOMY_PATH", "")
+
+# ---- Streaming ----
+# Set ATS_STREAM_TOKENS=1 to stream LLM tokens into the UI while each stage runs
+STREAM_TOKENS = os.getenv("ATS_STREAM_TOKENS", "0") == "1"
+
+# ---- Long resumes ----
+# Parse, rewrite and refine split the resume into section-aware chunks of at most this many tokens
+# and process the chunks in parallel (instead of cutting the resume off).
+CHUNK_MAX_TOKENS = int(os.getenv("ATS_CHUNK_MAX_TOKENS", "600"))
+# How many chunks of one stage are sent to the LLM at the same time
+CHUNK_MAX_WORKERS = int(os.getenv("ATS_CHUNK_MAX_WORKERS", "4"))
+
+# ---- File extraction ----
+# Stop reading a PDF after this many pages (0 = read all pages)
+PDF_MAX_PAGES = int(os.getenv("ATS_PDF_MAX_PAGES", "0"))
+# Stop extracting once this many characters of text exist (0 = no limit)
+EXTRACT_MAX_CHARS = int(os.getenv("ATS_EXTRACT_MAX_CHARS", "0"))
+# Worker processes used to extract big PDFs in parallel (0 or 1 = extract in this process)
+PDF_WORKERS = int(os.getenv("ATS_PDF_WORKERS", "0"))
+# PDFs with fewer pages than this are always extracted in this process (spawning workers costs more)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("ATS_PDF_PARALLEL_MIN_PAGES", "8"))
+# Extraction cache: on-disk folder ("" = memory only) and how many files the in-memory LRU keeps
+EXTRACT_CACHE_DIR = os.getenv("ATS_EXTRACT_CACHE_DIR", os.path.join(".ats_cache", "extract"))
+EXTRACT_CACHE_MEMORY_ITEMS = int(os.getenv("ATS_EXTRACT_CACHE_MEMORY_ITEMS", "128"))
+
+# ---- Ingestion workers (see file_tools/ingestion.py) ----
+# Worker processes that extract uploaded files in batch mode / index builds (0 = extract in this process)
+INGEST_WORKERS = int(os.getenv("ATS_INGEST_WORKERS", "2"))
+# A file that takes longer than this is abandoned (its worker is killed and replaced)
+INGEST_TIMEOUT_SECONDS = float(os.getenv("ATS_INGEST_TIMEOUT_SECONDS", "30"))
+# Address-space limit of each worker (MB, 0 = none); a file that needs more fails with a memory error
+INGEST_MAX_MEMORY_MB = int(os.getenv("ATS_INGEST_MAX_MEMORY_MB", "1024"))
+# A worker whose resident memory is above this after a file is replaced (MB, 0 = never)
+INGEST_RECYCLE_RSS_MB = int(os.getenv("ATS_INGEST_RECYCLE_RSS_MB", "400"))
+# Every worker is replaced after this many files
+INGEST_MAX_FILES_PER_WORKER = int(os.getenv("ATS_INGEST_MAX_FILES_PER_WORKER", "50"))
+
+# ---- Export (see file_tools/exporter.py) ----
+# A .docx file whose styles (Title, Heading 1, List Bullet, Normal) are used for DOCX exports ("" = built-in style)
+EXPORT_DOCX_TEMPLATE = os.getenv("ATS_EXPORT_DOCX_TEMPLATE", "")
+# How many exported files (DOCX/PDF bytes) the in-memory cache keeps
+EXPORT_CACHE_ITEMS = int(os.getenv("ATS_EXPORT_CACHE_ITEMS", "128"))
+
+# ---- Job queue ----
+# SQLite file that holds the queue (shared by the API, the workers and Streamlit)
+JOB_DB_PATH = os.getenv("ATS_JOB_DB_PATH", os.path.join(".ats_cache", "jobs.sqlite3"))
+# Backpressure: new jobs are rejected once this many are waiting
+JOB_MAX_PENDING = int(os.getenv("ATS_JOB_MAX_PENDING", "200"))
+# Worker processes started per box
+JOB_WORKERS = int(os.getenv("ATS_JOB_WORKERS", "2"))
+# How often an idle worker checks the queue (seconds)
+JOB_POLL_SECONDS = float(os.getenv("ATS_JOB_POLL_SECONDS", "1.0"))
+# A worker refreshes the lease (heartbeat) of the job it is running this often (seconds)
+JOB_HEARTBEAT_SECONDS = float(os.getenv("ATS_JOB_HEARTBEAT_SECONDS", "30"))
+# A "running" job without a heartbeat for this long is assumed lost (worker died) and is queued again.
+# Only missed heartbeats count, so a job may run for longer than this; keep it a few heartbeats long.
+JOB_STALE_SECONDS = int(os.getenv("ATS_JOB_STALE_SECONDS", "180"))
+# Largest upload the HTTP API accepts (bytes, after base64 encoding)
+JOB_MAX_UPLOAD_BYTES = int(os.getenv("ATS_JOB_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# Streamlit: send runs to the job queue (and poll) instead of running them in the app process
+USE_JOB_QUEUE = os.getenv("ATS_USE_JOB_QUEUE", "0") == "1"
+
+# ---- Results store (see results_store.py) ----
+# Every finished run is saved here (history, full-text search and diffs in the app). ATS_RESULTS_STORE=0 turns it off
+RESULTS_STORE_ENABLED = os.getenv("ATS_RESULTS_STORE", "1") == "1"
+RESULTS_DB_PATH = os.getenv("ATS_RESULTS_DB_PATH", os.path.join(".ats_cache", "results.sqlite3"))
+# Runs per page of history / search results
+RESULTS_PAGE_SIZE = int(os.getenv("ATS_RESULTS_PAGE_SIZE", "25"))
+
+# ---- Shared HTTP client ----
+# Connection pool used for all model calls (one client per process, reused across runs)
+HTTP_MAX_CONNECTIONS = int(os.getenv("ATS_HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("ATS_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("ATS_HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("ATS_HTTP_TIMEOUT_SECONDS", "120"))
+
+# ---- Pipeline mode ----
+# "staged": separate parse, rewrite and refine calls. "fused": one structured call that returns all three
+# (fewer round-trips and tokens). Both modes return the same outputs, so they can be A/B tested.
+PIPELINE_MODE = os.getenv("ATS_PIPELINE_MODE", "staged")
+
+# ---- Tracing & metrics ----
+# Crew(verbose=...) prints every agent step to stdout; off by default (it is slow under load)
+CREW_VERBOSE = os.getenv("ATS_CREW_VERBOSE", "0") == "1"
+# Write one structured (JSON) log line per LLM call to stderr
+TRACE_LOG = os.getenv("ATS_TRACE_LOG", "0") == "1"
+# Folder for one trace JSON file per pipeline run ("" = don't write trace files)
+TRACE_DIR = os.getenv("ATS_TRACE_DIR", "")
+# Port of the Prometheus-style /metrics endpoint (0 = off)
+METRICS_PORT = int(os.getenv("ATS_METRICS_PORT", "0"))
+
+# ---- Call policy: timeouts, retries, hedging, fallback (see call_policy.py) ----
+# Seconds one LLM call of a stage may take before it is abandoned and retried (or falls back).
+# "*" is the default for stages without their own entry.
+STAGE_TIMEOUTS = {
+    "*": 60.0, "parse": 45.0, "rewrite": 60.0, "refine": 60.0, "fused": 90.0,
+    "evaluate": 30.0, "cover_letter": 60.0, "skill_gap": 45.0, "json_repair": 20.0, "job_profile": 45.0,
+    **_stage_map(os.getenv("ATS_STAGE_TIMEOUTS", ""), float),
+}
+# Retries per model on 429 / 5xx / connection errors / timeouts, with jittered exponential backoff
+CALL_MAX_RETRIES = int(os.getenv("ATS_CALL_MAX_RETRIES", "2"))
+BACKOFF_BASE_SECONDS = float(os.getenv("ATS_BACKOFF_BASE_SECONDS", "1.0"))
+BACKOFF_MAX_SECONDS = float(os.getenv("ATS_BACKOFF_MAX_SECONDS", "20"))
+# Hedged requests: if a call is still running after the stage's p95 latency, a second identical call
+# is started and whichever finishes first is used (costs extra calls, cuts tail latency)
+HEDGE_REQUESTS = os.getenv("ATS_HEDGE_REQUESTS", "0") == "1"
+# Until a stage has this many latency samples, hedging waits HEDGE_DEFAULT_SECONDS instead of its p95
+HEDGE_MIN_SAMPLES = int(os.getenv("ATS_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_SECONDS = float(os.getenv("ATS_HEDGE_DEFAULT_SECONDS", "20"))
+# Model to switch to per stage once the retries on the main model are used up ("" = no fallback),
+# e.g. ATS_FALLBACK_MODELS="*=gpt-4.1-nano,fused=gpt-4o"
+FALLBACK_MODELS = _stage_map(os.getenv("ATS_FALLBACK_MODELS", ""))
+
+# ---- Job profiles (see job_profile.py) ----
+# Analyze each job description once into a compact JobProfile and send that to the stages instead of raw JD slices
+USE_JOB_PROFILE = os.getenv("ATS_USE_JOB_PROFILE", "1") == "1"
+# Let an LLM call extract skills/seniority/must-haves (0 = local keyword analysis only, no LLM call)
+JOB_PROFILE_USE_LLM = os.getenv("ATS_JOB_PROFILE_USE_LLM", "1") == "1"
+# Where profiles are stored by JD hash ("" = memory only)
+JOB_PROFILE_DIR = os.getenv("ATS_JOB_PROFILE_DIR", os.path.join(".ats_cache", "job_profiles"))
+
+# ---- Startup (see startup.py) ----
+# Import the heavy libraries in the background after the first page render / before a worker's first job
+WARM_UP_ENABLED = os.getenv("ATS_WARM_UP", "1") == "1"
+# Which modules the warm-up imports (comma separated)
+WARM_UP_MODULES = tuple(m.strip() for m in os.getenv("ATS_WARM_UP_MODULES", "crewai,litellm,pypdf,docx,fpdf").split(",") if m.strip())
+
+# ---- Prompt budget (see prompt_budget.py) ----
+# Clean resume / job text before it goes into a prompt (whitespace, PDF artifacts, repeated headers/footers)
+PROMPT_COMPRESS = os.getenv("ATS_PROMPT_COMPRESS", "1") == "1"
+# Also drop street addresses (a city or country on its own is kept)
+PROMPT_DROP_ADDRESSES = os.getenv("ATS_PROMPT_DROP_ADDRESSES", "1") == "1"
+# Drop page numbers and the copies of page headers / footers that PDF extraction repeats at the top / bottom
+# of every page (only for multi-page PDFs, see prompt_budget.drop_page_furniture)
+PROMPT_DROP_REPEATED_LINES = os.getenv("ATS_PROMPT_DROP_REPEATED_LINES", "1") == "1"
+# Most tokens the resume (or other document) text of a stage's prompt may take, e.g. ATS_PROMPT_BUDGETS="evaluate=300".
+# Chunked stages (parse, rewrite, refine, fused) are kept under CHUNK_MAX_TOKENS per chunk instead.
+PROMPT_BUDGETS = {
+    "*": 400, "parse": 400, "rewrite": 300, "refine": 250, "fused": 400,
+    "evaluate": 200, "cover_letter": 200, "skill_gap": 200, "json_repair": 1000, "job_profile": 1000,
+    **_stage_map(os.getenv("ATS_PROMPT_BUDGETS", ""), int),
+}
+# Most tokens of the raw job description in a prompt (only used when there is no JobProfile), e.g. "cover_letter=150"
+PROMPT_JOB_BUDGETS = {
+    "*": 100, "rewrite": 75, "fused": 75, "evaluate": 50, "cover_letter": 100, "skill_gap": 100,
+    **_stage_map(os.getenv("ATS_PROMPT_JOB_BUDGETS", ""), int),
+}
@@ -1,132 +1,617 @@
 import os
-# Crew is the object that runs agents and tasks together.
-# Process has modes (like sequential) that tell the Crew how to run tasks.
-from crewai import Crew, Process
-
-# imports functions that create the four agents (parser, writer, evaluator, refiner)
-from agents import (
-    build_parser_agent, build_ats_writer_agent, build_refiner_agent, build_evaluator_agent, build_cover_letter_agent, build_skill_gap_agent
-)
+import json
+import hashlib
+import time
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+# AgentPool builds each agent (parser, writer, refiner, evaluator, cover letter, skill gap) once and reuses it
+from agents import AgentPool
+# one keep-alive HTTP client shared by all model calls
+from http_client import configure_shared_http_client
 
 # imports functions that build the task objects for each step (parsing, rewriting, refining, evaluating).
 from tasks import (
-    parse_resume_task, rewrite_for_ats_task, evaluate_ats_task, refine_bullets_task, cover_letter_task, skill_gap_task
+    parse_resume_task, rewrite_for_ats_task, evaluate_ats_task, refine_bullets_task, cover_letter_task, skill_gap_task,
+    fused_resume_task, repair_json_task, job_profile_task, skill_recommendations_task
 )
+from schemas import AtsEvaluation, FusedResume, JobProfile, SkillGapAnalysis, SkillRecommendations
+# local skill matching (taxonomy + Aho-Corasick): deterministic matched / missing / weak skills
+from skill_taxonomy import analyze_skill_gap, local_recommendations
+# one-time JD analysis shared by every candidate (cached by JD hash)
+from job_profile import get_job_profile_cache, local_job_profile, complete_profile
+# tolerant JSON extraction + schema validation for structured stage outputs
+from json_parsing import parse_structured
+
+# stage-level result cache (skips kickoff() when the same stage input was seen before)
+from stage_cache import get_stage_cache, agent_settings, make_key, is_cacheable
+# local, deterministic ATS scoring (replaces the evaluator LLM call by default)
+from ats_scoring import score_resume
+import config
+# process-wide scheduler: RPM/TPM limits, interactive-before-batch priority, fair queuing per tenant
+from scheduler import get_scheduler, estimate_call_tokens, render_prompt, call_identity, TicketCancelled
+# routes streamed LLM tokens to the stage that requested them
+from streaming import install_token_listener, token_sink, current_sink
+# section-aware chunking for long resumes
+from chunking import chunk_resume, map_chunks, merge_chunks
+# prompt text compression (whitespace, PDF artifacts, repeated headers) before chunking
+from prompt_budget import prepare_prompt_text
+# every finished run is saved for the history / search / diff views (see results_store.py)
+from results_store import record_run
+# per-call latency / token / cost tracing and metrics
+from tracing import RunTrace, current_trace, run_trace, record_kickoff, kickoff_usage, start_metrics_server
+# timeouts, retries with backoff, hedged requests and fallback models for every LLM call
+from call_policy import call_with_policy, current_attempt, mark_call_started
+
+# Runs a single agent + task as its own one-task Crew and returns the output as a clean string.
+# Every stage of the pipeline goes through here, so this is the one place that calls kickoff().
+# If the stage is cacheable and the same (stage, model, temperature, prompt) ran before,
+# the cached output is returned and kickoff() is skipped.
+# Every call is recorded as a tracing span (wall/queue time, tokens, cost, cache hit); attempt is the retry number.
+def run_single_task(agent, task, stage: str = "", attempt: int = 0) -> str:
+    start = time.perf_counter()
+    model, temperature = agent_settings(agent)
+    cache = get_stage_cache()
+    key = None
+    if cache is not None and is_cacheable(temperature):
+        key = make_key(stage, model, temperature, task.description)
+        cached = cache.get(key, stage)
+        if cached is not None:
+            record_kickoff(stage, model, time.perf_counter() - start, cache_hit=True)
+            return cached
+
+    queue_start = time.perf_counter()
+    scheduler = get_scheduler()
+    ticket = None
+    if scheduler is not None: # waits here for this call's turn under the RPM/TPM limits
+        tenant, priority = call_identity(current_trace())
+        ticket = scheduler.submit(estimate_call_tokens(stage, render_prompt(agent, task)), tenant, priority)
+        call_attempt = current_attempt()
+        if call_attempt is not None: # the call policy gave up on this call while it was queued: leave the queue
+            call_attempt.on_cancel(lambda: scheduler.cancel(ticket))
+        scheduler.wait(ticket)
+        if call_attempt is not None and call_attempt.cancelled: # given up on just as its turn came: do not start
+            scheduler.release(ticket)
+            raise TicketCancelled(f"Call of stage '{stage}' was cancelled before it started")
+    queue_seconds = time.perf_counter() - queue_start
+    mark_call_started() # the stage timeout of the call policy runs from here, not from the queue wait
+
+    kickoff_start = time.perf_counter()
+    try:
+        # Crew runs agents and tasks together; Process.sequential runs the tasks one after another.
+        # Imported here (once, then from sys.modules) so importing crew.py does not load crewai.
+        from crewai import Crew, Process
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=config.CREW_VERBOSE # printing every step to stdout is slow under load; off by default
+        )
+        result = crew.kickoff() # runs the crew (agent executes the task) and returns the result
+    except BaseException:
+        if ticket is not None:
+            scheduler.release(ticket)
+        raise
+    prompt_tokens, completion_tokens, requests = kickoff_usage(agent, result)
+    if ticket is not None:
+        scheduler.release(ticket, prompt_tokens + completion_tokens) # corrects the estimate with the real usage
+    record_kickoff(stage, model, time.perf_counter() - kickoff_start, queue_seconds,
+                   prompt_tokens, completion_tokens, retries=attempt + max(0, requests - 1))
+    # Tasks with an output_pydantic schema come back as a model -> store it as clean JSON;
+    # everything else is converted to a plain string with extra spaces/newlines removed.
+    structured = getattr(result, "pydantic", None)
+    output = structured.model_dump_json() if structured is not None else str(result).strip()
+
+    if key is not None and output:
+        cache.set(key, stage, output)
+    return output
+
+'''
+This function runs a small graph (DAG) of pipeline stages.
+stages maps a stage name -> (list of stage names it depends on, function to run).
+Each function receives a dict with the outputs of the stages it depends on.
+A stage is started as soon as all of its dependencies are finished, so stages that
+do not depend on each other (cover letter, skill-gap, evaluation) run at the same time
+in a bounded thread pool (max_workers).
+If a timings dict is passed, it is filled with the wall time (seconds) of every stage plus "total".
+If on_event is passed, it is called (from the worker threads) with event dicts:
+    {"type": "stage_start", "stage": ...}
+    {"type": "token", "stage": ..., "delta": ...}       (only when the LLM streams)
+    {"type": "stage_complete", "stage": ..., "output": ..., "seconds": ...}
+Returns a dict of stage name -> output.
+'''
+def run_stage_graph(stages: dict, max_workers: int = 3, timings: dict = None, on_event=None) -> dict:
+    for name, (deps, _) in stages.items():
+        for dep in deps:
+            if dep not in stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+
+    if timings is None:
+        timings = {}
+    results = {}
+    running = {} # future -> stage name
+    pending = dict(stages)
+    graph_start = time.perf_counter()
+    trace = current_trace() # stage threads add their spans to the caller's run trace
+
+    # Wraps a stage function so it records its own wall time (and reports events, if asked).
+    def timed(name, fn, inputs):
+        start = time.perf_counter()
+        if on_event is None:
+            try:
+                with run_trace(trace):
+                    return fn(inputs)
+            finally:
+                timings[name] = round(time.perf_counter() - start, 3)
+
+        on_event({"type": "stage_start", "stage": name})
+        try:
+            with run_trace(trace), token_sink(lambda delta: on_event({"type": "token", "stage": name, "delta": delta})):
+                output = fn(inputs)
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+        on_event({"type": "stage_complete", "stage": name, "output": output, "seconds": timings[name]})
+        return output
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Start every stage whose dependencies are all done
+            for name, (deps, fn) in list(pending.items()):
+                if all(dep in results for dep in deps):
+                    inputs = {dep: results[dep] for dep in deps}
+                    running[pool.submit(timed, name, fn, inputs)] = name
+                    del pending[name]
+
+            if not running:
+                # Nothing can start and nothing is running -> there is a dependency cycle
+                raise ValueError(f"Stages can never run (dependency cycle): {sorted(pending)}")
+
+            # Wait until at least one running stage finishes, then collect it
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result() # re-raises the stage error, if any
+
+    timings["total"] = round(time.perf_counter() - graph_start, 3)
+    return results
+
+'''
+Scores the final resume with the local ATS scoring engine (fast and deterministic, reads the full text).
+If config.USE_LLM_EVALUATOR is on, the evaluator agent also runs and its raw answer is added
+as "llm_second_opinion".
+Returns the evaluation as a JSON string (overall_score, breakdown, missing_keywords, quick_wins).
+'''
+def evaluate_resume(final_resume: str, job_title: str, job_description: str, agents: AgentPool = None,
+                    job_profile: JobProfile = None) -> str:
+    evaluation = score_resume(final_resume, job_title, job_description)
+    if config.USE_LLM_EVALUATOR:
+        output = run_agent_stage(
+            "evaluate", "evaluator",
+            lambda agent: evaluate_ats_task(agent, final_resume, job_title, job_description, job_profile), agents)
+        opinion = parse_stage_json(output, AtsEvaluation, agents)
+        evaluation["llm_second_opinion"] = opinion if opinion is not None else output
+    return json.dumps(evaluation, ensure_ascii=False)
+
+'''
+Runs one resume stage (parse, rewrite or refine) over a long text in section-aware chunks.
+    1) compress the text (prompt_budget.py) and split it into chunks of at most config.CHUNK_MAX_TOKENS tokens
+    2) run build_task(agent, chunk, part) for every chunk in parallel; each chunk leases its own
+       agent of the given role from the pool (agents are never shared between threads)
+    3) merge the outputs back in the original order
+A text that fits in one chunk is sent as a single, untruncated task.
+'''
+def run_chunked_stage(stage: str, role: str, build_task, text: str, agents: AgentPool = None) -> str:
+    agents = agents or get_agent_pool()
+    chunks = chunk_resume(prepare_prompt_text(text, stage, budget=None), config.CHUNK_MAX_TOKENS)
+    sink = current_sink() # chunk threads forward streamed tokens to the caller's sink
+    trace = current_trace() # ... and their spans to the caller's run trace
+
+    def run_part(i, chunk):
+        part = (i + 1, len(chunks)) if len(chunks) > 1 else None
+        with token_sink(sink), run_trace(trace):
+            return run_policy_call(stage, role, lambda agent: build_task(agent, chunk, part), agents)
+
+    return merge_chunks(map_chunks(run_part, chunks, config.CHUNK_MAX_WORKERS))
+
+'''
+Makes one LLM call for a stage under the call policy (call_policy.py): per-stage timeout, retries with
+backoff on 429/5xx, optional hedged second call and fallback model. Every try leases its own agent
+(of the fallback model, if that is in use) and builds a fresh task with build_task(agent).
+Hedged calls don't stream tokens, so the live preview shows only one answer.
+'''
+def run_policy_call(stage: str, role: str, build_task, agents: AgentPool = None) -> str:
+    agents = agents or get_agent_pool()
+    sink, trace = current_sink(), current_trace() # calls run in their own threads
+
+    def call(model, attempt, hedge):
+        with agents.lease(role, model) as agent, token_sink(None if hedge else sink), run_trace(trace):
+            return run_single_task(agent, build_task(agent), stage, attempt)
+
+    return call_with_policy(stage, call, queued=get_scheduler() is not None)
+
+# Runs one single-prompt stage with an agent leased from the pool.
+def run_agent_stage(stage: str, role: str, build_task, agents: AgentPool = None) -> str:
+    return run_policy_call(stage, role, build_task, agents)
+
+'''
+Parses the output of a structured stage into a dict that matches schema (see json_parsing).
+Fenced/chatty output, single quotes and trailing commas are handled locally; only if that fails,
+one cheap repair call is made (stage "json_repair"). Returns None if the output still can't be used.
+'''
+def parse_stage_json(output: str, schema, agents: AgentPool = None):
+    def repair(text, schema):
+        schema_json = json.dumps(schema.model_json_schema(), ensure_ascii=False)
+        return run_agent_stage(
+            "json_repair", "json_repair", lambda agent: repair_json_task(agent, text, schema_json), agents)
+    return parse_structured(output, schema, repair=repair)
+
+'''
+Runs only the skill-gap stage for one resume (also used to analyze a shortlist of candidates).
+With config.LOCAL_SKILL_GAP the skill lists are computed locally (skill_taxonomy.py) and the LLM only
+writes the recommendations (none is called when nothing is missing, or with SKILL_GAP_LLM_RECOMMENDATIONS off).
+The output is normalized to SkillGapAnalysis JSON; if the full-LLM output can't be parsed, it is returned raw.
+'''
+def run_skill_gap(resume_text: str, job_title: str, job_description: str, agents: AgentPool = None,
+                  job_profile: JobProfile = None) -> str:
+    if config.LOCAL_SKILL_GAP:
+        gap = analyze_skill_gap(resume_text, job_title, job_description, job_profile)
+        recommendations = None
+        if config.SKILL_GAP_LLM_RECOMMENDATIONS and (gap.missing_skills or gap.weak_skills):
+            output = run_agent_stage(
+                "skill_gap", "skill_gap",
+                lambda agent: skill_recommendations_task(agent, job_title, job_description, gap, job_profile), agents)
+            parsed = parse_stage_json(output, SkillRecommendations, agents)
+            recommendations = parsed["recommendations"] if parsed is not None else None
+        gap.recommendations = recommendations or local_recommendations(gap)
+        return json.dumps(gap.model_dump(), ensure_ascii=False)
+
+    output = run_agent_stage(
+        "skill_gap", "skill_gap",
+        lambda agent: skill_gap_task(agent, resume_text, job_title, job_description, job_profile), agents)
+    parsed = parse_stage_json(output, SkillGapAnalysis, agents)
+    return json.dumps(parsed, ensure_ascii=False) if parsed is not None else output
+
+'''
+Returns the JobProfile of a job (see job_profile.py), analyzing the JD only the first time it is seen:
+later calls (other candidates, other processes via the on-disk store) get the stored profile.
+With config.JOB_PROFILE_USE_LLM the jd_analyst agent extracts skills and must-haves; the local analysis
+fills any gaps and is used alone when the LLM is off or its answer can't be parsed.
+'''
+def get_job_profile(job_title: str, job_description: str, agents: AgentPool = None) -> JobProfile:
+    def build():
+        if not config.JOB_PROFILE_USE_LLM:
+            return local_job_profile(job_title, job_description)
+        output = run_agent_stage(
+            "job_profile", "jd_analyst", lambda agent: job_profile_task(agent, job_title, job_description), agents)
+        parsed = parse_stage_json(output, JobProfile, agents)
+        if parsed is None:
+            return local_job_profile(job_title, job_description)
+        return complete_profile(JobProfile.model_validate(parsed), job_title, job_description)
+
+    return get_job_profile_cache().get_or_create(job_title, job_description, build)
+
+# Runs only the parsing stage and returns the cleaned resume text.
+def parse_resume(raw_resume_text: str, agents: AgentPool = None) -> str:
+    return run_chunked_stage(
+        "parse", "parser",
+        lambda agent, chunk, part: parse_resume_task(agent, chunk, limit=None, part=part), raw_resume_text, agents)
+
+'''
+Fused mode: parse + rewrite + refine in one structured call per chunk (see fused_resume_task).
+Long resumes are still chunked; each chunk returns a FusedResume and the three fields are merged
+separately, in order. Returns a dict with cleaned_resume, rewritten_resume and final_resume.
+'''
+def run_fused_stage(raw_resume_text: str, job_title: str, job_description: str, agents: AgentPool = None,
+                    job_profile: JobProfile = None) -> dict:
+    agents = agents or get_agent_pool()
+    chunks = chunk_resume(prepare_prompt_text(raw_resume_text, "fused", budget=None), config.CHUNK_MAX_TOKENS)
+    sink = current_sink()
+    trace = current_trace()
+
+    def run_part(i, chunk):
+        part = (i + 1, len(chunks)) if len(chunks) > 1 else None
+        with token_sink(sink), run_trace(trace):
+            output = run_policy_call(
+                "fused", "writer",
+                lambda agent: fused_resume_task(agent, chunk, job_title, job_description, limit=None, part=part,
+                                                job_profile=job_profile), agents)
+        parsed = parse_stage_json(output, FusedResume, agents)
+        if parsed is None:
+            raise ValueError("The fused stage did not return valid FusedResume JSON.")
+        return FusedResume.model_validate(parsed)
 
-# create a Crew object wired with agents and tasks (but note: this version uses placeholder task inputs)
-def build_crew(raw_resume_text: str, job_title: str, job_description: str):
-    # Calls the builder functions to create four agent objects and stores them in variables.
-    # Each variable is now an agent ready to do its role.
-    parser = build_parser_agent()
-    writer = build_ats_writer_agent()
-    refiner = build_refiner_agent()
-    evaluator = build_evaluator_agent()
-
-    # Creates a parse task that instructs the parser agent to clean the raw_resume_text.
-    t_parse = parse_resume_task(parser, raw_resume_text)
-    # these are placeholders; we'll stitch later after parse result is known.
-    # These three lines create Task objects for rewrite/refine/evaluate but pass placeholder strings (like "{t_parse}" and "{{...}}") instead of real text
-    t_rewrite = rewrite_for_ats_task(writer, "{CLEANED_RESUME}", job_title, job_description)
-    t_refine = refine_bullets_task(refiner, "{REWRITTEN_RESUME}")
-    t_eval = evaluate_ats_task(evaluator, "{FINAL_RESUME}", job_title, job_description)
-
-
-    crew = Crew(
-        agents=[parser, writer, refiner, evaluator], # the four agents to run
-        tasks=[t_parse, t_rewrite, t_refine, t_eval], # the four tasks to perform (in the order listed)
-        process=Process.sequential, # run tasks one after another in order (not in parallel)
-        verbose=True # print helpful information while running
-    )
-    return crew # Returns the Crew object to the caller
+    parts = map_chunks(run_part, chunks, config.CHUNK_MAX_WORKERS)
+    return {field: merge_chunks([getattr(p, field) for p in parts]) for field in FusedResume.model_fields}
+
+# Pipeline modes: "staged" = separate parse/rewrite/refine calls, "fused" = one structured call
+PIPELINE_MODES = ("staged", "fused")
+
+# Order of the six outputs returned by run_pipeline
+STAGE_ORDER = ("parse", "rewrite", "refine", "evaluate", "cover_letter", "skill_gap")
+
+# Run inputs each stage reads directly (besides the outputs of the stages it depends on).
+# Used by PipelineSession to decide which stages have to run again when an input changes.
+STAGE_INPUTS = {
+    "parse": ("resume",),
+    "rewrite": ("job_title", "job_description"),
+    "refine": (),
+    "evaluate": ("job_title", "job_description"),
+    "cover_letter": ("job_title", "job_description"),
+    "skill_gap": ("job_title", "job_description"),
+    "fused": ("resume", "job_title", "job_description"),
+    "job_profile": ("job_title", "job_description"),
+}
+
+'''
+Builds the stage graph of one pipeline run (see run_stage_graph).
+parse -> rewrite -> refine run one after another; cover letter, skill-gap and evaluation only
+need the final resume, so they run in parallel once refine is done.
+If the resume was already parsed (e.g. batch mode parses each resume once), pass it as
+cleaned_resume and the parse stage just returns it.
+Agents are leased from agents (default: the process-wide pool), so nothing is rebuilt per run.
+mode="fused" replaces the parse/rewrite/refine calls with one structured "fused" stage; the three
+stages then just pick their field from it, so the outputs (and events) stay the same in both modes.
+With config.USE_JOB_PROFILE, a "job_profile" stage (in parallel with parsing) provides the JobProfile that
+the JD-dependent stages get instead of raw JD text; pass job_profile if it is already known (batch mode).
+'''
+def build_pipeline_stages(raw_resume_text: str, job_title: str, job_description: str, cleaned_resume: str = None,
+                          agents: AgentPool = None, mode: str = None, job_profile: JobProfile = None) -> dict:
+    agents = agents or get_agent_pool()
+    mode = mode or config.PIPELINE_MODE
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode '{mode}' (expected one of {PIPELINE_MODES})")
+
+    use_profile = config.USE_JOB_PROFILE or job_profile is not None
+    profile_deps = ["job_profile"] if use_profile else []
+    profile_stage = {
+        "job_profile": ([], lambda r: job_profile if job_profile is not None else get_job_profile(job_title, job_description, agents)),
+    } if use_profile else {}
+
+    # Stages that only need the final resume (same in both modes)
+    final_stages = {
+        # Cover letter, skill-gap analysis and evaluation all work on the final resume
+        "cover_letter": (["refine"] + profile_deps, lambda r: run_agent_stage(
+            "cover_letter", "cover_letter",
+            lambda agent: cover_letter_task(agent, r["refine"], job_title, job_description, r.get("job_profile")), agents)),
+        "skill_gap": (["refine"] + profile_deps, lambda r: run_skill_gap(
+            r["refine"], job_title, job_description, agents, r.get("job_profile"))),
+        "evaluate": (["refine"] + profile_deps, lambda r: evaluate_resume(
+            r["refine"], job_title, job_description, agents, r.get("job_profile"))),
+    }
+
+    if mode == "fused":
+        source = cleaned_resume if cleaned_resume is not None else raw_resume_text
+        return {
+            **profile_stage,
+            "fused": (profile_deps, lambda r: run_fused_stage(source, job_title, job_description, agents, r.get("job_profile"))),
+            "parse": (["fused"], lambda r: cleaned_resume if cleaned_resume is not None else r["fused"]["cleaned_resume"]),
+            "rewrite": (["fused"], lambda r: r["fused"]["rewritten_resume"]),
+            "refine": (["fused"], lambda r: r["fused"]["final_resume"]),
+            **final_stages,
+        }
+
+    return {
+        **profile_stage,
+        # Parsing (chunked, so long resumes are cleaned completely)
+        "parse": ([], lambda r: cleaned_resume if cleaned_resume is not None else parse_resume(raw_resume_text, agents)),
+        # Rewriting with the cleaned resume
+        "rewrite": (["parse"] + profile_deps, lambda r: run_chunked_stage(
+            "rewrite", "writer",
+            lambda agent, chunk, part: rewrite_for_ats_task(agent, chunk, job_title, job_description, limit=None, part=part,
+                                                            job_profile=r.get("job_profile")),
+            r["parse"], agents)),
+        # Refining the rewritten resume
+        "refine": (["rewrite"], lambda r: run_chunked_stage(
+            "refine", "refiner",
+            lambda agent, chunk, part: refine_bullets_task(agent, chunk, limit=None, part=part),
+            r["rewrite"], agents)),
+        **final_stages,
+    }
+
+'''
+A long-lived pipeline: build it once (per process, or via st.cache_resource in Streamlit) and reuse it.
+    - agents are built on first use and then reused across runs and threads (AgentPool)
+    - one pooled, keep-alive HTTP client is shared by all model calls (see http_client.py)
+    - every LLM call of a run is traced (see tracing.py); the /metrics endpoint starts if config.METRICS_PORT is set
+It is safe to call run()/stream() from several threads at the same time.
+'''
+class ResumePipeline:
+    def __init__(self, agents: AgentPool = None):
+        self.agents = agents or AgentPool()
+        configure_shared_http_client()
+        start_metrics_server()
+
+    # Builds the stage graph of one run; with a session, stages whose inputs did not change reuse their last output.
+    def _stages(self, raw_resume_text, job_title, job_description, cleaned_resume, mode, session, job_profile=None):
+        stages = build_pipeline_stages(raw_resume_text, job_title, job_description, cleaned_resume, self.agents, mode,
+                                       job_profile)
+        if session is None:
+            return stages
+        inputs = {"resume": cleaned_resume if cleaned_resume is not None else raw_resume_text,
+                  "job_title": job_title, "job_description": job_description}
+        return session.wrap(stages, inputs, mode or config.PIPELINE_MODE)
+
+    '''
+    Same as run_pipeline: returns (cleaned, rewritten, final_resume, evaluation, cover_letter, skill_gap_json).
+    Pass a RunTrace as trace to get the spans of this run (one is created anyway when config.TRACE_DIR is set,
+    and saved there as JSON). Pass a PipelineSession as session to only re-run stages whose inputs changed,
+    and a precomputed JobProfile as job_profile to skip the JD analysis.
+    tenant / priority ("interactive" or "batch") tell the LLM call scheduler whose run this is (see scheduler.py).
+    The finished run is saved to the results store (results_store.py) under label (e.g. the file name).
+    '''
+    def run(self, raw_resume_text: str, job_title: str, job_description: str, timings: dict = None,
+            max_workers: int = 3, cleaned_resume: str = None, mode: str = None, trace: RunTrace = None,
+            session: "PipelineSession" = None, job_profile: JobProfile = None, tenant: str = None, priority: str = None,
+            label: str = None):
+        if trace is None and (config.TRACE_DIR or tenant or priority):
+            trace = RunTrace()
+        if trace is not None:
+            trace.tenant, trace.priority = tenant or trace.tenant, priority or trace.priority
+        stages = self._stages(raw_resume_text, job_title, job_description, cleaned_resume, mode, session, job_profile)
+        with run_trace(trace):
+            results = run_stage_graph(stages, max_workers=max_workers, timings=timings)
+        if trace is not None and config.TRACE_DIR:
+            trace.save(config.TRACE_DIR)
+        results = tuple(results[name] for name in STAGE_ORDER)
+        record_run(raw_resume_text, job_title, job_description, results, timings, label, mode or config.PIPELINE_MODE, trace)
+        return results
+
+    '''
+    Streaming variant of run(): a generator that yields events while the pipeline runs,
+    so a UI can show each stage as soon as it produces output.
+    Yields the run_stage_graph events (stage_start, token, stage_complete) and finally
+        {"type": "done", "results": <same six-tuple as run()>, "timings": {...}, "trace": RunTrace.to_dict(),
+         "stored_id": <id in the results store, or None>}
+    If a stage fails, yields {"type": "error", "error": "..."} and stops.
+    '''
+    def stream(self, raw_resume_text: str, job_title: str, job_description: str,
+               max_workers: int = 3, cleaned_resume: str = None, mode: str = None, session: "PipelineSession" = None,
+               job_profile: JobProfile = None, tenant: str = None, priority: str = None, label: str = None):
+        install_token_listener()
+        events = queue.Queue()
+        timings = {}
+        trace = RunTrace(tenant=tenant, priority=priority)
+        stages = self._stages(raw_resume_text, job_title, job_description, cleaned_resume, mode, session, job_profile)
+
+        # The pipeline runs in a background thread; events are handed back through the queue.
+        def worker():
+            try:
+                with run_trace(trace):
+                    results = run_stage_graph(stages, max_workers=max_workers, timings=timings, on_event=events.put)
+                if config.TRACE_DIR:
+                    trace.save(config.TRACE_DIR)
+                results = tuple(results[name] for name in STAGE_ORDER)
+                stored_id = record_run(raw_resume_text, job_title, job_description, results, timings, label,
+                                       mode or config.PIPELINE_MODE, trace)
+                events.put({"type": "done", "results": results, "timings": timings, "trace": trace.to_dict(),
+                            "stored_id": stored_id})
+            except Exception as e:
+                events.put({"type": "error", "error": str(e)})
+
+        threading.Thread(target=worker, name="stream_pipeline", daemon=True).start()
+        while True:
+            event = events.get()
+            yield event
+            if event["type"] in ("done", "error"):
+                return
+
+    def parse(self, raw_resume_text: str) -> str:
+        return parse_resume(raw_resume_text, self.agents)
+
+
+# Fingerprint of one stage run: its name, the pipeline mode, the run inputs it reads and the outputs it gets.
+def stage_fingerprint(stage: str, mode: str, inputs: dict, dep_outputs: dict) -> str:
+    payload = json.dumps([stage, mode, inputs, dep_outputs], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+'''
+Remembers the last output of every stage for one user session (e.g. one Streamlit session), so a re-run
+only recomputes the stages whose inputs changed:
+    - change only the job description -> parse is reused; rewrite and everything after it run again
+    - change only the resume          -> everything runs again
+    - same inputs as before           -> nothing runs
+A stage is reused when its fingerprint (its own run inputs, see STAGE_INPUTS, plus the outputs of the
+stages it depends on) matches the last run. Because dependency OUTPUTS are compared, a stage whose
+upstream re-ran but produced the same text is reused too.
+The session also keeps the last results/timings/trace, so a UI can show them again without running anything.
+Each session is its own tenant for the LLM call scheduler (scheduler.py), so users share the rate limits fairly.
+'''
+class PipelineSession:
+    def __init__(self, pipeline: ResumePipeline = None, tenant: str = None):
+        self.pipeline = pipeline
+        self.tenant = tenant or "session-" + uuid.uuid4().hex[:8]
+        self._fingerprints = {} # stage -> fingerprint of its last run
+        self._outputs = {} # stage -> last output
+        self._lock = threading.Lock()
+        self.reused = set() # stages reused in the last run
+        self.results = None # six-tuple of the last successful run
+        self.timings = None
+        self.trace = None
+
+    # Returns stages with every function wrapped in a "reuse if the fingerprint matches" check.
+    def wrap(self, stages: dict, inputs: dict, mode: str) -> dict:
+        with self._lock:
+            self.reused = set()
+
+        def reuse_or_run(name, deps, fn):
+            def run(r):
+                fingerprint = stage_fingerprint(
+                    name, mode, {k: inputs[k] for k in STAGE_INPUTS.get(name, ())}, {d: r[d] for d in deps})
+                with self._lock:
+                    if self._fingerprints.get(name) == fingerprint:
+                        self.reused.add(name)
+                        return self._outputs[name]
+                output = fn(r)
+                with self._lock:
+                    self._fingerprints[name] = fingerprint
+                    self._outputs[name] = output
+                return output
+            return run
+
+        return {name: (deps, reuse_or_run(name, deps, fn)) for name, (deps, fn) in stages.items()}
+
+    def _pipeline(self) -> ResumePipeline:
+        return self.pipeline or get_default_pipeline()
+
+    # Same as ResumePipeline.run, but reuses unchanged stages; the results are also kept on the session.
+    def run(self, raw_resume_text: str, job_title: str, job_description: str, max_workers: int = 3,
+            cleaned_resume: str = None, mode: str = None, label: str = None):
+        timings, trace = {}, RunTrace(tenant=self.tenant)
+        results = self._pipeline().run(raw_resume_text, job_title, job_description, timings, max_workers,
+                                       cleaned_resume, mode, trace, session=self, label=label)
+        self.results, self.timings, self.trace = results, timings, trace.to_dict()
+        return results
+
+    # Same as ResumePipeline.stream, but reuses unchanged stages; the "done" event is also kept on the session.
+    def stream(self, raw_resume_text: str, job_title: str, job_description: str, max_workers: int = 3,
+               cleaned_resume: str = None, mode: str = None, label: str = None):
+        for event in self._pipeline().stream(raw_resume_text, job_title, job_description, max_workers,
+                                             cleaned_resume, mode, session=self, tenant=self.tenant, label=label):
+            if event["type"] == "done":
+                event["reused"] = sorted(self.reused)
+                self.results, self.timings, self.trace = event["results"], event["timings"], event["trace"]
+            yield event
+
+    # Forgets every stored output (the next run computes everything again).
+    def clear(self):
+        with self._lock:
+            self._fingerprints.clear()
+            self._outputs.clear()
+            self.reused = set()
+        self.results = self.timings = self.trace = None
+
+
+_default_pipeline = None
+_default_lock = threading.Lock()
+
+# Returns the process-wide pipeline (built on first use).
+def get_default_pipeline() -> ResumePipeline:
+    global _default_pipeline
+    with _default_lock:
+        if _default_pipeline is None:
+            _default_pipeline = ResumePipeline()
+        return _default_pipeline
+
+# Agent pool of the process-wide pipeline.
+def get_agent_pool() -> AgentPool:
+    return get_default_pipeline().agents
 
 # Defines a function to actually run the whole resume pipeline step-by-step and return results.
-def run_pipeline(raw_resume_text: str, job_title: str, job_description: str):
-    # Creates the four agents again (separate instances for this pipeline run).
-    parser = build_parser_agent()
-    writer = build_ats_writer_agent()
-    refiner = build_refiner_agent()
-    evaluator = build_evaluator_agent()
-    cover_letter_writer = build_cover_letter_agent()
-    skill_gap_agent = build_skill_gap_agent()
-
-    # Create tasks
-    t_parse = parse_resume_task(parser, raw_resume_text)
-
-    # Build and run crew for parsing
-    parse_crew = Crew(
-        agents=[parser],
-        tasks=[t_parse],
-        process=Process.sequential,
-        verbose=True
-    )
-
-    # Execute parsing
-    parse_result = parse_crew.kickoff() # runs the crew (agent executes the task) and returns the result
-    cleaned = str(parse_result).strip() # str(parse_result).strip() converts it to a plain string and removes extra spaces/newlines.
-
-    # Create rewrite task with cleaned resume
-    t_rewrite = rewrite_for_ats_task(writer, cleaned, job_title, job_description)
-    rewrite_crew = Crew(
-        agents=[writer],
-        tasks=[t_rewrite],
-        process=Process.sequential,
-        verbose=True
-    )
-
-    # Execute rewriting
-    rewrite_result = rewrite_crew.kickoff()
-    rewritten = str(rewrite_result).strip()
-
-    # Create refine task with rewritten resume
-    t_refine = refine_bullets_task(refiner, rewritten)
-    refine_crew = Crew(
-        agents=[refiner],
-        tasks=[t_refine],
-        process=Process.sequential,
-        verbose=True
-    )
-
-    # Execute refining
-    refine_result = refine_crew.kickoff()
-    final_resume = str(refine_result).strip()
-
-    # Create cover letter task
-    t_cover = cover_letter_task(cover_letter_writer, final_resume, job_title, job_description)
-    cover_crew = Crew(
-        agents=[cover_letter_writer],
-        tasks=[t_cover],
-        process=Process.sequential,
-        verbose=True
-    )
-
-    # Execute Cover Letter
-    cover_result = cover_crew.kickoff()
-    cover_letter = str(cover_result).strip()
-
-    # Skill-gap analysis
-    t_skill_gap = skill_gap_task(skill_gap_agent, final_resume, job_title, job_description)
-    skill_gap_crew = Crew(
-        agents=[skill_gap_agent],
-        tasks=[t_skill_gap],
-        process=Process.sequential,
-        verbose=True
-    )
-
-    # Execute Skill-gap analysis
-    skill_gap_result = skill_gap_crew.kickoff()
-    skill_gap_json = str(skill_gap_result).strip()
-
-    # Create evaluation task with final resume
-    t_eval = evaluate_ats_task(evaluator, final_resume, job_title, job_description)
-    eval_crew = Crew(
-        agents=[evaluator],
-        tasks=[t_eval],
-        process=Process.sequential,
-        verbose=True
-    )
-
-    # Execute evaluation
-    eval_result = eval_crew.kickoff()
-    evaluation = str(eval_result).strip()
-
-    return cleaned, rewritten, final_resume, evaluation, cover_letter, skill_gap_json
\ No newline at end of file
+# Returns (cleaned, rewritten, final_resume, evaluation, cover_letter, skill_gap_json).
+# Pass a dict as timings to get the per-stage wall time of this run.
+# mode is "staged" (default, config.PIPELINE_MODE) or "fused" (parse + rewrite + refine in one call).
+# Pass a tracing.RunTrace as trace to get the latency/token/cost spans of every LLM call of this run.
+# job_profile skips the JD analysis when the profile is already known (e.g. batch mode computes it once per JD).
+# label names the run in the results store history (e.g. the resume file name).
+def run_pipeline(raw_resume_text: str, job_title: str, job_description: str, timings: dict = None,
+                 max_workers: int = 3, cleaned_resume: str = None, mode: str = None, trace: RunTrace = None,
+                 job_profile: JobProfile = None, label: str = None):
+    return get_default_pipeline().run(
+        raw_resume_text, job_title, job_description, timings, max_workers, cleaned_resume, mode, trace,
+        job_profile=job_profile, label=label)
+
+# Streaming variant of run_pipeline (see ResumePipeline.stream).
+def stream_pipeline(raw_resume_text: str, job_title: str, job_description: str,
+                    max_workers: int = 3, cleaned_resume: str = None, mode: str = None):
+    return get_default_pipeline().stream(raw_resume_text, job_title, job_description, max_workers, cleaned_resume, mode)
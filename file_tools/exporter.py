@@ -0,0 +1,308 @@
+'''
+Exports resumes and cover letters as styled DOCX and PDF files.
+
+    1) the text is split into blocks once: name line, section headings, role lines, bullets ("-", "*", "•"), paragraphs
+    2) DOCX: every document starts from the same styled base template, built (or read from
+       config.EXPORT_DOCX_TEMPLATE) once per process and kept as bytes
+    3) PDF: drawn directly with fpdf2 (pure Python, no LibreOffice or Word needed)
+    (python-docx and fpdf2 are imported on the first export, so importing this module is cheap)
+    4) the output bytes are cached by a hash of (format, kind, text), so Streamlit reruns and repeated
+       downloads do not build the same file again
+    5) export_zip() packs many documents (e.g. a whole batch run) into one ZIP file
+
+kind="resume" detects the name, headings and role lines; kind="letter" keeps the text as paragraphs (and bullets).
+'''
+import hashlib
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from io import BytesIO
+
+import config
+from ats_scoring import SECTION_PATTERNS
+
+FORMATS = ("docx", "pdf")
+MIME_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+    "zip": "application/zip",
+}
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪●◦‣]|\d+[.)])\s+")
+_SECTION_RE = re.compile("|".join(f"(?:{p})" for p in SECTION_PATTERNS.values()))
+_INLINE_MARKUP_RE = re.compile(r"\*\*|__|`")
+# Characters the built-in PDF fonts (latin-1) cannot draw, mapped to close equivalents
+_PDF_REPLACEMENTS = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-", "•": "-",
+    "…": "...", " ": " ", "→": "->", "−": "-",
+})
+ACCENT_COLOR = (0x1F, 0x3A, 0x5F)
+
+
+# Drops markdown emphasis the LLM sometimes adds (**bold**, __x__, `code`).
+def _clean_inline(text: str) -> str:
+    return _INLINE_MARKUP_RE.sub("", text).strip()
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip()
+    if stripped.startswith("#"):
+        return True
+    heading = stripped.strip(":#*_= ").lower()
+    if not heading or len(heading) > 40:
+        return False
+    letters = [c for c in stripped if c.isalpha()]
+    return bool(_SECTION_RE.fullmatch(heading)) or (bool(letters) and stripped.isupper() and len(heading.split()) <= 5)
+
+'''
+Splits text into (block type, text) pairs: "name", "heading", "role", "bullet", "text" or "blank".
+For resumes, the first line is the name unless it is a section heading ("SUMMARY"), and a plain line right
+before a bullet (e.g. "Data Engineer - Acme (2021 - 2023)") is a role line.
+'''
+def parse_blocks(text: str, kind: str = "resume") -> list:
+    lines = text.splitlines()
+    blocks = []
+    for i, line in enumerate(lines):
+        if not line.strip():
+            if blocks and blocks[-1][0] != "blank":
+                blocks.append(("blank", ""))
+            continue
+        if _BULLET_RE.match(line):
+            blocks.append(("bullet", _clean_inline(_BULLET_RE.sub("", line))))
+        elif kind != "resume":
+            blocks.append(("text", _clean_inline(line)))
+        elif not any(b[0] != "blank" for b in blocks) and not _SECTION_RE.fullmatch(line.strip().strip(":#*_= ").lower()):
+            blocks.append(("name", _clean_inline(line.strip().strip("#= "))))
+        elif _is_heading(line):
+            blocks.append(("heading", _clean_inline(line.strip().strip("#:= "))))
+        elif i + 1 < len(lines) and _BULLET_RE.match(lines[i + 1]) and not line.rstrip().endswith("."):
+            blocks.append(("role", _clean_inline(line)))
+        else:
+            blocks.append(("text", _clean_inline(line)))
+    while blocks and blocks[-1][0] == "blank":
+        blocks.pop()
+    return blocks
+
+
+_template_bytes = None
+_template_lock = threading.Lock()
+_W_SECT_PR = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sectPr" # section properties tag
+
+# Builds the styled base document (fonts, sizes, spacing, margins) that every DOCX export starts from.
+def _build_template() -> bytes:
+    from docx import Document
+    from docx.shared import Inches, Pt, RGBColor
+    doc = Document()
+    section = doc.sections[0]
+    section.left_margin = section.right_margin = Inches(0.8)
+    section.top_margin = section.bottom_margin = Inches(0.7)
+
+    normal = doc.styles["Normal"]
+    normal.font.name = "Calibri"
+    normal.font.size = Pt(10.5)
+    normal.paragraph_format.space_after = Pt(2)
+
+    title = doc.styles["Title"]
+    title.font.name = "Calibri"
+    title.font.size = Pt(20)
+    title.font.color.rgb = RGBColor(*ACCENT_COLOR)
+
+    heading = doc.styles["Heading 1"]
+    heading.font.name = "Calibri"
+    heading.font.size = Pt(12)
+    heading.font.color.rgb = RGBColor(*ACCENT_COLOR)
+    heading.paragraph_format.space_before = Pt(10)
+    heading.paragraph_format.space_after = Pt(3)
+
+    doc.styles["List Bullet"].paragraph_format.space_after = Pt(1)
+    out = BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+# A user template with its body emptied: only its styles, page setup and headers / footers are used,
+# not the sample text in it. The section properties (sectPr, the last element of the body) are kept.
+def _load_template(path: str) -> bytes:
+    from docx import Document
+    doc = Document(path)
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != _W_SECT_PR:
+            body.remove(child)
+    out = BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+# The base template as bytes: config.EXPORT_DOCX_TEMPLATE if set, otherwise the built-in one (built once).
+def template_bytes() -> bytes:
+    global _template_bytes
+    with _template_lock:
+        if _template_bytes is None:
+            if config.EXPORT_DOCX_TEMPLATE:
+                _template_bytes = _load_template(config.EXPORT_DOCX_TEMPLATE)
+            else:
+                _template_bytes = _build_template()
+        return _template_bytes
+
+# Style ids of the styles used, looked up once per document; templates without a style fall back to Normal (None).
+def _style_ids(doc) -> dict:
+    ids = {}
+    for name in ("Title", "Heading 1", "List Bullet"):
+        try:
+            ids[name] = doc.styles[name].style_id
+        except KeyError:
+            ids[name] = None
+    return ids
+
+'''
+Adds a paragraph and sets its style id directly in the XML.
+(python-docx's style= argument searches the whole style table for every paragraph, which made
+styling cost more than the rest of the export put together.)
+'''
+def _add_paragraph(doc, text: str, style_id: str = None):
+    paragraph = doc.add_paragraph(text)
+    if style_id:
+        paragraph._p.get_or_add_pPr().style = style_id
+    return paragraph
+
+def render_docx(text: str, kind: str = "resume") -> bytes:
+    from docx import Document # python-docx is imported on the first export, not with the app
+    doc = Document(BytesIO(template_bytes()))
+    styles = _style_ids(doc)
+    for block, line in parse_blocks(text, kind):
+        if block == "name":
+            _add_paragraph(doc, line, styles["Title"])
+        elif block == "heading":
+            _add_paragraph(doc, line.upper() if kind == "resume" else line, styles["Heading 1"])
+        elif block == "role":
+            doc.add_paragraph().add_run(line).bold = True
+        elif block == "bullet":
+            _add_paragraph(doc, line, styles["List Bullet"])
+        elif block == "text":
+            doc.add_paragraph(line)
+        elif kind != "resume": # blank lines separate the paragraphs of a letter
+            doc.add_paragraph("")
+    out = BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+def _pdf_text(text: str) -> str:
+    return text.translate(_PDF_REPLACEMENTS).encode("latin-1", errors="replace").decode("latin-1")
+
+'''
+Draws the blocks on A4 pages with fpdf2's built-in Helvetica (characters outside latin-1 are
+replaced). Same layout as the DOCX: large name, ruled section headings, bold role lines, indented bullets.
+'''
+def render_pdf(text: str, kind: str = "resume") -> bytes:
+    try:
+        from fpdf import FPDF
+    except ImportError:
+        raise RuntimeError("PDF export needs fpdf2 (pip install fpdf2)")
+    pdf = FPDF(format="A4")
+    pdf.set_margins(20, 18, 20)
+    pdf.set_auto_page_break(True, margin=18)
+    pdf.add_page()
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+
+    for block, line in parse_blocks(text, kind):
+        line = _pdf_text(line)
+        if block == "name":
+            pdf.set_font("Helvetica", "B", 18)
+            pdf.set_text_color(*ACCENT_COLOR)
+            pdf.multi_cell(width, 9, line, new_x="LMARGIN", new_y="NEXT")
+            pdf.set_text_color(0, 0, 0)
+        elif block == "heading":
+            pdf.ln(3)
+            pdf.set_font("Helvetica", "B", 11.5)
+            pdf.set_text_color(*ACCENT_COLOR)
+            pdf.multi_cell(width, 6, line.upper() if kind == "resume" else line, new_x="LMARGIN", new_y="NEXT")
+            pdf.set_draw_color(*ACCENT_COLOR)
+            pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + width, pdf.get_y())
+            pdf.set_text_color(0, 0, 0)
+            pdf.ln(1.5)
+        elif block == "role":
+            pdf.set_font("Helvetica", "B", 10)
+            pdf.multi_cell(width, 5, line, new_x="LMARGIN", new_y="NEXT")
+        elif block == "bullet":
+            pdf.set_font("Helvetica", "", 10)
+            pdf.set_x(pdf.l_margin + 3)
+            pdf.cell(4, 5, "-")
+            pdf.multi_cell(width - 7, 5, line, new_x="LMARGIN", new_y="NEXT")
+        elif block == "text":
+            pdf.set_font("Helvetica", "", 10)
+            pdf.multi_cell(width, 5, line, new_x="LMARGIN", new_y="NEXT")
+        else:
+            pdf.ln(3)
+    return bytes(pdf.output())
+
+_RENDERERS = {"docx": render_docx, "pdf": render_pdf}
+
+
+'''
+Small in-memory LRU of exported files keyed by a hash of (format, kind, text).
+The template path is part of the key, so changing the template gives new files.
+'''
+class ExportCache:
+    def __init__(self, max_items: int = config.EXPORT_CACHE_ITEMS):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(fmt: str, kind: str, text: str) -> str:
+        h = hashlib.blake2b(f"{fmt}|{kind}|{config.EXPORT_DOCX_TEMPLATE}|".encode("utf-8"), digest_size=20)
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def get_or_render(self, fmt: str, kind: str, text: str) -> bytes:
+        key = self.make_key(fmt, kind, text)
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = _RENDERERS[fmt](text, kind)
+        with self._lock:
+            self._items[key] = data
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "items": len(self._items)}
+
+_cache = ExportCache()
+
+def get_export_cache() -> ExportCache:
+    return _cache
+
+
+# Returns the file bytes of text in fmt ("docx" or "pdf"), from the cache when the same text was exported before.
+def export_document(text: str, fmt: str = "docx", kind: str = "resume") -> bytes:
+    if fmt not in _RENDERERS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {FORMATS})")
+    return _cache.get_or_render(fmt, kind, text)
+
+def export_docx(text: str, kind: str = "resume") -> bytes:
+    return export_document(text, "docx", kind)
+
+def export_pdf(text: str, kind: str = "resume") -> bytes:
+    return export_document(text, "pdf", kind)
+
+'''
+Packs many documents into one ZIP file (bytes).
+documents: list of {"name": file name without extension, "text": ..., "kind": "resume" or "letter"}
+Every document is written once per format in formats, e.g. name.docx and name.pdf.
+'''
+def export_zip(documents: list, formats: tuple = FORMATS) -> bytes:
+    out = BytesIO()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for document in documents:
+            for fmt in formats:
+                data = export_document(document["text"], fmt, document.get("kind", "resume"))
+                archive.writestr(f"{document['name']}.{fmt}", data)
+    return out.getvalue()
@@ -0,0 +1,142 @@
+'''
+Extraction cache keyed by the content of the uploaded file.
+
+The same resume gets uploaded again and again, so instead of running detect_and_extract every time:
+    1) hash the file bytes (BLAKE2) together with the extraction limits
+    2) look in a small in-memory LRU (fastest, per process)
+    3) then in an on-disk JSON store (shared by processes and survives restarts)
+    4) only on a miss, extract and store the result in both tiers
+
+Each entry stores the detected ext, the extracted text and the start offset of every page.
+'''
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import config
+from file_tools.file_loader import detect_and_extract_pages, join_pages
+
+# Files are hashed in chunks of this size (make_file_key)
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class ExtractionCache:
+    def __init__(self, directory: str = config.EXTRACT_CACHE_DIR, memory_items: int = config.EXTRACT_CACHE_MEMORY_ITEMS):
+        self.directory = directory
+        self.memory_items = memory_items
+        self._memory = OrderedDict() # key -> entry, most recently used last
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    '''
+    Builds the cache key from the file bytes.
+    The file type is detected from the content, so the name is not part of the key (the same file
+    uploaded as "cv.pdf" and "resume.pdf" is one entry); the extraction limits are, because the same
+    bytes read with a different page cap give a different result.
+    '''
+    @staticmethod
+    def make_key(filename: str, file_bytes: bytes) -> str:
+        h = hashlib.blake2b(file_bytes, digest_size=20)
+        h.update(ExtractionCache._key_suffix())
+        return h.hexdigest()
+
+    # Same key as make_key for the file at path, hashed in chunks so the file is never held in memory.
+    @staticmethod
+    def make_file_key(path: str) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+                h.update(chunk)
+        h.update(ExtractionCache._key_suffix())
+        return h.hexdigest()
+
+    @staticmethod
+    def _key_suffix() -> bytes:
+        return f"|v3|{config.PDF_MAX_PAGES}|{config.EXTRACT_MAX_CHARS}".encode("utf-8")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _remember(self, key: str, entry: dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False) # drop the least recently used entry
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # Writes to a temp file first and renames it, so readers never see half a file.
+    def _write_disk(self, key: str, entry: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # Returns the stored entry for a key (memory first, then disk), or None.
+    def lookup(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return entry
+
+        entry = self._read_disk(key) if self.directory else None
+        if entry is not None:
+            with self._lock:
+                self.hits["disk"] += 1
+                self._remember(key, entry)
+        return entry
+
+    # Stores the extraction result of a key in both tiers (used for results extracted elsewhere, e.g. ingestion workers).
+    def store(self, key: str, ext: str, pages: list) -> dict:
+        text, offsets = join_pages(pages)
+        entry = {"ext": ext, "text": text, "page_offsets": offsets}
+        if self.directory:
+            self._write_disk(key, entry)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, entry)
+        return entry
+
+    # Returns {"ext", "text", "page_offsets"} for the file, extracting it only on a cache miss.
+    def get(self, filename: str, file_bytes: bytes) -> dict:
+        key = self.make_key(filename, file_bytes)
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry
+        ext, pages = detect_and_extract_pages(filename, file_bytes)
+        return self.store(key, ext, pages)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"memory_hits": self.hits["memory"], "disk_hits": self.hits["disk"],
+                    "misses": self.misses, "memory_entries": len(self._memory)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Returns the process-wide extraction cache (created on first use).
+def get_extraction_cache() -> ExtractionCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
+
+# Drop-in replacement for detect_and_extract that goes through the cache. Returns (ext, text).
+def cached_detect_and_extract(filename: str, file_bytes: bytes) -> Tuple[str, str]:
+    entry = get_extraction_cache().get(filename, file_bytes)
+    return entry["ext"], entry["text"]
@@ -1,60 +1,215 @@
+import codecs
 import io # helps treat raw bytes like a file
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import Tuple
-from pypdf import PdfReader
-from docx import Document
-
-''''
-This function gets PDF file data and gives back the extracted text.
-Creates an empty list to collect text from each page.
-Go through each page in the PDF.
-Try to get text from the page. If nothing is found, use an empty string.
-Store the text from this page.
-Combine all page texts into one string separated by new lines.
-'''
-def extract_text_from_pdf(file_bytes: bytes) -> str:
+
+import config
+
+# pypdf and python-docx are imported inside the functions that use them, so importing this module
+# (the UI, the extraction cache, the batch runner) stays cheap until a file is actually extracted.
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = _W_NS + "p" # paragraph element tag (same as docx.oxml.ns.qn("w:p"))
+_W_TBL = _W_NS + "tbl" # table element tag
+
+'''
+PDF extraction comes in three flavours:
+    1) iter_pdf_pages()      -> generator, yields the text of one page at a time (nothing else is kept in memory)
+    2) extract_pdf_pages()   -> list of page texts; for big PDFs the pages can be split into ranges and
+                                extracted in parallel worker processes (workers > 1)
+    3) extract_text_from_pdf() -> all pages joined into one string (what the pipeline uses)
+max_pages / max_chars stop early once enough text exists for the pipeline (0 or None = no limit).
+'''
+def iter_pdf_pages(file_bytes: bytes, start: int = 0, stop: int = None):
+    from pypdf import PdfReader
     reader = PdfReader(io.BytesIO(file_bytes))
+    pages = reader.pages
+    stop = len(pages) if stop is None else min(stop, len(pages))
+    for i in range(start, stop):
+        yield pages[i].extract_text() or "" # Try to get text from the page. If nothing is found, use an empty string.
+
+# Returns the number of pages of a PDF.
+def count_pdf_pages(file_bytes: bytes) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(io.BytesIO(file_bytes)).pages)
+
+# Worker-process entry point: extracts the pages [start, stop) of a PDF.
+def _extract_page_range(file_bytes: bytes, start: int, stop: int) -> list:
+    return list(iter_pdf_pages(file_bytes, start, stop))
+
+def extract_pdf_pages(file_bytes: bytes, max_pages: int = None, max_chars: int = None, workers: int = None) -> list:
+    max_pages = config.PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = config.EXTRACT_MAX_CHARS if max_chars is None else max_chars
+    workers = config.PDF_WORKERS if workers is None else workers
+
+    total = count_pdf_pages(file_bytes)
+    if max_pages:
+        total = min(total, max_pages)
+
     parts = []
-    for page in reader.pages:
-        txt = page.extract_text() or ""
-        parts.append(txt)
-    return "\n".join(parts)
+    chars = 0
+    # Small PDFs (or workers <= 1): read pages one by one and stop as soon as we have enough text
+    if workers <= 1 or total < config.PDF_PARALLEL_MIN_PAGES:
+        for txt in iter_pdf_pages(file_bytes, 0, total):
+            parts.append(txt)
+            chars += len(txt)
+            if max_chars and chars >= max_chars:
+                break
+        return parts
+
+    # Big PDFs: split the pages into ranges and extract them in parallel processes.
+    # Ranges are collected in order, so we can still stop early (and cancel the rest) once max_chars is reached.
+    step = max(1, -(-total // (workers * 2))) # ceil(total / (2 * workers)) pages per range
+    ranges = [(s, min(s + step, total)) for s in range(0, total, step)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_page_range, file_bytes, s, e) for s, e in ranges]
+        for future in futures:
+            for txt in future.result():
+                parts.append(txt)
+                chars += len(txt)
+            if max_chars and chars >= max_chars:
+                for f in futures:
+                    f.cancel()
+                break
+    return parts
+
+def extract_text_from_pdf(file_bytes: bytes, max_pages: int = None, max_chars: int = None, workers: int = None) -> str:
+    # Combine all page texts into one string separated by new lines.
+    return "\n".join(extract_pdf_pages(file_bytes, max_pages=max_pages, max_chars=max_chars, workers=workers))
+
+'''
+Walks a block container (the document body or a table cell) once, in document order,
+and yields the text of every paragraph and every table row (cells joined with "; ").
+Nested tables inside cells are walked the same way.
+'''
+def _iter_block_text(element, parent):
+    from docx.table import Table, _Cell
+    from docx.text.paragraph import Paragraph
+    for child in element.iterchildren():
+        if child.tag == _W_P:
+            yield Paragraph(child, parent).text
+        elif child.tag == _W_TBL:
+            table = Table(child, parent)
+            for tr in child.tr_lst:
+                cells = []
+                for tc in tr.tc_lst: # each physical cell once (row.cells would repeat merged cells)
+                    text = "\n".join(_iter_block_text(tc, _Cell(tc, table))).strip()
+                    if text:
+                        cells.append(text)
+                if cells:
+                    yield "; ".join(cells)
 
 '''
 This function extracts text from a .docx document.
 Convert bytes into a fake file. Open it using Document.
-Read all paragraphs and collect their text.
-Join all paragraphs into one text
+Collect, in one pass over the document:
+    1) header text (once, not once per section/page)
+    2) body paragraphs AND tables, in the order they appear
+    3) footer text
+Join everything into one text.
 '''
 def extract_text_from_docx(file_bytes: bytes) -> str:
+    from docx import Document
     f = io.BytesIO(file_bytes)
     doc = Document(f)
-    parts = []
-    for p in doc.paragraphs:
-        parts.append(p.text)
+
+    headers, footers = [], []
+    for section in doc.sections:
+        # linked headers/footers reuse the previous section's one (reading them would create a new, empty one)
+        if not section.header.is_linked_to_previous:
+            headers.extend(_iter_block_text(section.header._element, section.header))
+        if not section.footer.is_linked_to_previous:
+            footers.extend(_iter_block_text(section.footer._element, section.footer))
+
+    parts = [t for t in headers if t.strip()]
+    parts.extend(_iter_block_text(doc.element.body, doc))
+    parts.extend(t for t in footers if t.strip())
     return "\n".join(parts)
 
 '''
-This function:
-    1) Looks at the file name → identifies file type
-    2) Extracts text using the correct method.
+Detects the file type from its first bytes (magic numbers), not from the file name:
+    %PDF-                                   -> "pdf"  (at the start, after whitespace / NUL bytes only; further
+                                               into the first 1 KB, like PDF readers allow, only after
+                                               junk bytes that are not text: a .txt resume that mentions
+                                               "%PDF-1.4" stays text)
+    PK zip archive with word/document.xml   -> "docx"
+    UTF-16 byte order mark, or no NUL bytes -> "txt"  (UTF-8, Windows-1252, Latin-1, ... see decode_text)
+    anything else (images, old .doc, ...)   -> "bin"
+A resume saved as "resume.pdf.txt" or uploaded without an extension is still read correctly,
+and a renamed binary (NUL bytes, or mostly control bytes) is not decoded into garbage text.
+'''
+def detect_file_type(file_bytes: bytes) -> str:
+    head = file_bytes[:1024]
+    magic = head.find(b"%PDF-")
+    if magic >= 0:
+        prefix = head[:magic].strip(b" \t\r\n\x0c\x00")
+        if not prefix or any(b < 32 and b not in _TEXT_CONTROL_BYTES for b in prefix):
+            return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(file_bytes)) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        return "bin"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "txt"
+    sample = file_bytes[:4096]
+    if b"\x00" in sample:
+        return "bin"
+    control = sum(1 for b in sample if b < 32 and b not in _TEXT_CONTROL_BYTES)
+    if control > len(sample) * _MAX_CONTROL_SHARE:
+        return "bin"
+    return "txt"
 
-Makes file name lowercase to avoid case issues.
+# Control bytes plain text has: tab, line feed, form feed (page break), carriage return, escape
+_TEXT_CONTROL_BYTES = frozenset(b"\t\n\x0c\r\x1b")
+# More control bytes than this share of the first 4 KB means a binary file, not text
+_MAX_CONTROL_SHARE = 0.1
 
 '''
-def detect_and_extract(filename: str, file_bytes: bytes) -> Tuple[str, str]:
-    """Return (ext, text). ext in {pdf, docx, txt}."""
-    low = filename.lower()
-    if low.endswith(".pdf"):
-        return "pdf", extract_text_from_pdf(file_bytes)
-    if low.endswith(".docx"):
-        return "docx", extract_text_from_docx(file_bytes)
-    # Basic text fallback
-    # Try to turn the bytes into simple text
-    # If everything fails means file is unknown (binary), return empty text.
-    try:
-        return "txt", file_bytes.decode("utf-8", errors="ignore")
-    except Exception:
-        return "bin", ""
+Decodes a text file: UTF-16 with a byte order mark, else UTF-8 (with or without BOM), else Windows-1252
+(what Word and Notepad save on Western Windows systems), else Latin-1, which decodes any byte.
+'''
+def decode_text(file_bytes: bytes) -> str:
+    if file_bytes.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return file_bytes.decode("utf-16", errors="ignore")
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            return file_bytes.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    return file_bytes.decode("latin-1")
 
+'''
+This function:
+    1) Looks at the file content → identifies file type (detect_file_type; the name is not used)
+    2) Extracts text using the correct method, as a list of pages
+       (a PDF gives one entry per page; DOCX and TXT give a single entry)
+Unknown binary files give ("bin", [""]).
+'''
+def detect_and_extract_pages(filename: str, file_bytes: bytes) -> Tuple[str, list]:
+    """Return (ext, pages). ext in {pdf, docx, txt, bin}."""
+    ext = detect_file_type(file_bytes)
+    if ext == "pdf":
+        return "pdf", extract_pdf_pages(file_bytes)
+    if ext == "docx":
+        return "docx", [extract_text_from_docx(file_bytes)]
+    if ext == "txt":
+        return "txt", [decode_text(file_bytes)]
+    return "bin", [""]
 
+# Joins pages the same way extract_text_from_pdf does and returns (text, start offset of every page).
+def join_pages(pages: list) -> Tuple[str, list]:
+    offsets = []
+    pos = 0
+    for page in pages:
+        offsets.append(pos)
+        pos += len(page) + 1 # +1 for the "\n" between pages
+    return "\n".join(pages), offsets
 
+def detect_and_extract(filename: str, file_bytes: bytes) -> Tuple[str, str]:
+    """Return (ext, text). ext in {pdf, docx, txt, bin}."""
+    ext, pages = detect_and_extract_pages(filename, file_bytes)
+    return ext, join_pages(pages)[0]
@@ -0,0 +1,289 @@
+'''
+Resume ingestion service: text extraction in a pool of worker processes with limits.
+
+detect_and_extract runs in the caller's process, so one malformed or huge PDF in a batch upload can
+eat all the memory or hang PdfReader for minutes. IngestionPool runs the extraction in separate
+worker processes instead:
+    - per-file timeout: a worker that takes longer than config.INGEST_TIMEOUT_SECONDS is killed and replaced
+    - memory cap: each worker's address space is limited to config.INGEST_MAX_MEMORY_MB (a runaway file
+      fails with MemoryError inside the worker instead of growing the machine), and a worker whose RSS is
+      above config.INGEST_RECYCLE_RSS_MB after a file exits and is replaced
+    - recycling: every worker is replaced after config.INGEST_MAX_FILES_PER_WORKER files (no slow leaks)
+    - results are yielded in completion order, so callers can start on the first resumes right away
+A failing file never stops the batch: it comes back as a result with "error" set.
+The file type is detected from the content (file_loader.detect_file_type), not from the name.
+'''
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+
+import config
+from file_tools.extraction_cache import ExtractionCache, get_extraction_cache
+from file_tools.file_loader import detect_and_extract_pages, join_pages
+
+
+# Current resident memory of this process in MB (from /proc on Linux, else the peak RSS).
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        try:
+            import resource
+        except ImportError:
+            return 0.0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _limit_memory(max_mb: int):
+    if not max_mb:
+        return
+    try:
+        import resource
+        limit = max_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass # not supported on this platform: rely on RSS recycling only
+
+'''
+Worker process main loop: receives (name, path, file_bytes) jobs over conn and sends back result dicts.
+It exits after max_files files, or when its RSS is above recycle_rss_mb after a file (the parent
+starts a new worker); the result of that last file is sent first, with "recycle": True.
+'''
+def _worker_main(conn, max_files: int, max_memory_mb: int, recycle_rss_mb: int):
+    config.PDF_WORKERS = 0 # no nested process pools inside a worker
+    _limit_memory(max_memory_mb)
+    from file_tools.file_loader import detect_and_extract_pages
+
+    done = 0
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        name, path, file_bytes = job
+        start = time.perf_counter()
+        result = {"name": name, "pid": os.getpid()}
+        try:
+            if file_bytes is None:
+                with open(path, "rb") as f:
+                    file_bytes = f.read()
+            result["ext"], result["pages"] = detect_and_extract_pages(name, file_bytes)
+        except MemoryError:
+            result["error"] = f"memory limit exceeded ({max_memory_mb} MB)"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        file_bytes = None
+        done += 1
+        result["seconds"] = round(time.perf_counter() - start, 4)
+        out_of_memory = result.get("error", "").startswith("memory")
+        result["recycle"] = bool(out_of_memory or done >= max_files or
+                                 (recycle_rss_mb and _current_rss_mb() > recycle_rss_mb))
+        conn.send(result)
+        if result["recycle"]:
+            return
+
+
+class _Worker:
+    def __init__(self, ctx, settings: tuple):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, *settings), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job = None # (index, name) of the file being extracted
+        self.started = 0.0
+
+    def send(self, index: int, name: str, path: str, file_bytes: bytes):
+        self.job = (index, name)
+        self.started = time.monotonic()
+        self.conn.send((name, path, file_bytes))
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+'''
+A pool of extraction worker processes (see the module docstring).
+    pool = IngestionPool(workers=4)
+    for result in pool.extract([("cv.pdf", pdf_bytes), "resumes/jane.docx", ...]):
+        ...  # {"index", "name", "ext", "text", "page_offsets", "seconds", "error"} in completion order
+Items are (name, bytes) pairs or file paths (a path is read by the worker, so its bytes never pass
+through the parent). The workers are started on the first extract() and stopped by close() / "with".
+'''
+class IngestionPool:
+    def __init__(self, workers: int = None, timeout: float = None, max_files_per_worker: int = None,
+                 max_memory_mb: int = None, recycle_rss_mb: int = None):
+        self.workers = max(1, config.INGEST_WORKERS if workers is None else workers)
+        self.timeout = config.INGEST_TIMEOUT_SECONDS if timeout is None else timeout
+        self.settings = (
+            config.INGEST_MAX_FILES_PER_WORKER if max_files_per_worker is None else max_files_per_worker,
+            config.INGEST_MAX_MEMORY_MB if max_memory_mb is None else max_memory_mb,
+            config.INGEST_RECYCLE_RSS_MB if recycle_rss_mb is None else recycle_rss_mb,
+        )
+        # forkserver: safe to start from a threaded parent (Streamlit, job queue) and cheap to replace workers.
+        # The server imports the parsers once; every worker forked from it starts with them loaded.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._ctx = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self._ctx.set_forkserver_preload(["file_tools.file_loader", "pypdf", "docx"])
+        self._pool = []
+        self.stats = {"files": 0, "errors": 0, "timeouts": 0, "recycled": 0, "crashed": 0}
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.settings)
+
+    def _replace(self, worker: _Worker, kill: bool = False) -> _Worker:
+        self._pool.remove(worker)
+        worker.stop(kill=kill)
+        new = self._spawn()
+        self._pool.append(new)
+        return new
+
+    def _result(self, index: int, name: str, raw: dict) -> dict:
+        self.stats["files"] += 1
+        if raw.get("error"):
+            self.stats["errors"] += 1
+            return {"index": index, "name": name, "ext": raw.get("ext", "bin"), "text": "", "page_offsets": [],
+                    "seconds": raw.get("seconds"), "error": raw["error"]}
+        text, offsets = join_pages(raw["pages"])
+        return {"index": index, "name": name, "ext": raw["ext"], "text": text, "page_offsets": offsets,
+                "pages": raw["pages"], "seconds": raw.get("seconds"), "error": None}
+
+    # Yields one result per item, in completion order (see the class docstring).
+    def extract(self, items):
+        queue = []
+        for index, item in enumerate(items):
+            if isinstance(item, (str, os.PathLike)):
+                queue.append((index, os.path.basename(item), os.fspath(item), None))
+            else:
+                queue.append((index, item[0], None, item[1]))
+        queue.reverse() # pop() from the end keeps the input order for dispatch
+
+        while len(self._pool) < min(self.workers, len(queue)):
+            self._pool.append(self._spawn())
+
+        while queue or any(w.job for w in self._pool):
+            for worker in self._pool:
+                if worker.job is None and queue:
+                    index, name, path, file_bytes = queue.pop()
+                    try:
+                        worker.send(index, name, path, file_bytes)
+                    except (OSError, ValueError): # the worker died while idle: retry the file on a new one
+                        queue.append((index, name, path, file_bytes))
+                        self._replace(worker, kill=True)
+                        break
+
+            busy = [w for w in self._pool if w.job is not None]
+            if not busy:
+                continue
+            now = time.monotonic()
+            next_deadline = min(w.started + self.timeout for w in busy)
+            ready = wait([w.conn for w in busy], timeout=max(0.0, next_deadline - now))
+
+            for worker in busy:
+                if worker.conn not in ready:
+                    continue
+                (index, name), worker.job = worker.job, None
+                try:
+                    raw = worker.conn.recv()
+                except (EOFError, OSError): # killed by the OS (e.g. out of memory) or crashed
+                    self.stats["crashed"] += 1
+                    self._replace(worker, kill=True)
+                    yield self._result(index, name, {"error": "worker process crashed"})
+                    continue
+                if raw.get("recycle"):
+                    self.stats["recycled"] += 1
+                    self._replace(worker)
+                yield self._result(index, name, raw)
+
+            now = time.monotonic()
+            for worker in [w for w in self._pool if w.job is not None and now - w.started >= self.timeout]:
+                (index, name), worker.job = worker.job, None
+                self.stats["timeouts"] += 1
+                self._replace(worker, kill=True)
+                yield self._result(index, name, {"error": f"timed out after {self.timeout:g}s"})
+
+    def close(self):
+        for worker in self._pool:
+            worker.stop(kill=worker.job is not None)
+        self._pool = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# The result of a file that could not be read or extracted (same fields as IngestionPool results).
+def _error_result(index: int, name: str, error: str, seconds: float = 0.0) -> dict:
+    return {"index": index, "name": name, "ext": "bin", "text": "", "page_offsets": [], "seconds": seconds,
+            "error": error, "cached": False}
+
+# Extracts one item in this process (workers=0); a failing file gives an error result like the pool's.
+def _extract_here(index: int, name: str, key: str, item, cache: ExtractionCache) -> dict:
+    start = time.perf_counter()
+    try:
+        if isinstance(item, (str, os.PathLike)):
+            with open(item, "rb") as f:
+                file_bytes = f.read()
+        else:
+            file_bytes = item[1]
+        entry = cache.store(key, *detect_and_extract_pages(name, file_bytes))
+    except Exception as e:
+        return _error_result(index, name, f"{type(e).__name__}: {e}", round(time.perf_counter() - start, 4))
+    return dict(entry, index=index, name=name, seconds=round(time.perf_counter() - start, 4), error=None, cached=False)
+
+'''
+Extracts many files through the extraction cache and the worker pool, yielding results in completion order.
+Cached files come back first (without touching a worker); the rest are extracted by an IngestionPool and
+stored in the cache. items are file paths or (name, bytes) pairs; every result has "cached": True/False.
+A path is hashed in chunks for the cache lookup and read by the worker that extracts it, so the parent
+never holds the bytes of the batch. With workers=0 (config.INGEST_WORKERS) everything is extracted in
+this process instead. Either way a file that fails comes back with "error" set and the batch goes on.
+'''
+def ingest(items: list, workers: int = None, cache: ExtractionCache = None):
+    cache = cache or get_extraction_cache()
+    workers = config.INGEST_WORKERS if workers is None else workers
+    misses = []
+    for index, item in enumerate(items):
+        try:
+            if isinstance(item, (str, os.PathLike)):
+                name = os.path.basename(item)
+                key = ExtractionCache.make_file_key(item)
+            else:
+                name = item[0]
+                key = ExtractionCache.make_key(name, item[1])
+        except OSError as e: # missing or unreadable file
+            yield _error_result(index, name, f"{type(e).__name__}: {e}")
+            continue
+        entry = cache.lookup(key)
+        if entry is not None:
+            yield dict(entry, index=index, name=name, seconds=0.0, error=None, cached=True)
+        elif workers <= 0:
+            yield _extract_here(index, name, key, item, cache)
+        else:
+            misses.append((index, key, item))
+
+    if not misses:
+        return
+    with IngestionPool(workers=min(workers, len(misses))) as pool:
+        for result in pool.extract([item for _, _, item in misses]):
+            index, key, _ = misses[result["index"]]
+            pages = result.pop("pages", None)
+            if result["error"] is None:
+                cache.store(key, result["ext"], pages)
+            yield dict(result, index=index, cached=False)
@@ -0,0 +1,40 @@
+'''
+One pooled, keep-alive HTTP client shared by every model call in the process.
+
+CrewAI sends model calls through LiteLLM. By default a run can end up opening new connections
+(and paying a new TLS handshake) again and again. Handing LiteLLM a single httpx client with a
+connection pool keeps connections open and reuses them across runs and threads.
+'''
+import threading
+
+import config
+
+_client = None
+_lock = threading.Lock()
+
+
+'''
+Creates the shared client once and registers it with LiteLLM; it lives as long as the process (LiteLLM
+keeps a reference to it, so it is never closed early).
+Returns the client, or None if httpx/litellm are not installed (calls then use LiteLLM's defaults).
+'''
+def configure_shared_http_client():
+    global _client
+    with _lock:
+        if _client is not None:
+            return _client
+        try:
+            import httpx
+            import litellm
+        except ImportError:
+            return None
+        _client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=config.HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT_SECONDS, connect=10.0),
+        )
+        litellm.client_session = _client # used by LiteLLM for every synchronous request
+        return _client
@@ -0,0 +1,212 @@
+'''
+JobProfile: a compact, one-time analysis of a job description.
+
+Without it, every candidate's rewrite / evaluation / cover letter / skill-gap prompt carries its own
+truncated slice of the raw JD, so 500 applicants to one job repeat the same JD work 2000 times.
+Instead, the JD is analyzed once into a JobProfile (required and preferred skills, weighted keywords,
+seniority, must-haves) and that short profile is injected into every downstream prompt.
+
+    - local_job_profile(): deterministic analysis (keyword weights from ats_scoring, sections, seniority)
+    - crew.get_job_profile(): the same plus one LLM call that extracts skills / must-haves, cached here
+    - JobProfileCache: profiles persisted by JD hash (memory + JSON files); concurrent requests for the
+      same JD wait for one analysis instead of all running it
+    - format_job_profile(): the text that goes into the prompts
+'''
+import hashlib
+import json
+import os
+import re
+import threading
+
+import config
+from ats_scoring import extract_jd_keywords
+from schemas import JobProfile, WeightedKeyword
+
+# Bump when the profile format or the analysis changes, so old stored profiles are not reused
+PROFILE_VERSION = 1
+MAX_PROFILE_KEYWORDS = 20
+
+SENIORITY_PATTERNS = [
+    ("principal", r"\b(principal|distinguished|staff)\b"),
+    ("lead", r"\b(lead|head of|manager)\b"),
+    ("senior", r"\b(senior|sr\.?)\b|\b([5-9]|1\d)\+?\s*years"),
+    ("junior", r"\b(junior|jr\.?|entry[- ]level|graduate)\b|\b[0-2]\+?\s*years"),
+    ("intern", r"\b(intern|internship)\b"),
+    ("mid", r"\b(mid[- ]level|intermediate)\b|\b[3-4]\+?\s*years"),
+]
+_PREFERRED_HEADING_RE = re.compile(r"(nice to have|preferred|bonus|plus|desired)", re.IGNORECASE)
+_REQUIRED_HEADING_RE = re.compile(r"(requirement|qualification|must have|you have|what you bring|skills)", re.IGNORECASE)
+_MUST_HAVE_RE = re.compile(r"\b(must|required|requires|\d+\+?\s*years|degree|certifi|clearance)\b", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪●◦‣]|\d+[.)])\s+")
+# Words from section headings that are not skills
+_HEADING_WORDS = {"nice", "plus", "bonus", "preferred", "desired", "requirements", "qualifications", "years", "experience"}
+
+
+# Stable key of a job: the normalized title + JD text.
+def profile_key(job_title: str, job_description: str) -> str:
+    text = " ".join(job_title.lower().split()) + "\n" + " ".join(job_description.split())
+    return hashlib.blake2b(f"v{PROFILE_VERSION}|{text}".encode("utf-8"), digest_size=20).hexdigest()
+
+def detect_seniority(job_title: str, job_description: str) -> str:
+    for text in (job_title, job_description): # the title wins over the body
+        for level, pattern in SENIORITY_PATTERNS:
+            if re.search(pattern, text, re.IGNORECASE):
+                return level
+    return ""
+
+# Weighted keywords from the local ATS scorer (same weights the local score uses).
+def weighted_keywords(job_title: str, job_description: str, limit: int = MAX_PROFILE_KEYWORDS) -> list:
+    keywords = extract_jd_keywords(job_title, job_description, limit * 2)
+    return [WeightedKeyword(term=word, weight=weight) for _, word, weight in keywords if any(c.isalpha() for c in word)][:limit]
+
+'''
+Builds a JobProfile without any LLM call.
+The JD is split by its headings: keywords of the "requirements / qualifications" part are the required
+skills, keywords of the "nice to have / preferred" part (that are not required) the preferred skills.
+Requirement lines that mention years, degrees, "must" or "required" become must-haves.
+'''
+def local_job_profile(job_title: str, job_description: str) -> JobProfile:
+    parts = {"required": [], "preferred": [], "other": []}
+    section = "other"
+    for line in job_description.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not _BULLET_RE.match(line) and len(stripped) < 60:
+            if _PREFERRED_HEADING_RE.search(stripped):
+                section = "preferred"
+            elif _REQUIRED_HEADING_RE.search(stripped):
+                section = "required"
+            elif stripped.endswith(":"):
+                section = "other" # e.g. "Responsibilities:"
+        parts[section].append(stripped)
+
+    # Without a requirements heading, the whole JD (minus the preferred part) counts as required
+    required_text = "\n".join(parts["required"] or parts["other"])
+    required = _skill_terms(required_text, 12)
+    preferred = [t for t in _skill_terms("\n".join(parts["preferred"]), 12) if t not in required][:8]
+    must_haves = [_BULLET_RE.sub("", line)[:160] for line in required_text.splitlines() if _MUST_HAVE_RE.search(line)]
+    return JobProfile(
+        job_title=job_title,
+        seniority=detect_seniority(job_title, job_description),
+        required_skills=required,
+        preferred_skills=preferred,
+        must_haves=must_haves[:6],
+        keywords=weighted_keywords(job_title, job_description),
+    )
+
+# Keyword terms of a text that look like skills (numbers like "3+" and heading words are dropped).
+def _skill_terms(text: str, limit: int) -> list:
+    keywords = extract_jd_keywords("", text, limit * 2)
+    return [word for _, word, _ in keywords if any(c.isalpha() for c in word) and word.lower() not in _HEADING_WORDS][:limit]
+
+# Fills in whatever the LLM left out from the local analysis; keyword weights always come from the local scorer.
+def complete_profile(profile: JobProfile, job_title: str, job_description: str) -> JobProfile:
+    local = local_job_profile(job_title, job_description)
+    return profile.model_copy(update={
+        "job_title": profile.job_title or job_title,
+        "seniority": profile.seniority or local.seniority,
+        "required_skills": profile.required_skills or local.required_skills,
+        "preferred_skills": profile.preferred_skills or local.preferred_skills,
+        "must_haves": profile.must_haves or local.must_haves,
+        "keywords": local.keywords,
+    })
+
+'''
+The profile as compact prompt text, e.g.
+    Role: Data Engineer (senior) - Builds batch and streaming pipelines.
+    Must-haves: 5+ years with Python; BSc in CS
+    Required skills: Python, SQL, Airflow
+    Preferred skills: dbt, Spark
+    Keywords (weight): python 5, sql 3, airflow 2
+'''
+def format_job_profile(profile: JobProfile, max_keywords: int = 15) -> str:
+    role = profile.job_title + (f" ({profile.seniority})" if profile.seniority else "")
+    lines = [f"Role: {role}" + (f" - {profile.summary}" if profile.summary else "")]
+    if profile.must_haves:
+        lines.append("Must-haves: " + "; ".join(profile.must_haves))
+    if profile.required_skills:
+        lines.append("Required skills: " + ", ".join(profile.required_skills))
+    if profile.preferred_skills:
+        lines.append("Preferred skills: " + ", ".join(profile.preferred_skills))
+    if profile.keywords:
+        lines.append("Keywords (weight): " + ", ".join(f"{k.term} {k.weight:g}" for k in profile.keywords[:max_keywords]))
+    return "\n".join(lines)
+
+
+'''
+Profiles by JD hash: an in-memory dict in front of one JSON file per profile.
+get_or_create() makes sure one JD is analyzed only once, even when many threads ask for it at the same time.
+'''
+class JobProfileCache:
+    def __init__(self, directory: str = config.JOB_PROFILE_DIR):
+        self.directory = directory
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._key_locks = {} # key -> lock held while that profile is being built
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return JobProfile.model_validate(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, profile: JobProfile):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(profile.model_dump_json())
+        os.replace(tmp, self._path(key))
+
+    def get(self, job_title: str, job_description: str):
+        key = profile_key(job_title, job_description)
+        with self._lock:
+            profile = self._memory.get(key)
+        if profile is None and self.directory:
+            profile = self._read_disk(key)
+            if profile is not None:
+                with self._lock:
+                    self._memory[key] = profile
+        return profile
+
+    # Returns the stored profile, or builds it with build() (once per JD) and stores it.
+    def get_or_create(self, job_title: str, job_description: str, build) -> JobProfile:
+        key = profile_key(job_title, job_description)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            profile = self.get(job_title, job_description)
+            if profile is not None:
+                with self._lock:
+                    self.hits += 1
+                return profile
+            profile = build()
+            with self._lock:
+                self.misses += 1
+                self._memory[key] = profile
+                self._key_locks.pop(key, None)
+            if self.directory:
+                self._write_disk(key, profile)
+            return profile
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "profiles_in_memory": len(self._memory)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Returns the process-wide profile cache.
+def get_job_profile_cache() -> JobProfileCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = JobProfileCache()
+        return _cache
@@ -0,0 +1,375 @@
+'''
+Job queue so the pipeline can run behind an API instead of inside the Streamlit script thread.
+
+    - JobQueue: a local SQLite-backed queue (no outside services). Submitting (resume bytes, job title, JD)
+      returns a job id; every job has a status: queued -> running -> done / failed.
+    - Leases: a worker refreshes the heartbeat of its running job every config.JOB_HEARTBEAT_SECONDS; a job
+      whose heartbeat is older than config.JOB_STALE_SECONDS (its worker died) is queued again.
+    - Backpressure: submit() raises QueueFullError once config.JOB_MAX_PENDING jobs are waiting.
+    - Workers: N worker processes per box drain the queue (python job_queue.py worker --workers 4).
+    - HTTP API (python job_queue.py serve --port 8080 --workers 4):
+          POST /jobs        {"filename", "resume_b64", "job_title", "job_description"} -> 202 {"job_id"}
+                            (429 when the queue is full)
+          GET  /jobs/<id>   -> {"id", "status", "result", "error", ...}
+          GET  /healthz     -> number of jobs per status
+          GET  /metrics     -> Prometheus-style metrics: queue depth + LLM calls of this process (see tracing.py);
+                               with ATS_METRICS_PORT=P, worker i serves its own LLM metrics on port P + 1 + i
+Streamlit can submit through the Python API and poll status() for the result.
+'''
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, path: str = config.JOB_DB_PATH, max_pending: int = config.JOB_MAX_PENDING):
+        self.path = path
+        self.max_pending = max_pending
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL,"
+                " filename TEXT NOT NULL, resume BLOB, job_title TEXT NOT NULL, job_description TEXT NOT NULL,"
+                " result TEXT, error TEXT, worker TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL, started REAL, finished REAL, heartbeat REAL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat" not in columns: # queue file created before leases existed
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created)")
+
+    '''
+    One short-lived connection per operation, so the queue is safe to use from many threads and processes.
+    Callers close it (closing() / try-finally): sqlite3's own "with conn" only commits, it does not close.
+    '''
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    # Adds a job and returns its id. Raises QueueFullError when too many jobs are waiting.
+    def submit(self, filename: str, resume_bytes: bytes, job_title: str, job_description: str) -> str:
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE") # the count + insert must be atomic across processes
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if pending >= self.max_pending:
+                conn.execute("ROLLBACK")
+                raise QueueFullError(f"{pending} jobs are already waiting; try again later.")
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, resume, job_title, job_description, created)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, resume_bytes, job_title, job_description, time.time()),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return job_id
+
+    '''
+    Takes the oldest queued job for a worker (marks it running) and returns it as a dict,
+    or None when the queue is empty. BEGIN IMMEDIATE makes sure two workers never claim the same job.
+    '''
+    def claim(self, worker_id: str):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, filename, resume, job_title, job_description FROM jobs"
+                " WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started = ?, heartbeat = ?, attempts = attempts + 1"
+                " WHERE id = ?",
+                (worker_id, now, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return {"id": row[0], "filename": row[1], "resume": row[2], "job_title": row[3], "job_description": row[4]}
+
+    '''
+    Stores the result of a finished job (the resume bytes are dropped, they are no longer needed).
+    complete() and fail() only touch a job the worker still owns: they return False, and change nothing,
+    when the job was requeued (lease lost) and possibly claimed by another worker in the meantime.
+    '''
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, resume = NULL, finished = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id),
+            )
+            return cur.rowcount > 0
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, resume = NULL, finished = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (error, time.time(), job_id, worker_id),
+            )
+            return cur.rowcount > 0
+
+    # Refreshes the lease of a running job. Returns False when the worker no longer owns it (it was requeued).
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), job_id, worker_id),
+            )
+            return cur.rowcount > 0
+
+    # Puts jobs back in the queue whose worker died while running them (no heartbeat for older_than_seconds).
+    def requeue_stale(self, older_than_seconds: float = config.JOB_STALE_SECONDS) -> int:
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL"
+                " WHERE status = 'running' AND COALESCE(heartbeat, started) < ?",
+                (time.time() - older_than_seconds,),
+            )
+            return cur.rowcount
+
+    # Returns the public view of a job (no resume bytes), or None if the id is unknown.
+    def status(self, job_id: str):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, status, job_title, result, error, attempts, created, started, finished FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "status", "job_title", "result", "error", "attempts", "created", "started", "finished"), row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        # How many jobs are ahead of this one (useful for "position in queue" in the UI)
+        if job["status"] == "queued":
+            with closing(self._connect()) as conn:
+                job["position"] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?", (job["created"],)).fetchone()[0]
+        return job
+
+    def counts(self) -> dict:
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+# Runs one job: extract the resume and run the whole pipeline. Returns the result dict stored with the job.
+def process_job(job: dict) -> dict:
+    from crew import run_pipeline # imported here so the API process does not load crewai
+    from file_tools.extraction_cache import get_extraction_cache
+    from prompt_budget import drop_page_furniture
+    from tracing import RunTrace
+
+    entry = get_extraction_cache().get(job["filename"], job["resume"])
+    raw_text = drop_page_furniture(entry["text"], entry.get("page_offsets"))
+    if not raw_text.strip():
+        raise ValueError("Could not extract any text from the file.")
+    timings = {}
+    trace = RunTrace(job["id"][:12], tenant=f"job-{job['id'][:12]}") # each job queues fairly against the others
+    outputs = run_pipeline(raw_text, job["job_title"], job["job_description"], timings=timings, trace=trace,
+                           label=job["filename"])
+    result = dict(zip(("cleaned", "rewritten", "final_resume", "evaluation", "cover_letter", "skill_gap"), outputs))
+    result["timings"] = timings
+    result["trace"] = trace.to_dict()
+    return result
+
+'''
+Refreshes the lease of a running job every config.JOB_HEARTBEAT_SECONDS until stop is set.
+If the worker no longer owns the job (it was requeued, e.g. after the database was unreachable for longer
+than config.JOB_STALE_SECONDS), lost is set and the beats stop.
+'''
+def _keep_alive(queue: JobQueue, job_id: str, worker_id: str, stop: threading.Event, lost: threading.Event):
+    while not stop.wait(config.JOB_HEARTBEAT_SECONDS):
+        try:
+            if not queue.heartbeat(job_id, worker_id):
+                lost.set()
+                return
+        except sqlite3.Error:
+            pass # a busy database: try again on the next beat
+
+'''
+Worker loop: claim a job, run it (refreshing its lease in a background thread), store the result, repeat.
+When the queue is empty it requeues jobs of dead workers and sleeps poll_interval seconds. Stops after
+max_jobs jobs (if set) or when the process gets SIGTERM/SIGINT (the current job is finished first).
+If metrics_port is set, the worker serves its LLM call metrics on http://<host>:<metrics_port>/metrics.
+'''
+def run_worker(db_path: str = config.JOB_DB_PATH, worker_id: str = None,
+               poll_interval: float = config.JOB_POLL_SECONDS, max_jobs: int = None, metrics_port: int = 0):
+    queue = JobQueue(db_path)
+    from startup import warm_up
+    warm_up(background=False) # pay for the crewai / parser imports before the first job, not during it
+    if metrics_port:
+        from tracing import start_metrics_server
+        start_metrics_server(metrics_port)
+    worker_id = worker_id or f"{os.uname().nodename}:{os.getpid()}"
+    stopping = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.append(True))
+
+    done = 0
+    while not stopping and (max_jobs is None or done < max_jobs):
+        job = queue.claim(worker_id)
+        if job is None:
+            queue.requeue_stale()
+            time.sleep(poll_interval)
+            continue
+        stop, lost = threading.Event(), threading.Event()
+        threading.Thread(target=_keep_alive, args=(queue, job["id"], worker_id, stop, lost), daemon=True).start()
+        try:
+            result = process_job(job)
+        except Exception as e:
+            stored = not lost.is_set() and queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}")
+        else:
+            stored = not lost.is_set() and queue.complete(job["id"], worker_id, result)
+        finally:
+            stop.set()
+        if not stored:
+            print(f"Job {job['id']} was requeued while {worker_id} ran it (lease lost); its result was dropped.",
+                  file=sys.stderr)
+        done += 1
+
+'''
+Starts n worker processes and returns them (stop them with stop_workers). They are not daemonic: a daemonic
+process cannot start children, and extract_pdf_pages runs big PDFs in a process pool (config.PDF_WORKERS).
+'''
+def start_workers(n: int, db_path: str = config.JOB_DB_PATH) -> list:
+    JobQueue(db_path).requeue_stale() # jobs left "running" by workers that died before
+    workers = []
+    for i in range(n):
+        metrics_port = config.METRICS_PORT + 1 + i if config.METRICS_PORT else 0
+        p = multiprocessing.Process(target=run_worker, args=(db_path, None), kwargs={"metrics_port": metrics_port},
+                                    name=f"ats-worker-{i}")
+        p.start()
+        workers.append(p)
+    return workers
+
+# Asks the workers to stop (SIGTERM: each finishes its current job first) and waits for them.
+def stop_workers(workers: list, timeout: float = None):
+    for p in workers:
+        if p.is_alive():
+            p.terminate()
+    for p in workers:
+        p.join(timeout)
+        if p.is_alive(): # still busy after timeout seconds
+            p.kill()
+            p.join()
+
+
+# HTTP handler for the small JSON API.
+class JobRequestHandler(BaseHTTPRequestHandler):
+    queue = None # set by serve()
+
+    def _send(self, code: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+            if length > config.JOB_MAX_UPLOAD_BYTES:
+                return self._send(413, {"error": "upload too large"})
+            data = json.loads(self.rfile.read(length))
+            if not isinstance(data, dict):
+                return self._send(400, {"error": "bad request: the body must be a JSON object"})
+            wrong = [k for k in ("resume_b64", "job_title", "job_description", "filename")
+                     if k in data and not isinstance(data[k], str)]
+            if wrong:
+                return self._send(400, {"error": f"bad request: {', '.join(wrong)} must be strings"})
+            resume = base64.b64decode(data["resume_b64"])
+            job_id = self.queue.submit(data.get("filename", "resume.pdf"), resume, data["job_title"], data["job_description"])
+        except QueueFullError as e:
+            return self._send(429, {"error": str(e)})
+        except (KeyError, ValueError) as e:
+            return self._send(400, {"error": f"bad request: {e}"})
+        self._send(202, {"job_id": job_id})
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/healthz":
+            return self._send(200, self.queue.counts())
+        if self.path.rstrip("/") == "/metrics":
+            from tracing import render_metrics
+            # Queue depth per status, plus whatever LLM calls ran in this process
+            gauges = "".join(f'ats_jobs{{status="{status}"}} {n}\n' for status, n in sorted(self.queue.counts().items()))
+            body = ("# TYPE ats_jobs gauge\n" + gauges + render_metrics()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        if self.path.startswith("/jobs/"):
+            job = self.queue.status(self.path[len("/jobs/"):].strip("/"))
+            return self._send(200, job) if job else self._send(404, {"error": "unknown job"})
+        self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args): # keep the console quiet
+        pass
+
+# Runs the HTTP API (and optionally n workers in the same box) until interrupted.
+def serve(host: str = "0.0.0.0", port: int = 8080, workers: int = 0, db_path: str = config.JOB_DB_PATH):
+    JobRequestHandler.queue = JobQueue(db_path)
+    procs = start_workers(workers, db_path) if workers else []
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    print(f"Job API on http://{host}:{port} with {len(procs)} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stop_workers(procs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATS pipeline job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    srv = sub.add_parser("serve", help="Run the HTTP API (and optionally workers)")
+    srv.add_argument("--host", default="0.0.0.0")
+    srv.add_argument("--port", type=int, default=8080)
+    srv.add_argument("--workers", type=int, default=config.JOB_WORKERS)
+    wrk = sub.add_parser("worker", help="Run worker processes only")
+    wrk.add_argument("--workers", type=int, default=config.JOB_WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.workers)
+    else:
+        procs = start_workers(args.workers)
+        print(f"Started {len(procs)} workers on {config.JOB_DB_PATH}")
+        try:
+            for p in procs:
+                p.join()
+        except KeyboardInterrupt:
+            stop_workers(procs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+'''
+Robust JSON extraction for LLM outputs (evaluator, skill-gap, ...).
+
+LLMs often wrap JSON in ```json fences, add a sentence before/after it, use single quotes,
+or leave trailing commas. Instead of re-running the whole stage, this module:
+    1) pulls the first JSON object out of the text (fences and chatty text are ignored)
+    2) tolerates single quotes, trailing commas and Python literals (True/False/None)
+    3) validates the object against a Pydantic schema (optional)
+    4) if all of that fails, calls a repair function ONCE (a small, cheap LLM call) and tries again
+'''
+import ast
+import json
+import re
+
+from pydantic import ValidationError
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+'''
+Returns the first balanced {...} block of text (or None).
+Braces inside strings (single- or double-quoted) are skipped, so "a } in a string" doesn't end the object.
+'''
+def find_json_object(text: str):
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        quote = None
+        escaped = False
+        for i in range(start, len(text)):
+            c = text[i]
+            if quote:
+                if escaped:
+                    escaped = False
+                elif c == "\\":
+                    escaped = True
+                elif c == quote:
+                    quote = None
+            elif c in ("'", '"'):
+                quote = c
+            elif c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+        start = text.find("{", start + 1) # unbalanced: try the next opening brace
+    return None
+
+'''
+Rewrites "loose" JSON into strict JSON:
+    - 'single quoted' strings -> "double quoted" (apostrophes inside double-quoted strings are kept)
+    - True/False/None -> true/false/null (outside strings)
+    - trailing commas before } or ] are removed
+'''
+def loosen_to_json(candidate: str) -> str:
+    out = []
+    quote = None
+    i = 0
+    while i < len(candidate):
+        c = candidate[i]
+        if quote:
+            if c == "\\" and i + 1 < len(candidate):
+                nxt = candidate[i + 1]
+                # \' is not a valid JSON escape; a plain ' is fine inside a double-quoted string
+                out.append("'" if nxt == "'" else c + nxt)
+                i += 2
+                continue
+            if c == quote:
+                out.append('"')
+                quote = None
+            elif c == '"' and quote == "'":
+                out.append('\\"') # a double quote inside a single-quoted string must be escaped
+            else:
+                out.append(c)
+        elif c in ("'", '"'):
+            quote = c
+            out.append('"')
+        elif c.isalpha():
+            j = i
+            while j < len(candidate) and candidate[j].isalpha():
+                j += 1
+            word = candidate[i:j]
+            out.append(_PY_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(c)
+        i += 1
+    return _TRAILING_COMMA_RE.sub(r"\1", "".join(out))
+
+# Extracts the first JSON object from LLM output. Returns a dict, or None if nothing usable is found.
+def extract_json(text: str):
+    if not text:
+        return None
+    fenced = _FENCE_RE.search(text)
+    sources = [fenced.group(1), text] if fenced else [text]
+    for source in sources:
+        candidate = find_json_object(source)
+        if candidate is None:
+            continue
+        for attempt in (lambda: json.loads(candidate),
+                        lambda: json.loads(loosen_to_json(candidate)),
+                        lambda: ast.literal_eval(candidate)):
+            try:
+                value = attempt()
+            except (ValueError, SyntaxError, MemoryError, RecursionError):
+                continue
+            if isinstance(value, dict):
+                return value
+    return None
+
+# Validates obj against a Pydantic schema. Returns the normalized dict, or None if it doesn't fit.
+def _validate(obj, schema):
+    if obj is None:
+        return None
+    if schema is None:
+        return obj
+    try:
+        return schema.model_validate(obj).model_dump()
+    except ValidationError:
+        return None
+
+'''
+Parses structured LLM output.
+    text:   the raw LLM output
+    schema: optional Pydantic model the JSON must match
+    repair: optional function(text, schema) -> new text; called at most once, only if parsing fails
+Returns the parsed (and validated) dict, or None.
+'''
+def parse_structured(text: str, schema=None, repair=None):
+    parsed = _validate(extract_json(text), schema)
+    if parsed is not None or repair is None:
+        return parsed
+    try:
+        repaired = repair(text, schema)
+    except Exception:
+        return None
+    return _validate(extract_json(repaired), schema)
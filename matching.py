@@ -0,0 +1,212 @@
+'''
+Bulk keyword matching of many resumes against a job description (no LLM calls).
+
+ResumeIndex builds a sparse BM25 term matrix (resumes x terms) once, saves it to disk in a compact
+SciPy/NumPy format, and scores a JD against ALL resumes with a single sparse matrix-vector product.
+search() returns the top-k resumes with their matched and missing JD keywords.
+
+shortlist_skill_gap() then runs the (expensive) skill-gap LLM stage only on the shortlisted candidates.
+
+CLI usage:
+    python matching.py build resumes/ index_dir/
+    python matching.py search index_dir/ jd.txt --title "Data Engineer" --top-k 20
+'''
+import argparse
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+
+import config
+from ats_scoring import extract_jd_keywords
+from file_tools.ingestion import ingest
+from text_processing import terms
+
+# BM25 parameters (standard defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+MATRIX_FILE = "matrix.npz"
+META_FILE = "meta.json"
+
+
+class ResumeIndex:
+    def __init__(self, ids: list, vocab: dict, matrix, texts: list = None):
+        self.ids = ids # row i of the matrix belongs to ids[i]
+        self.vocab = vocab # term -> column
+        self.matrix = matrix # CSR matrix of BM25 weights, shape (len(ids), len(vocab))
+        self.texts = texts # optional raw resume texts (needed to run the LLM on a shortlist)
+
+    '''
+    Builds the index from (id, text) pairs.
+        1) tokenize + lemmatize every resume (same rules as the local ATS scorer)
+        2) count term frequencies into a sparse matrix
+        3) turn counts into BM25 weights, so scoring a query is just matrix @ query_vector
+    '''
+    @classmethod
+    def build(cls, documents, store_text: bool = True):
+        ids, texts = [], []
+        vocab = {}
+        rows, cols, vals = [], [], []
+        for row, (doc_id, text) in enumerate(documents):
+            ids.append(str(doc_id))
+            texts.append(text)
+            counts = {}
+            for term in terms(text):
+                col = vocab.setdefault(term, len(vocab))
+                counts[col] = counts.get(col, 0) + 1
+            rows.extend([row] * len(counts))
+            cols.extend(counts.keys())
+            vals.extend(counts.values())
+
+        tf = sparse.csr_matrix(
+            (np.asarray(vals, dtype=np.float32), (np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32))),
+            shape=(len(ids), len(vocab)),
+        )
+        return cls(ids, vocab, _bm25_weights(tf), texts if store_text else None)
+
+    # Builds the index straight from resume files (.pdf/.docx/.txt), extracted by the ingestion workers
+    # (through the extraction cache) and indexed as they finish; files that fail are skipped.
+    # The id of a resume is its path relative to the folder all the files share (see _document_ids).
+    @classmethod
+    def build_from_files(cls, paths: list, store_text: bool = True):
+        ids = _document_ids(paths)
+        def documents():
+            for result in ingest(paths):
+                if result["error"] is None:
+                    yield ids[result["index"]], result["text"]
+        return cls.build(documents(), store_text=store_text)
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        sparse.save_npz(os.path.join(directory, MATRIX_FILE), self.matrix, compressed=True)
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "vocab": self.vocab, "texts": self.texts}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str):
+        matrix = sparse.load_npz(os.path.join(directory, MATRIX_FILE)).tocsr()
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(meta["ids"], meta["vocab"], matrix, meta.get("texts"))
+
+    '''
+    Scores every resume against a job description in one sparse matrix product.
+    The query vector holds the JD keyword weights (same keywords the local ATS scorer uses).
+    Returns the top_k resumes as dicts: {"id", "score", "matched_terms", "missing_terms"};
+    resumes that match none of the keywords (score 0) are never returned, so there can be fewer than top_k.
+    '''
+    def search(self, job_description: str, job_title: str = "", top_k: int = 10) -> list:
+        keywords = extract_jd_keywords(job_title, job_description)
+        query = np.zeros(len(self.vocab), dtype=np.float32)
+        for lemma, _, weight in keywords:
+            col = self.vocab.get(lemma)
+            if col is not None:
+                query[col] = weight
+        if not len(self.ids) or not query.any():
+            return []
+
+        scores = self.matrix @ query # one score per resume
+        matching_rows = np.flatnonzero(scores > 0)
+        k = min(top_k, len(matching_rows))
+        if k <= 0:
+            return []
+        top = matching_rows[np.argpartition(-scores[matching_rows], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for row in top:
+            present = set(self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]])
+            matched, missing = [], []
+            for lemma, word, _ in keywords:
+                col = self.vocab.get(lemma)
+                (matched if col is not None and col in present else missing).append(word)
+            results.append({
+                "id": self.ids[row],
+                "score": round(float(scores[row]), 4),
+                "matched_terms": matched,
+                "missing_terms": missing,
+            })
+        return results
+
+
+'''
+Ids for resume files: the path relative to the deepest folder they all share, so files in one folder keep
+their plain file name and files with the same name in different folders ("a/cv.pdf", "b/cv.pdf") stay apart.
+Paths on different drives (Windows) have no shared folder and keep their absolute path.
+'''
+def _document_ids(paths: list) -> list:
+    full = [os.path.abspath(path) for path in paths]
+    if not full:
+        return []
+    try:
+        root = os.path.commonpath([os.path.dirname(path) for path in full])
+    except ValueError:
+        return full
+    return [os.path.relpath(path, root) for path in full]
+
+# Converts a term-frequency matrix into BM25 document weights.
+def _bm25_weights(tf):
+    n_docs = tf.shape[0]
+    if n_docs == 0:
+        return tf
+    doc_len = np.asarray(tf.sum(axis=1)).ravel()
+    avg_len = doc_len.mean() or 1.0
+    df = np.bincount(tf.indices, minlength=tf.shape[1])
+    idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    weights = tf.copy()
+    row_of_value = np.repeat(np.arange(n_docs), np.diff(weights.indptr))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[row_of_value] / avg_len)
+    weights.data = (idf[weights.indices] * weights.data * (BM25_K1 + 1) / (weights.data + norm)).astype(np.float32)
+    return weights
+
+'''
+Shortlists resumes with the index, then runs the skill-gap LLM stage only on the top_k of them.
+Returns the search results with an extra "skill_gap" field per candidate.
+'''
+def shortlist_skill_gap(index: ResumeIndex, job_title: str, job_description: str, top_k: int = 10) -> list:
+    from crew import get_job_profile, run_skill_gap # imported here so matching alone does not need crewai
+    if index.texts is None:
+        raise ValueError("This index was built without resume texts (store_text=False).")
+    positions = {doc_id: i for i, doc_id in enumerate(index.ids)}
+    shortlist = index.search(job_description, job_title, top_k=top_k)
+    job_profile = get_job_profile(job_title, job_description) if config.USE_JOB_PROFILE else None
+    for candidate in shortlist:
+        resume_text = index.texts[positions[candidate["id"]]]
+        candidate["skill_gap"] = run_skill_gap(resume_text, job_title, job_description, job_profile=job_profile)
+    return shortlist
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query a BM25 resume index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Index a directory of resumes")
+    build.add_argument("resumes_dir")
+    build.add_argument("index_dir")
+
+    search = sub.add_parser("search", help="Rank indexed resumes against a job description file")
+    search.add_argument("index_dir")
+    search.add_argument("jd_file")
+    search.add_argument("--title", default="")
+    search.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        paths = [os.path.join(args.resumes_dir, n) for n in sorted(os.listdir(args.resumes_dir))
+                 if n.lower().endswith((".pdf", ".docx", ".txt"))]
+        index = ResumeIndex.build_from_files(paths)
+        index.save(args.index_dir)
+        print(f"Indexed {len(index.ids)} resumes, {len(index.vocab)} terms -> {args.index_dir}")
+    else:
+        index = ResumeIndex.load(args.index_dir)
+        with open(args.jd_file, "r", encoding="utf-8", errors="ignore") as f:
+            jd = f.read()
+        for rank, hit in enumerate(index.search(jd, args.title, args.top_k), start=1):
+            print(f"{rank:>3}. {hit['id']}  score={hit['score']}  missing={', '.join(hit['missing_terms'][:8])}")
+
+
+if __name__ == "__main__":
+    main()
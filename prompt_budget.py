@@ -0,0 +1,180 @@
+'''
+Prompt budget: every piece of resume / job text goes through here before it is put into a prompt.
+
+The task builders used to cut their inputs at fixed character counts ([:1500], [:800], ...), which
+spent the budget on whitespace and PDF noise and cut in the middle of a word. Instead:
+    1) compress_text(): collapse whitespace, fix PDF artifacts (ligatures, "(cid:12)", soft hyphens,
+       words hyphenated across lines, bullet glyphs, rule lines)
+    2) drop low-value lines: street addresses (config.PROMPT_DROP_ADDRESSES); page numbers and the
+       headers/footers PDF extraction repeats on every page are dropped earlier, by drop_page_furniture() on
+       the extracted text and its page offsets (the pipeline only gets the joined text, where a "12" line
+       can be real content)
+    3) fit_tokens(): cut to the stage's token budget (config.PROMPT_BUDGETS / PROMPT_JOB_BUDGETS), counted
+       with the tokenizer of the model (tokens.count_tokens), at a line or word boundary
+    4) the tokens saved per stage are recorded in the run trace and the /metrics counters (tracing.py)
+'''
+import re
+
+import config
+from tokens import get_encoder, count_tokens
+from tracing import record_prompt_budget
+from agents import MODEL
+
+# Ligatures and invisible characters PDF text extraction leaves behind
+_ARTIFACTS = str.maketrans({
+    "ﬀ": "ff", "ﬁ": "fi", "ﬂ": "fl", "ﬃ": "ffi", "ﬄ": "ffl", "ﬅ": "st", "ﬆ": "st",
+    "­": "", "​": "", "‌": "", "‍": "", "⁠": "", "﻿": "",
+    " ": " ", " ": " ", " ": " ", "\t": " ", "\r": "",
+})
+_CID_RE = re.compile(r"\(cid:\d+\)")
+# A line that ends in a hyphen followed by a lowercase word ("well-\nknown"): joined, keeping the hyphen
+_HYPHEN_BREAK_RE = re.compile(r"([a-z])-\n([a-z])")
+_SPACES_RE = re.compile(r"[ \f\v]{2,}")
+_BULLET_GLYPH_RE = re.compile(r"^[•●▪◦‣■□➢►▶✓✔❖]+\s*")
+_PAGE_NUMBER_RE = re.compile(r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|[-–]?\s*\d{1,3}\s*[-–]?|\d{1,3}\s*/\s*\d{1,3})$", re.IGNORECASE)
+_RULE_RE = re.compile(r"^[_=\-–—.*~·\s]{4,}$")
+# "123 Main Street", "42B Baker St.", "Address: ..." (city / country alone is kept: it can matter for the job)
+# (the street name must be capitalized, so "3 years on the way" is not an address)
+_ADDRESS_RE = re.compile(
+    r"^(?:(?i:(?:home\s+|mailing\s+)?address)\s*:.*|\d{1,6}[A-Za-z]?\s+(?:[A-Z0-9][\w.'-]*\s+){1,4}"
+    r"(?i:street|st|avenue|ave|road|rd|boulevard|blvd|lane|ln|drive|dr|court|ct|way|place|pl|terrace|"
+    r"parkway|pkwy|highway|hwy|square|sq|strasse|straße)\b\.?(?:\s*(?:,|#|(?i:apt|suite|unit)\b).*)?)$")
+# Separators of a one-line contact block ("Jane Doe | 1 Main St, Springfield | jane@example.com")
+_CONTACT_SPLIT_RE = re.compile(r"\s+[|•·]\s+")
+# Lines longer than this are content, never a page header / footer
+_MAX_HEADER_CHARS = 80
+# How many lines at the top and at the bottom of a page can be a header / footer
+_EDGE_LINES = 3
+_BULLET_LINE_RE = re.compile(r"^[-*•●▪◦‣■□➢►▶✓✔❖]")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+# Removes street-address parts of a line; returns None when nothing else is left.
+def _drop_address(line: str):
+    parts = _CONTACT_SPLIT_RE.split(line)
+    kept = [p for p in parts if not _ADDRESS_RE.match(p.strip())]
+    if len(kept) == len(parts):
+        return line
+    return " | ".join(kept) if kept else None
+
+'''
+Drops page numbers and page headers / footers (name, contact line) that PDF extraction leaves at the top
+or bottom of every page. page_offsets are the start offsets of the pages in text, as the extraction cache
+stores them. Only the first / last _EDGE_LINES lines of a page are looked at: a page number line there
+("3", "- 3 -", "Page 2 of 3") is dropped, and so is a line that is at a page edge on at least two pages
+(digits ignored), except for its first copy. The same text inside a page (a job title under EXPERIENCE
+that is also in the header, a "12" line) is never dropped, and single-page or non-paged text (no offsets:
+DOCX, TXT, pasted text) comes back as it is.
+'''
+def drop_page_furniture(text: str, page_offsets: list = None) -> str:
+    if not text or not config.PROMPT_DROP_REPEATED_LINES or not page_offsets or len(page_offsets) < 2:
+        return text
+    bounds = list(page_offsets) + [len(text) + 1] # pages are joined with one "\n" (file_loader.join_pages)
+    pages = [text[bounds[i]:max(bounds[i], bounds[i + 1] - 1)].split("\n") for i in range(len(page_offsets))]
+
+    edges = [] # per page: {line index: key} of its edge lines (None for a page number)
+    pages_with = {} # key -> number of pages that have it at an edge
+    for lines in pages:
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        page_edges = {}
+        for i in content[:_EDGE_LINES] + content[-_EDGE_LINES:]:
+            line = lines[i].strip()
+            if _PAGE_NUMBER_RE.match(line):
+                page_edges[i] = None
+            elif len(line) <= _MAX_HEADER_CHARS and not _BULLET_LINE_RE.match(line):
+                page_edges[i] = _DIGITS_RE.sub("#", line.lower())
+        for key in set(page_edges.values()) - {None}:
+            pages_with[key] = pages_with.get(key, 0) + 1
+        edges.append(page_edges)
+
+    seen = set()
+    kept_pages = []
+    for lines, page_edges in zip(pages, edges):
+        kept = []
+        for i, line in enumerate(lines):
+            if i in page_edges and page_edges[i] is None: # page number
+                continue
+            key = page_edges.get(i)
+            if key is not None and pages_with[key] > 1:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        kept_pages.append("\n".join(kept))
+    return "\n".join(kept_pages)
+
+'''
+Cleans text for a prompt: steps 1) and 2) of the module docstring.
+Returns the text with single spaces, no trailing spaces, "-" bullets and at most one blank line in a row.
+'''
+def compress_text(text: str, drop_addresses: bool = None) -> str:
+    if not text:
+        return ""
+    drop_addresses = config.PROMPT_DROP_ADDRESSES if drop_addresses is None else drop_addresses
+    text = _CID_RE.sub("", text.translate(_ARTIFACTS))
+    text = _HYPHEN_BREAK_RE.sub(r"\1-\2", text) # "co-\nfounder" -> "co-founder"
+
+    lines = []
+    for line in text.split("\n"):
+        line = _SPACES_RE.sub(" ", line).strip()
+        if line and _RULE_RE.match(line):
+            continue
+        line = _BULLET_GLYPH_RE.sub("- ", line)
+        if line and drop_addresses:
+            line = _drop_address(line)
+            if line is None:
+                continue
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip()
+
+# Returns (text cut to at most max_tokens tokens, its token count); the cut ends at a line break or a space.
+def _fit(text: str, max_tokens: int, model: str) -> tuple:
+    encoder = get_encoder(model)
+    if encoder is None:
+        tokens = count_tokens(text, model)
+        if tokens <= max_tokens:
+            return text, tokens
+        cut = text[:max_tokens * 4]
+    else:
+        encoded = encoder.encode(text, disallowed_special=())
+        if len(encoded) <= max_tokens:
+            return text, len(encoded)
+        cut = encoder.decode(encoded[:max(1, max_tokens - 2)]) # 2 tokens left for the " ..." marker
+    line_end = cut.rfind("\n")
+    if line_end >= len(cut) * 0.7: # end on a whole line unless that loses too much
+        cut = cut[:line_end]
+    elif cut.rfind(" ") > 0:
+        cut = cut[:cut.rfind(" ")]
+    cut = cut.rstrip() + " ..."
+    return cut, count_tokens(cut, model)
+
+# Cuts text to at most max_tokens tokens of model (text that fits is returned as it is).
+def fit_tokens(text: str, max_tokens: int, model: str = MODEL) -> str:
+    return _fit(text, max_tokens, model)[0]
+
+# Token budget of a stage from a budget table ("*" = stages without their own entry).
+def stage_budget(stage: str, budgets: dict = None) -> int:
+    budgets = config.PROMPT_BUDGETS if budgets is None else budgets
+    return budgets.get(stage, budgets.get("*"))
+
+'''
+Prepares one piece of text for the prompt of stage and records what it saved.
+    budget:   tokens the text may take; True = the stage's entry in budgets (config.PROMPT_BUDGETS by default),
+              None = no cut (chunked stages: chunk_resume already keeps every chunk under a token budget)
+    compress: False sends the text as it is, only cut to the budget (e.g. broken JSON to be repaired)
+'''
+def prepare_prompt_text(text: str, stage: str, budget=True, budgets: dict = None, compress: bool = True,
+                        model: str = MODEL) -> str:
+    text = text or ""
+    original_tokens = count_tokens(text, model)
+    if compress and config.PROMPT_COMPRESS:
+        text = compress_text(text)
+    if budget is True:
+        budget = stage_budget(stage, budgets)
+    if budget:
+        text, sent_tokens = _fit(text, budget, model)
+    else:
+        sent_tokens = count_tokens(text, model)
+    record_prompt_budget(stage, original_tokens, sent_tokens)
+    return text
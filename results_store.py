@@ -0,0 +1,337 @@
+'''
+Results store: every finished pipeline run is kept in a local SQLite file, so old results can be looked up,
+searched and compared instead of being lost when the Streamlit session reruns (or run again to see them).
+
+    - runs: one small row per run (resume hash, JD hash, job title, ATS score, label, time), with an index
+      for every filter, so listing / paging does not touch the large texts
+    - run_outputs: the six outputs (cleaned, rewritten, final resume, evaluation JSON, cover letter,
+      skill-gap JSON) plus the JD and stage timings, one row per run
+    - runs_fts: an FTS5 full-text index over the rewritten / final resume, evaluation, cover letter and
+      skill gap (external content: the text itself is only stored once, in run_outputs)
+Pages use keyset cursors (WHERE id < last id), not OFFSET, so page 5000 is as fast as page 1 with
+hundreds of thousands of runs. The same run saved twice (e.g. a Streamlit rerun that reused every stage)
+is stored once. diff() compares one output of two runs, e.g. two versions of a resume.
+Without FTS5 in the sqlite3 build, search() falls back to a (slow) LIKE scan.
+'''
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import config
+from json_parsing import parse_structured
+
+# Output fields of a run, in the order run_pipeline returns them
+OUTPUT_FIELDS = ("cleaned", "rewritten", "final_resume", "evaluation", "cover_letter", "skill_gap")
+# Outputs in the full-text index (the cleaned resume is the input, nearly the same text as the rewrite)
+SEARCH_FIELDS = ("rewritten", "final_resume", "evaluation", "cover_letter", "skill_gap")
+_SUMMARY_COLUMNS = ("id", "created", "label", "job_title", "score", "resume_hash", "jd_hash", "mode", "tenant", "trace_id")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+logger = logging.getLogger("ats.results")
+
+
+# Hash of a text with its whitespace normalized (the same file extracted twice gets the same hash).
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(" ".join((text or "").split()).encode("utf-8"), digest_size=16).hexdigest()
+
+# overall_score of an evaluation JSON text, or None when it has none.
+def evaluation_score(evaluation: str):
+    parsed = parse_structured(evaluation or "")
+    score = parsed.get("overall_score") if isinstance(parsed, dict) else None
+    try:
+        return None if score is None else int(round(float(score)))
+    except (TypeError, ValueError):
+        return None
+
+# Turns what a user types into an FTS5 query: every word must match, the last one as a prefix ("kube" -> kubernetes).
+def fts_query(text: str):
+    words = _WORD_RE.findall(text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words[:-1]) + (" " if len(words) > 1 else "") + f'"{words[-1]}"*'
+
+
+class ResultsStore:
+    def __init__(self, path: str = config.RESULTS_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " id INTEGER PRIMARY KEY, run_key TEXT NOT NULL UNIQUE, created REAL NOT NULL,"
+                " label TEXT, job_title TEXT NOT NULL, score INTEGER, resume_hash TEXT NOT NULL, jd_hash TEXT NOT NULL,"
+                " mode TEXT, tenant TEXT, trace_id TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS run_outputs ("
+                " run_id INTEGER PRIMARY KEY, job_description TEXT, cleaned TEXT, rewritten TEXT, final_resume TEXT,"
+                " evaluation TEXT, cover_letter TEXT, skill_gap TEXT, timings TEXT)"
+            )
+            # (filter, id): each filter gives its runs newest first straight from the index
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_resume ON runs(resume_hash, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_jd ON runs(jd_hash, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_title ON runs(job_title COLLATE NOCASE, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_score ON runs(score, id)")
+            try:
+                conn.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5({', '.join(SEARCH_FIELDS)},"
+                    " content='run_outputs', content_rowid='run_id', tokenize='porter unicode61')"
+                )
+                self.fts = True
+            except sqlite3.OperationalError: # sqlite3 built without FTS5
+                self.fts = False
+
+    '''
+    Runs are saved from Streamlit sessions, job-queue workers and batch threads at once, and a sqlite3
+    connection may not be shared between threads: every method opens its own connection and closes it when
+    it is done (closing(); "with conn" alone only ends the transaction and leaves the file handle open).
+    WAL mode lets the history page read while a worker writes.
+    '''
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # WAL + NORMAL: durable on commit except on power loss
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    '''
+    Saves one run and returns its id. results is the six-tuple of run_pipeline (see OUTPUT_FIELDS).
+    A run with the same inputs and outputs as a stored one is not stored again (its id is returned).
+    '''
+    def save(self, raw_resume_text: str, job_title: str, job_description: str, results: tuple, timings: dict = None,
+             label: str = None, mode: str = None, tenant: str = None, trace_id: str = None) -> int:
+        outputs = dict(zip(OUTPUT_FIELDS, (r or "" for r in results)))
+        resume_hash, jd_hash = text_hash(raw_resume_text), text_hash(job_description)
+        run_key = hashlib.blake2b(json.dumps([resume_hash, jd_hash, job_title, [outputs[f] for f in OUTPUT_FIELDS]],
+                                             ensure_ascii=False).encode("utf-8"), digest_size=20).hexdigest()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+            if row is not None:
+                conn.execute("ROLLBACK")
+                return row[0]
+            run_id = conn.execute(
+                "INSERT INTO runs (run_key, created, label, job_title, score, resume_hash, jd_hash, mode, tenant, trace_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_key, time.time(), label, job_title, evaluation_score(outputs["evaluation"]), resume_hash, jd_hash,
+                 mode, tenant, trace_id),
+            ).lastrowid
+            conn.execute(
+                f"INSERT INTO run_outputs (run_id, job_description, {', '.join(OUTPUT_FIELDS)}, timings)"
+                f" VALUES (?, ?, {', '.join('?' for _ in OUTPUT_FIELDS)}, ?)",
+                (run_id, job_description, *(outputs[f] for f in OUTPUT_FIELDS), json.dumps(timings or {})),
+            )
+            if self.fts:
+                conn.execute(
+                    f"INSERT INTO runs_fts (rowid, {', '.join(SEARCH_FIELDS)}) VALUES (?, {', '.join('?' for _ in SEARCH_FIELDS)})",
+                    (run_id, *(outputs[f] for f in SEARCH_FIELDS)),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return run_id
+
+    # WHERE clause (with params) for the filters of list_runs() / search().
+    @staticmethod
+    def _filters(resume_hash, jd_hash, job_title, min_score, max_score) -> tuple:
+        clauses, params = [], []
+        for clause, value in (("runs.resume_hash = ?", resume_hash), ("runs.jd_hash = ?", jd_hash),
+                              ("runs.job_title = ? COLLATE NOCASE", job_title),
+                              ("runs.score >= ?", min_score), ("runs.score <= ?", max_score)):
+            if value is not None and value != "":
+                clauses.append(clause)
+                params.append(value)
+        return clauses, params
+
+    '''
+    One page of stored runs (summaries, no texts): {"runs": [...], "next": cursor or None}.
+    Pass "next" back as cursor for the following page.
+        order:   "recent" (newest first) or "score" (highest first; runs without a score are left out)
+        filters: resume_hash, jd_hash, job_title (exact, any case), min_score / max_score
+    '''
+    def list_runs(self, limit: int = None, cursor: str = None, order: str = "recent", resume_hash: str = None,
+                  jd_hash: str = None, job_title: str = None, min_score: int = None, max_score: int = None) -> dict:
+        limit = limit or config.RESULTS_PAGE_SIZE
+        clauses, params = self._filters(resume_hash, jd_hash, job_title, min_score, max_score)
+        if order == "score":
+            clauses.append("runs.score IS NOT NULL")
+            if cursor:
+                score, last_id = (int(v) for v in cursor.split(":"))
+                clauses.append("(runs.score, runs.id) < (?, ?)")
+                params += [score, last_id]
+            order_by = "runs.score DESC, runs.id DESC"
+        elif order == "recent":
+            if cursor:
+                clauses.append("runs.id < ?")
+                params.append(int(cursor))
+            order_by = "runs.id DESC"
+        else:
+            raise ValueError(f"Unknown order '{order}' (expected 'recent' or 'score')")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join('runs.' + c for c in _SUMMARY_COLUMNS)} FROM runs{where}"
+                f" ORDER BY {order_by} LIMIT ?", (*params, limit + 1)).fetchall()
+        runs = [dict(zip(_SUMMARY_COLUMNS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = runs[-1]
+            next_cursor = f"{last['score']}:{last['id']}" if order == "score" else str(last["id"])
+        return {"runs": runs, "next": next_cursor}
+
+    '''
+    Full-text search over the stored outputs (see SEARCH_FIELDS).
+    query is plain text (every word must appear, the last one may be a prefix); raw=True passes FTS5
+    syntax through ("python NOT java", "cover_letter: kubernetes"). Same filters and page shape as
+    list_runs(); every run also has a "snippet" with the matches in [brackets].
+        order: "relevance" (BM25, best first; ranks every match, so a word found in most runs is slow on a
+               large store) or "recent" (newest first, read straight from the index: fast for any word)
+    '''
+    def search(self, query: str, limit: int = None, cursor: str = None, order: str = "relevance", raw: bool = False,
+               resume_hash: str = None, jd_hash: str = None, job_title: str = None, min_score: int = None,
+               max_score: int = None) -> dict:
+        if order not in ("relevance", "recent"):
+            raise ValueError(f"Unknown order '{order}' (expected 'relevance' or 'recent')")
+        limit = limit or config.RESULTS_PAGE_SIZE
+        match = query if raw else fts_query(query)
+        if not match:
+            return {"runs": [], "next": None}
+        clauses, params = self._filters(resume_hash, jd_hash, job_title, min_score, max_score)
+        by_relevance = order == "relevance" and self.fts
+        offset = int(cursor or 0) if by_relevance else 0 # ranked results have no stable key: paged by offset
+        if cursor and not by_relevance:
+            clauses.append("runs.id < ?")
+            params.append(int(cursor))
+        columns = ", ".join("runs." + c for c in _SUMMARY_COLUMNS)
+        with closing(self._connect()) as conn:
+            if self.fts:
+                where = " AND ".join(["runs_fts MATCH ?"] + clauses)
+                order_by = "bm25(runs_fts)" if by_relevance else "runs_fts.rowid DESC"
+                rows = conn.execute(
+                    f"SELECT {columns}, snippet(runs_fts, -1, '[', ']', ' ... ', 16) FROM runs_fts"
+                    f" JOIN runs ON runs.id = runs_fts.rowid WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                    (match, *params, limit + 1, offset)).fetchall()
+            else:
+                for word in _WORD_RE.findall(query):
+                    clauses.append("(" + " OR ".join(f"run_outputs.{f} LIKE ?" for f in SEARCH_FIELDS) + ")")
+                    params += [f"%{word}%"] * len(SEARCH_FIELDS)
+                rows = conn.execute(
+                    f"SELECT {columns}, '' FROM runs JOIN run_outputs ON run_outputs.run_id = runs.id"
+                    f" WHERE {' AND '.join(clauses)} ORDER BY runs.id DESC LIMIT ?", (*params, limit + 1)).fetchall()
+        runs = [dict(zip(_SUMMARY_COLUMNS + ("snippet",), row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = str(offset + limit) if by_relevance else str(runs[-1]["id"])
+        return {"runs": runs, "next": next_cursor}
+
+    # The full stored run (summary + job_description + outputs + timings), or None if the id is unknown.
+    def get(self, run_id: int):
+        fields = ("job_description",) + OUTPUT_FIELDS + ("timings",)
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT {', '.join('runs.' + c for c in _SUMMARY_COLUMNS)}, {', '.join('run_outputs.' + f for f in fields)}"
+                " FROM runs JOIN run_outputs ON run_outputs.run_id = runs.id WHERE runs.id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(zip(_SUMMARY_COLUMNS + fields, row))
+        run["timings"] = json.loads(run["timings"]) if run["timings"] else {}
+        run["results"] = tuple(run[f] for f in OUTPUT_FIELDS)
+        return run
+
+    '''
+    Compares one output field of two stored runs (default: the final resume).
+    Returns {"a", "b", "field", "diff": unified diff text, "added", "removed": changed lines,
+    "similarity": 0..1 share of equal lines}, or None if a run id is unknown.
+    '''
+    def diff(self, run_a: int, run_b: int, field: str = "final_resume", context: int = 3):
+        if field not in OUTPUT_FIELDS:
+            raise ValueError(f"Unknown field '{field}' (expected one of {OUTPUT_FIELDS})")
+        with closing(self._connect()) as conn:
+            texts = dict(conn.execute(
+                f"SELECT run_id, {field} FROM run_outputs WHERE run_id IN (?, ?)", (run_a, run_b)).fetchall())
+        if run_a not in texts or run_b not in texts:
+            return None
+        a_lines, b_lines = (texts[run_a] or "").splitlines(), (texts[run_b] or "").splitlines()
+        diff = list(difflib.unified_diff(a_lines, b_lines, f"run {run_a}", f"run {run_b}", n=context, lineterm=""))
+        return {
+            "a": run_a, "b": run_b, "field": field, "diff": "\n".join(diff),
+            "added": sum(1 for line in diff if line.startswith("+") and not line.startswith("+++")),
+            "removed": sum(1 for line in diff if line.startswith("-") and not line.startswith("---")),
+            "similarity": round(difflib.SequenceMatcher(None, a_lines, b_lines).ratio(), 3),
+        }
+
+    # Deletes a run (and its full-text entry). Returns False if the id is unknown.
+    def delete(self, run_id: int) -> bool:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(f"SELECT {', '.join(SEARCH_FIELDS)} FROM run_outputs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is not None and self.fts: # an external-content index needs the old text to remove it
+                conn.execute(
+                    f"INSERT INTO runs_fts (runs_fts, rowid, {', '.join(SEARCH_FIELDS)})"
+                    f" VALUES ('delete', ?, {', '.join('?' for _ in SEARCH_FIELDS)})", (run_id, *row))
+            conn.execute("DELETE FROM run_outputs WHERE run_id = ?", (run_id,))
+            deleted = conn.execute("DELETE FROM runs WHERE id = ?", (run_id,)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return bool(deleted)
+
+    # Merges the full-text index segments (worth running after a large batch import).
+    def optimize(self):
+        with closing(self._connect()) as conn:
+            if self.fts:
+                conn.execute("INSERT INTO runs_fts (runs_fts) VALUES ('optimize')")
+            conn.execute("PRAGMA optimize")
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            runs = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        return {"runs": runs, "full_text_search": self.fts,
+                "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+# Returns the process-wide results store (created on first use), or None if it is disabled.
+def get_results_store():
+    global _store
+    if not config.RESULTS_STORE_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore(config.RESULTS_DB_PATH)
+        return _store
+
+'''
+Saves a finished run to the process-wide store (if enabled) and returns its id.
+A store error is logged, never raised: losing the history entry must not fail the run.
+'''
+def record_run(raw_resume_text: str, job_title: str, job_description: str, results: tuple, timings: dict = None,
+               label: str = None, mode: str = None, trace=None):
+    store = get_results_store()
+    if store is None:
+        return None
+    try:
+        return store.save(raw_resume_text, job_title, job_description, results, timings, label, mode,
+                          getattr(trace, "tenant", None), getattr(trace, "id", None))
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Could not save the run to the results store: %s", e)
+        return None
@@ -0,0 +1,344 @@
+'''
+Process-wide scheduler for LLM calls: request and token rate limits, priority classes and fair queuing.
+
+Every Crew.kickoff() goes through it (crew.run_single_task), so all Streamlit sessions, queue jobs and batch
+pairs running in this process share the provider's limits of one API key instead of racing into 429s:
+    - token buckets for requests per minute (config.LLM_CALLS_PER_MINUTE) and tokens per minute
+      (config.LLM_TOKENS_PER_MINUTE), plus an optional cap on calls in flight (config.LLM_MAX_CONCURRENT_CALLS)
+    - priority classes: "interactive" calls (the UI) go before "batch" calls, except a batch call that has
+      waited config.SCHEDULER_BATCH_MAX_WAIT_SECONDS: it goes next, but never twice in a row, so a busy UI
+      cannot starve batches and a long batch cannot hold up the UI by more than one call
+    - fair queuing per tenant inside a class: every call gets a virtual finish time of (the tenant's last
+      finish time + its estimated tokens), and the smallest one goes first, so a tenant with 500 queued calls
+      does not hold up a tenant with one (tokens, not calls, are shared fairly)
+    - the token cost of a call is estimated before it starts (estimate_call_tokens: the rendered prompt
+      plus an expected completion per stage) and corrected with the real usage when it ends (release)
+Tenant and priority come from the run's RunTrace (tracing.py), falling back to the process defaults
+(set_default_identity, e.g. batch.py makes its process "batch" while a batch runs).
+
+Time comes from a clock object, so the scheduler can be driven by a SimulatedClock without sleeping;
+submit() / dispatch() / next_dispatch_time() are the non-blocking core that acquire() is built on
+(benchmarks/sim_scheduler.py runs it against a fake rate-limited backend).
+The limits are per process: give each process (Streamlit server, queue workers, batch runs) its share.
+'''
+import itertools
+import threading
+import time
+
+import config
+from tokens import count_tokens
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+# Raised by wait() / acquire() when the ticket was cancelled before its turn came.
+class TicketCancelled(Exception):
+    pass
+
+
+class MonotonicClock:
+    def now(self) -> float:
+        return time.monotonic()
+
+    def wait(self, condition: threading.Condition, timeout: float = None):
+        condition.wait(timeout)
+
+    def watch(self, condition: threading.Condition):
+        pass
+
+'''
+A clock that only moves when advance() is called (for simulations and tests).
+Threads blocked in acquire() wake up on every advance() and check again.
+'''
+class SimulatedClock:
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._conditions = []
+
+    def now(self) -> float:
+        return self._now
+
+    def wait(self, condition: threading.Condition, timeout: float = None):
+        condition.wait(1.0) # woken by advance() or release(); the real-time timeout is only a safety net
+
+    def watch(self, condition: threading.Condition):
+        self._conditions.append(condition)
+
+    def advance(self, seconds: float):
+        self._now += seconds
+        for condition in self._conditions:
+            with condition:
+                condition.notify_all()
+
+
+'''
+Refills at per_minute / 60 units per second up to capacity. take() may drive the level below zero
+(a call bigger than the whole bucket, or real usage above the estimate): that debt delays later calls.
+'''
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: float, now: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, capacity)
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Seconds until amount (at most the capacity) is available; 0 when it is available now.
+    def time_until(self, amount: float, now: float) -> float:
+        self.refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+# One scheduled call. tokens is the estimate it was admitted with.
+class Ticket:
+    def __init__(self, seq: int, tokens: int, tenant: str, priority: str, submitted: float, finish_tag: float):
+        self.seq = seq
+        self.tokens = tokens
+        self.tenant = tenant
+        self.priority = priority
+        self.submitted = submitted
+        self.finish_tag = finish_tag
+        self.granted_at = None
+        self.cancelled = False
+        self.released = False
+
+    @property
+    def wait_seconds(self) -> float:
+        return 0.0 if self.granted_at is None else self.granted_at - self.submitted
+
+
+class LLMScheduler:
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_concurrent: int = 0,
+                 clock=None, burst_seconds: float = None, batch_max_wait: float = None):
+        self.clock = clock or MonotonicClock()
+        burst_seconds = config.SCHEDULER_BURST_SECONDS if burst_seconds is None else burst_seconds
+        self.batch_max_wait = config.SCHEDULER_BATCH_MAX_WAIT_SECONDS if batch_max_wait is None else batch_max_wait
+        now = self.clock.now()
+        # Bucket sizes: burst_seconds worth of the per-minute rate (how much may start back-to-back)
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute * burst_seconds / 60, now) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute * burst_seconds / 60, now) if tokens_per_minute else None
+        self.max_concurrent = max_concurrent
+        self._cond = threading.Condition()
+        self.clock.watch(self._cond)
+        self._waiting = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._class_vtime = {} # priority -> virtual time (start tag of the last dispatched call)
+        self._tenant_finish = {} # (priority, tenant) -> finish tag of the tenant's last queued call
+        self._promoted = False # the last dispatched call was a batch call moved ahead for waiting too long
+        self._stats = {"granted": 0, "estimated_tokens": 0, "actual_tokens": 0, "wait_seconds": {}, "max_wait_seconds": {}}
+
+    '''
+    Queues a call and returns its Ticket without waiting (call dispatch() to start calls).
+    tokens: estimated tokens of the call (estimate_call_tokens); priority: "interactive" or "batch".
+    '''
+    def submit(self, tokens: int, tenant: str = "default", priority: str = "interactive") -> Ticket:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' (expected one of {tuple(PRIORITIES)})")
+        with self._cond:
+            if len(self._tenant_finish) > 10_000: # forget tenants that are not ahead of their class any more
+                self._tenant_finish = {k: v for k, v in self._tenant_finish.items() if v > self._class_vtime.get(k[0], 0.0)}
+            start = max(self._class_vtime.get(priority, 0.0), self._tenant_finish.get((priority, tenant), 0.0))
+            ticket = Ticket(next(self._seq), max(1, int(tokens)), tenant, priority, self.clock.now(), start + max(1, tokens))
+            self._tenant_finish[(priority, tenant)] = ticket.finish_tag
+            self._waiting.append(ticket)
+            return ticket
+
+    # Whether ticket is a batch call that has waited longer than batch_max_wait.
+    def _overdue(self, ticket: Ticket, now: float) -> bool:
+        return bool(PRIORITIES[ticket.priority] and self.batch_max_wait and now - ticket.submitted >= self.batch_max_wait)
+
+    # The ticket that goes next: an overdue batch call (not twice in a row), else the highest priority class, then the smallest finish tag.
+    def _head(self, now: float):
+        if not self._waiting:
+            return None
+
+        def order(t):
+            if not self._promoted and self._overdue(t, now):
+                return -1, t.submitted, t.seq # waited too long: goes first, oldest first
+            return PRIORITIES[t.priority], t.finish_tag, t.seq
+        return min(self._waiting, key=order)
+
+    # Seconds until ticket may start (0 = now), or None while it waits for a call in flight to finish.
+    def _delay(self, ticket: Ticket, now: float):
+        if self.max_concurrent and self._in_flight >= self.max_concurrent:
+            return None
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.time_until(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.time_until(ticket.tokens, now))
+        return delay
+
+    def _dispatch_locked(self) -> list:
+        granted = []
+        now = self.clock.now()
+        while True:
+            ticket = self._head(now)
+            if ticket is None or self._delay(ticket, now) != 0.0:
+                return granted # the head blocks the rest: a smaller call must not jump ahead of its turn
+            self._waiting.remove(ticket)
+            self._promoted = not self._promoted and self._overdue(ticket, now)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(ticket.tokens)
+            self._in_flight += 1
+            ticket.granted_at = now
+            self._class_vtime[ticket.priority] = max(self._class_vtime.get(ticket.priority, 0.0),
+                                                     ticket.finish_tag - ticket.tokens)
+            stats = self._stats
+            stats["granted"] += 1
+            stats["estimated_tokens"] += ticket.tokens
+            stats["wait_seconds"][ticket.priority] = stats["wait_seconds"].get(ticket.priority, 0.0) + ticket.wait_seconds
+            stats["max_wait_seconds"][ticket.priority] = max(stats["max_wait_seconds"].get(ticket.priority, 0.0), ticket.wait_seconds)
+            granted.append(ticket)
+
+    # Starts every queued call that may start now (in scheduling order) and returns their tickets.
+    def dispatch(self) -> list:
+        with self._cond:
+            granted = self._dispatch_locked()
+            if granted:
+                self._cond.notify_all()
+            return granted
+
+    # Clock time at which the next queued call may start, or None (nothing queued, or waiting for a release).
+    def next_dispatch_time(self):
+        with self._cond:
+            now = self.clock.now()
+            ticket = self._head(now)
+            if ticket is None:
+                return None
+            delay = self._delay(ticket, now)
+            return None if delay is None else now + delay
+
+    # Blocks until a submitted ticket may start and returns it; raises TicketCancelled if it is cancelled first.
+    def wait(self, ticket: Ticket) -> Ticket:
+        with self._cond:
+            while ticket.granted_at is None:
+                if ticket.cancelled:
+                    raise TicketCancelled(f"Call of tenant '{ticket.tenant}' was cancelled while queued")
+                if self._dispatch_locked():
+                    self._cond.notify_all()
+                    if ticket.granted_at is not None:
+                        break
+                now = self.clock.now()
+                head = self._head(now)
+                delay = self._delay(head, now) if head is not None else None
+                self.clock.wait(self._cond, delay)
+        return ticket
+
+    # Blocks until the call may start; returns its Ticket (pass it to release() when the call is done).
+    def acquire(self, tokens: int, tenant: str = "default", priority: str = "interactive") -> Ticket:
+        return self.wait(self.submit(tokens, tenant, priority))
+
+    '''
+    Gives up on a call that has not started: a queued ticket leaves the queue (its wait() raises
+    TicketCancelled). A granted ticket is left alone: its request is in flight and cannot be stopped, so it
+    holds its slot and tokens until the calling thread release()s it with the real usage.
+    Safe to call more than once, and after release().
+    '''
+    def cancel(self, ticket: Ticket):
+        with self._cond:
+            if ticket.granted_at is None and not ticket.cancelled:
+                ticket.cancelled = True
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    '''
+    Marks a call as done. actual_tokens (prompt + completion tokens the provider reported) corrects the
+    estimate in the token bucket: unused tokens are given back, extra ones are charged. 0/None keeps the estimate.
+    Releasing a ticket twice (or one that never started) does nothing.
+    '''
+    def release(self, ticket: Ticket, actual_tokens: int = None):
+        with self._cond:
+            if ticket.granted_at is None or ticket.released:
+                return
+            ticket.released = True
+            self._in_flight -= 1
+            if actual_tokens:
+                if self.tokens is not None:
+                    self.tokens.refill(self.clock.now())
+                    self.tokens.take(actual_tokens - ticket.tokens)
+                self._stats["actual_tokens"] += actual_tokens
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self._stats.items()}
+            stats["waiting"] = len(self._waiting)
+            stats["in_flight"] = self._in_flight
+            return stats
+
+
+'''
+Estimated tokens of one call before it is made: the rendered prompt (agent role/goal/backstory + task
+description + expected output) counted with the model's tokenizer, plus CrewAI's own prompt text
+(config.SCHEDULER_PROMPT_OVERHEAD_TOKENS) and the expected answer length of the stage
+(config.SCHEDULER_COMPLETION_TOKENS).
+'''
+def estimate_call_tokens(stage: str, prompt_text: str) -> int:
+    completion = config.SCHEDULER_COMPLETION_TOKENS.get(stage, config.SCHEDULER_COMPLETION_TOKENS["*"])
+    return count_tokens(prompt_text) + config.SCHEDULER_PROMPT_OVERHEAD_TOKENS + completion
+
+# The prompt text of an agent + task, as used for estimate_call_tokens().
+def render_prompt(agent, task) -> str:
+    parts = (getattr(agent, "role", ""), getattr(agent, "goal", ""), getattr(agent, "backstory", ""),
+             getattr(task, "description", ""), getattr(task, "expected_output", ""))
+    return "\n".join(str(p) for p in parts if p)
+
+
+_scheduler = None
+_configured = False
+_lock = threading.Lock()
+_defaults = {"tenant": "default", "priority": config.SCHEDULER_DEFAULT_PRIORITY}
+
+# Returns the process-wide scheduler, or None when no limit is configured (calls then start right away).
+def get_scheduler():
+    global _scheduler, _configured
+    with _lock:
+        if not _configured:
+            if config.LLM_CALLS_PER_MINUTE or config.LLM_TOKENS_PER_MINUTE or config.LLM_MAX_CONCURRENT_CALLS:
+                _scheduler = LLMScheduler(config.LLM_CALLS_PER_MINUTE, config.LLM_TOKENS_PER_MINUTE,
+                                          config.LLM_MAX_CONCURRENT_CALLS)
+            _configured = True
+        return _scheduler
+
+'''
+Replaces the process-wide limits (e.g. from the batch CLI); None keeps the configured value of a limit.
+With every limit 0 the scheduler is removed. Calls already waiting stay with the old scheduler.
+'''
+def set_limits(requests_per_minute: float = None, tokens_per_minute: float = None, max_concurrent: int = None):
+    global _scheduler, _configured
+    rpm = config.LLM_CALLS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+    tpm = config.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+    concurrent = config.LLM_MAX_CONCURRENT_CALLS if max_concurrent is None else max_concurrent
+    with _lock:
+        _scheduler = LLMScheduler(rpm, tpm, concurrent) if (rpm or tpm or concurrent) else None
+        _configured = True
+
+# Sets the tenant / priority of calls whose run does not name its own (see the module docstring).
+# Returns the previous (tenant, priority), so the caller can put it back.
+def set_default_identity(tenant: str = None, priority: str = None) -> tuple:
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}' (expected one of {tuple(PRIORITIES)})")
+    with _lock:
+        previous = (_defaults["tenant"], _defaults["priority"])
+        if tenant is not None:
+            _defaults["tenant"] = tenant
+        if priority is not None:
+            _defaults["priority"] = priority
+        return previous
+
+# (tenant, priority) of a call made within the run of trace (a RunTrace or None).
+def call_identity(trace=None) -> tuple:
+    tenant = getattr(trace, "tenant", None) or _defaults["tenant"]
+    priority = getattr(trace, "priority", None) or _defaults["priority"]
+    return tenant, priority
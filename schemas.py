@@ -0,0 +1,58 @@
+'''
+Pydantic models for the structured outputs of the pipeline.
+CrewAI tasks get these as output_pydantic, so the model answers in a fixed JSON shape
+instead of free text that has to be fixed up afterwards.
+'''
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
+
+
+# Output of the fused parse + rewrite + refine call (one prompt instead of three)
+class FusedResume(BaseModel):
+    cleaned_resume: str = Field(description="The resume text cleaned of artifacts, bullets normalized to '-', all content kept.")
+    rewritten_resume: str = Field(description="The cleaned resume rewritten for the target job: JD keywords, action verbs, metrics.")
+    final_resume: str = Field(description="The rewritten resume with every bullet polished: strong verb + achievement + number.")
+
+
+# Output of the ATS evaluation (same shape as ats_scoring.score_resume)
+class AtsEvaluation(BaseModel):
+    overall_score: int = Field(ge=0, le=100)
+    breakdown: Dict[str, int] = Field(default_factory=dict, description="1-5 for keywords, structure, metrics, verbs, format")
+    missing_keywords: List[str] = Field(default_factory=list)
+    quick_wins: List[str] = Field(default_factory=list)
+
+
+class PriorityGap(BaseModel):
+    skill: str
+    reason: str = ""
+
+
+# Output of the skill-gap analysis
+class SkillGapAnalysis(BaseModel):
+    matched_skills: List[str] = Field(default_factory=list)
+    missing_skills: List[str] = Field(default_factory=list)
+    weak_skills: List[str] = Field(default_factory=list)
+    priority_gaps: List[PriorityGap] = Field(default_factory=list)
+    recommendations: List[str] = Field(default_factory=list)
+
+
+# Output of the recommendation-only skill-gap call (the skill lists are computed locally, see skill_taxonomy.py)
+class SkillRecommendations(BaseModel):
+    recommendations: List[str] = Field(default_factory=list, description="Concrete, resume-specific actions, most important first")
+
+
+class WeightedKeyword(BaseModel):
+    term: str
+    weight: float = 1.0
+
+
+# One-time analysis of a job description, shared by every candidate applying to it (see job_profile.py)
+class JobProfile(BaseModel):
+    job_title: str = ""
+    seniority: str = Field(default="", description="intern, junior, mid, senior, lead or principal; empty if unclear")
+    summary: str = Field(default="", description="One sentence on what the role does.")
+    required_skills: List[str] = Field(default_factory=list)
+    preferred_skills: List[str] = Field(default_factory=list)
+    must_haves: List[str] = Field(default_factory=list, description="Hard requirements: years of experience, degrees, certifications, ...")
+    keywords: List[WeightedKeyword] = Field(default_factory=list, description="ATS keywords, most important first")
@@ -0,0 +1,355 @@
+'''
+Local skill normalization and skill-gap analysis.
+
+The skill-gap stage used to ask the LLM to find and compare skills on every run, which gave different
+answers for the same input ("PyTorch" vs "pytorch" vs "Torch"). Here that part is done locally:
+    - SKILL_TAXONOMY maps every canonical skill name to the ways people write it
+    - SkillMatcher finds all of them in a text in one pass (Aho-Corasick automaton over word tokens)
+    - analyze_skill_gap() turns the skills of the resume and the JD into matched / missing / weak skills
+      and priority gaps with plain set operations, so the same input always gives the same result
+The LLM then only writes the recommendations (see crew.run_skill_gap).
+More skills can be added with a JSON file {"Canonical Name": ["alias", ...]} (config.SKILL_TAXONOMY_PATH).
+'''
+import json
+import re
+import threading
+from collections import Counter, deque
+from functools import lru_cache
+
+import config
+from ats_scoring import SECTION_PATTERNS
+from schemas import JobProfile, PriorityGap, SkillGapAnalysis
+from text_processing import lemmatize, tokenize
+
+'''
+Canonical skill name -> aliases (lowercase, as written in resumes and job descriptions).
+The canonical name is NOT matched on its own: ambiguous names ("Go", "R", "C") only list aliases that
+cannot be ordinary English words.
+'''
+SKILL_TAXONOMY = {
+    # Programming languages
+    "Python": ["python", "python3", "python 3", "cpython"],
+    "Java": ["java", "java 8", "java 11", "java 17", "j2ee", "java ee"],
+    "JavaScript": ["javascript", "js", "ecmascript", "es6", "vanilla js"],
+    "TypeScript": ["typescript", "ts"],
+    "Go": ["golang", "go lang", "go programming"],
+    "Rust": ["rust", "rustlang"],
+    "C": ["c programming", "ansi c", "c language"],
+    "C++": ["c++", "cpp", "c++11", "c++17", "modern c++"],
+    "C#": ["c#", "csharp", "c sharp"],
+    "Scala": ["scala"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swift", "swiftui"],
+    "Ruby": ["ruby"],
+    "PHP": ["php"],
+    "R": ["r programming", "r language", "rstudio", "tidyverse"],
+    "MATLAB": ["matlab"],
+    "Bash": ["bash", "shell scripting", "shell script"],
+    "SQL": ["sql", "t-sql", "tsql", "pl/sql", "ansi sql"],
+    # Data engineering
+    "Apache Spark": ["spark", "apache spark", "pyspark", "spark sql", "spark streaming"],
+    "Apache Kafka": ["kafka", "apache kafka", "kafka streams"],
+    "Apache Airflow": ["airflow", "apache airflow"],
+    "Apache Flink": ["flink", "apache flink"],
+    "Hadoop": ["hadoop", "hdfs", "mapreduce", "hive", "apache hive"],
+    "dbt": ["dbt", "data build tool"],
+    "ETL": ["etl", "elt", "etl pipeline", "data pipeline"],
+    "Data Warehousing": ["data warehouse", "data warehousing", "dimensional modeling", "star schema"],
+    "Snowflake": ["snowflake"],
+    "BigQuery": ["bigquery", "google bigquery"],
+    "Redshift": ["redshift", "amazon redshift", "aws redshift"],
+    "Databricks": ["databricks", "delta lake"],
+    # Databases
+    "PostgreSQL": ["postgresql", "postgres", "psql"],
+    "MySQL": ["mysql", "mariadb"],
+    "SQL Server": ["sql server", "mssql", "ms sql"],
+    "Oracle Database": ["oracle database", "oracle db", "oracle"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "Cassandra": ["cassandra", "apache cassandra"],
+    "Elasticsearch": ["elasticsearch", "elastic search", "opensearch", "elk"],
+    "DynamoDB": ["dynamodb", "dynamo db"],
+    # Machine learning and data science
+    "Machine Learning": ["machine learning", "ml"],
+    "Deep Learning": ["deep learning", "neural network", "neural networks"],
+    "PyTorch": ["pytorch", "torch", "py torch"],
+    "TensorFlow": ["tensorflow", "keras", "tf2"],
+    "scikit-learn": ["scikit-learn", "sklearn", "scikit learn"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "XGBoost": ["xgboost", "lightgbm", "catboost", "gradient boosting"],
+    "NLP": ["nlp", "natural language processing"],
+    "Computer Vision": ["computer vision", "opencv", "image recognition"],
+    "LLMs": ["llm", "llms", "large language model", "large language models", "gpt", "generative ai", "genai"],
+    "Hugging Face": ["hugging face", "huggingface", "transformers library"],
+    "MLOps": ["mlops", "mlflow", "kubeflow", "model deployment"],
+    "Statistics": ["statistics", "statistical analysis", "statistical modeling", "hypothesis testing"],
+    "A/B Testing": ["a/b testing", "ab testing", "a/b test", "experimentation"],
+    "Data Visualization": ["data visualization", "data visualisation", "matplotlib", "seaborn", "plotly"],
+    "Tableau": ["tableau"],
+    "Power BI": ["power bi", "powerbi"],
+    "Looker": ["looker", "lookml"],
+    "Excel": ["excel", "microsoft excel", "ms excel", "vba"],
+    # Cloud
+    "AWS": ["aws", "amazon web services", "ec2", "s3", "lambda", "aws lambda", "cloudformation"],
+    "GCP": ["gcp", "google cloud", "google cloud platform", "cloud run", "gke"],
+    "Azure": ["azure", "microsoft azure", "azure devops"],
+    # DevOps and infrastructure
+    "Docker": ["docker", "containers", "containerization", "dockerfile"],
+    "Kubernetes": ["kubernetes", "k8s", "helm", "eks", "aks"],
+    "Terraform": ["terraform", "infrastructure as code", "iac"],
+    "Ansible": ["ansible"],
+    "CI/CD": ["ci/cd", "cicd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Jenkins": ["jenkins"],
+    "GitHub Actions": ["github actions"],
+    "GitLab CI": ["gitlab ci", "gitlab"],
+    "Git": ["git", "github", "bitbucket", "version control"],
+    "Linux": ["linux", "unix", "ubuntu", "centos", "rhel"],
+    "Prometheus": ["prometheus", "grafana"],
+    "Observability": ["observability", "monitoring", "datadog", "new relic", "splunk"],
+    # Web and backend
+    "React": ["react", "react.js", "reactjs", "react native"],
+    "Angular": ["angular", "angularjs"],
+    "Vue.js": ["vue", "vue.js", "vuejs", "nuxt"],
+    "Node.js": ["node.js", "nodejs", "node", "express.js", "expressjs"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi", "fast api"],
+    "Spring": ["spring boot", "springboot", "spring framework", "spring mvc"],
+    ".NET": [".net", "dotnet", "asp.net", ".net core"],
+    "HTML/CSS": ["html", "css", "html5", "css3", "sass", "tailwind"],
+    "REST APIs": ["rest api", "restful", "restful api", "rest apis", "rest services"],
+    "GraphQL": ["graphql"],
+    "gRPC": ["grpc", "protobuf", "protocol buffers"],
+    "Microservices": ["microservices", "microservice", "service oriented architecture", "soa"],
+    "Distributed Systems": ["distributed systems", "distributed system", "distributed computing"],
+    "System Design": ["system design", "software architecture", "scalable systems"],
+    "RabbitMQ": ["rabbitmq", "message queue", "message queues", "sqs", "pub/sub"],
+    # Practices and security
+    "Agile": ["agile", "scrum", "kanban", "sprint planning"],
+    "Unit Testing": ["unit testing", "unit tests", "pytest", "junit", "tdd", "test driven development"],
+    "Security": ["security", "cybersecurity", "owasp", "penetration testing", "iam"],
+    "Data Modeling": ["data modeling", "data modelling", "schema design"],
+    # Soft skills that job descriptions screen for
+    "Leadership": ["leadership", "team lead", "people management", "mentoring", "mentorship"],
+    "Communication": ["communication", "communication skills", "stakeholder management"],
+    "Project Management": ["project management", "pmp", "program management", "jira"],
+}
+
+# Skill sections of a resume: a skill listed only there (never shown in experience/projects) counts as weak
+_SKILL_SECTION_RE = re.compile(SECTION_PATTERNS["skills"])
+_RESUME_HEADING_RE = re.compile("|".join(f"(?:{p})" for p in SECTION_PATTERNS.values()))
+# Job description headings; skills under a "nice to have / preferred" one are not requirements
+_JD_HEADING_RE = re.compile(r"(?:nice to have|preferred|bonus|desired|requirements?|qualifications|must have|"
+                            r"responsibilities|what you bring|what you will do|about)[\w ]*")
+_PREFERRED_RE = re.compile(r"nice to have|preferred|bonus|desired")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪●◦‣]|\d+[.)])\s+")
+MAX_PRIORITY_GAPS = 5
+
+
+# Token as the matcher sees it: lowercased and lemmatized ("containers" -> "container"), memoized.
+@lru_cache(maxsize=65536)
+def normalize_token(token: str) -> str:
+    return lemmatize(token)
+
+def _pattern(alias: str) -> tuple:
+    return tuple(normalize_token(t) for t in tokenize(alias))
+
+
+'''
+Multi-pattern skill matcher: an Aho-Corasick automaton whose alphabet is word tokens.
+Building it is linear in the total alias length; find() reads each token of the text once, so the cost
+per resume depends on the resume length, not on the number of skills in the taxonomy (10k+ aliases are fine).
+Matching on whole tokens means "java" does not match inside "javascript" and "c++" keeps its symbols.
+'''
+class SkillMatcher:
+    def __init__(self, taxonomy: dict):
+        self._goto = [{}] # node -> {token: next node}
+        self._fail = [0]
+        self._out = [()] # node -> canonical skills that end at this node
+        self.canonical = {} # lowercase canonical name / alias -> canonical name
+        for skill, aliases in taxonomy.items():
+            self.canonical[skill.lower()] = skill
+            for alias in aliases:
+                self.canonical.setdefault(alias.lower(), skill)
+                self._add(_pattern(alias), skill)
+        self._link()
+
+    def _add(self, pattern: tuple, skill: str):
+        if not pattern:
+            return
+        node = 0
+        for token in pattern:
+            nxt = self._goto[node].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        if skill not in self._out[node]:
+            self._out[node] += (skill,)
+
+    # Breadth-first pass that sets the failure links and merges the outputs along them.
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                extra = tuple(s for s in self._out[self._fail[child]] if s not in self._out[child])
+                if extra:
+                    self._out[child] += extra
+
+    # Counts how often each canonical skill occurs in text.
+    def find(self, text: str) -> Counter:
+        found = Counter()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for token in tokenize(text):
+            token = normalize_token(token)
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for skill in out[node]:
+                found[skill] += 1
+        return found
+
+    # Canonical name of a skill as written anywhere ("pytorch", "Torch" -> "PyTorch"); None if it is unknown.
+    def normalize(self, name: str):
+        name = " ".join(name.lower().split())
+        if name in self.canonical:
+            return self.canonical[name]
+        found = self.find(name)
+        return found.most_common(1)[0][0] if len(found) == 1 else None
+
+    def __len__(self):
+        return len(self.canonical)
+
+
+# The bundled taxonomy plus the skills of config.SKILL_TAXONOMY_PATH (if set).
+def load_taxonomy(path: str = None) -> dict:
+    taxonomy = {skill: list(aliases) for skill, aliases in SKILL_TAXONOMY.items()}
+    path = config.SKILL_TAXONOMY_PATH if path is None else path
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for skill, aliases in json.load(f).items():
+                taxonomy.setdefault(skill, [])
+                taxonomy[skill] += [a for a in aliases if a not in taxonomy[skill]]
+    return taxonomy
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+# Returns the process-wide matcher (built once, on first use).
+def get_skill_matcher() -> SkillMatcher:
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = SkillMatcher(load_taxonomy())
+        return _matcher
+
+
+# Returns the heading name if the line starts a section ("Skills", "Nice to have: dbt, Spark"), else None.
+def _heading(line: str, heading_re):
+    if _BULLET_RE.match(line):
+        return None
+    heading = line.strip().strip("#*-_= ").lower()
+    match = heading_re.match(heading)
+    if match is None:
+        return None
+    rest = heading[match.end():].strip()
+    return match.group(0).strip() if not rest or rest.startswith(":") else None
+
+'''
+Splits a text into (section name, section text) by its heading lines; the part before the first
+heading is "other". Used for the resume (skills section vs. the rest) and the JD (preferred vs. the rest).
+'''
+def _sections(text: str, heading_re) -> list:
+    sections, name, lines = [], "other", []
+    for line in text.splitlines():
+        heading = _heading(line, heading_re)
+        if heading is None:
+            lines.append(line)
+            continue
+        sections.append((name, "\n".join(lines)))
+        name, lines = heading, []
+        # "Skills: Python, SQL" -> the rest of the line belongs to the new section
+        if ":" in line:
+            lines.append(line.split(":", 1)[1])
+    sections.append((name, "\n".join(lines)))
+    return sections
+
+# Skills of a resume: (count of every skill, skills that only appear in the skills section).
+def resume_skills(resume_text: str, matcher: SkillMatcher = None):
+    matcher = matcher or get_skill_matcher()
+    listed, shown = Counter(), Counter()
+    for name, text in _sections(resume_text, _RESUME_HEADING_RE):
+        (listed if _SKILL_SECTION_RE.fullmatch(name) else shown).update(matcher.find(text))
+    return listed + shown, set(listed) - set(shown)
+
+'''
+Skills of a job description, most important first: (skill -> weight, required skills).
+A skill weighs 1 per mention and 2 extra when it is required; skills that only appear under a
+"nice to have / preferred" heading are not required. With a JobProfile, its required/preferred skills
+are normalized and added too.
+'''
+def job_skills(job_title: str, job_description: str, job_profile: JobProfile = None, matcher: SkillMatcher = None):
+    matcher = matcher or get_skill_matcher()
+    required, preferred = Counter(matcher.find(job_title)), Counter()
+    for name, text in _sections(job_description, _JD_HEADING_RE):
+        (preferred if _PREFERRED_RE.search(name) else required).update(matcher.find(text))
+    if job_profile is not None:
+        required.update(s for s in map(matcher.normalize, job_profile.required_skills) if s)
+        preferred.update(s for s in map(matcher.normalize, job_profile.preferred_skills) if s)
+
+    weights = Counter(preferred)
+    for skill, count in required.items():
+        weights[skill] += count + 2
+    return weights, set(required)
+
+'''
+Deterministic skill-gap analysis (same JSON shape as the LLM stage, recommendations left empty):
+    matched_skills: JD skills the resume shows in its experience / projects / summary
+    weak_skills:    JD skills the resume only lists in its skills section (claimed, never demonstrated)
+    missing_skills: JD skills the resume does not mention at all
+    priority_gaps:  the most important missing required skills (then weak ones), with the reason
+Every list is sorted by how much the JD stresses the skill.
+'''
+def analyze_skill_gap(resume_text: str, job_title: str, job_description: str,
+                      job_profile: JobProfile = None) -> SkillGapAnalysis:
+    matcher = get_skill_matcher()
+    have, only_listed = resume_skills(resume_text, matcher)
+    weights, required = job_skills(job_title, job_description, job_profile, matcher)
+    ranked = sorted(weights, key=lambda s: (-weights[s], s))
+
+    matched = [s for s in ranked if s in have and s not in only_listed]
+    weak = [s for s in ranked if s in only_listed]
+    missing = [s for s in ranked if s not in have]
+
+    gaps = []
+    for skill in [s for s in missing if s in required] + [s for s in weak if s in required]:
+        if skill in only_listed:
+            reason = "Required by the job; listed in your skills but not shown in any experience or project."
+        else:
+            reason = "Required by the job and not found anywhere in your resume."
+        gaps.append(PriorityGap(skill=skill, reason=reason))
+    return SkillGapAnalysis(matched_skills=matched, missing_skills=missing, weak_skills=weak,
+                            priority_gaps=gaps[:MAX_PRIORITY_GAPS])
+
+# Recommendations written without an LLM (used when the recommendation call is off or fails).
+def local_recommendations(gap: SkillGapAnalysis) -> list:
+    recommendations = []
+    for item in gap.priority_gaps:
+        if item.skill in gap.weak_skills:
+            recommendations.append(f"Add a bullet that shows {item.skill} in use, with a measurable result.")
+        else:
+            recommendations.append(f"Build or describe hands-on work with {item.skill} (a project, course or task at work).")
+    if not recommendations and gap.missing_skills:
+        recommendations.append("Mention " + ", ".join(gap.missing_skills[:3]) + " if you have used them.")
+    return recommendations
@@ -0,0 +1,154 @@
+'''
+Content-addressed cache for pipeline stage outputs.
+
+A stage output is stored under a hash of:
+    1) the stage name
+    2) the agent's model and temperature
+    3) the fully rendered Task description (which already contains the resume / JD text)
+So the same resume + JD + prompt always maps to the same key, and any change to one of them is a miss.
+
+Entries live in a local SQLite file with TTL expiry and LRU eviction
+(by number of entries and by total size in bytes).
+'''
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import config
+from agents import MODEL
+
+
+'''
+Reads (model, temperature) from an agent.
+Agents are built with model=... and temperature=..., but depending on the CrewAI version these
+may end up on the agent itself or on its llm object, so we check both.
+'''
+def agent_settings(agent):
+    llm = getattr(agent, "llm", None)
+    model = getattr(agent, "model", None) or getattr(llm, "model", None) or MODEL
+    temperature = getattr(agent, "temperature", None)
+    if temperature is None:
+        temperature = getattr(llm, "temperature", None)
+    return str(model), temperature
+
+
+# Builds the cache key for one stage run.
+def make_key(stage: str, model: str, temperature, description: str) -> str:
+    payload = json.dumps([stage, model, temperature, description], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class StageCache:
+    def __init__(self, path: str, ttl_seconds: int = config.CACHE_TTL_SECONDS,
+                 max_entries: int = config.CACHE_MAX_ENTRIES, max_bytes: int = config.CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock() # stages run in parallel threads, so every DB access is serialized
+        self._hits = {}
+        self._misses = {}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL") # lets several processes read while one writes
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stage_cache ("
+            " key TEXT PRIMARY KEY, stage TEXT NOT NULL, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_cache_access ON stage_cache(last_access)")
+        self._conn.commit()
+
+    # Returns the cached output for key, or None on a miss / expired entry.
+    def get(self, key: str, stage: str = ""):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM stage_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM stage_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self._misses[stage] = self._misses.get(stage, 0) + 1
+                return None
+            self._conn.execute("UPDATE stage_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._hits[stage] = self._hits.get(stage, 0) + 1
+            return row[0]
+
+    # Stores an output and evicts old entries if the cache grew past its limits.
+    def set(self, key: str, stage: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage_cache (key, stage, value, size, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, value, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    '''
+    Eviction:
+        1) drop everything older than the TTL
+        2) while there are too many entries or too many bytes, drop the least recently used ones
+    '''
+    def _evict(self, now: float):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM stage_cache WHERE created < ?", (now - self.ttl_seconds,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM stage_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM stage_cache ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM stage_cache WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM stage_cache")
+            self._conn.commit()
+
+    # Hit/miss counters (overall and per stage) since this process started.
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM stage_cache").fetchone()
+            return {
+                "hits": sum(self._hits.values()),
+                "misses": sum(self._misses.values()),
+                "hits_by_stage": dict(self._hits),
+                "misses_by_stage": dict(self._misses),
+                "entries": entries,
+                "bytes": size,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Returns the process-wide cache (created on first use), or None if caching is disabled.
+def get_stage_cache():
+    global _cache
+    if not config.CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = StageCache(config.CACHE_PATH)
+        return _cache
+
+
+# A stage is cached when it is deterministic (temperature 0.0) or when all stages are cacheable.
+def is_cacheable(temperature) -> bool:
+    return config.CACHE_ALL_STAGES or temperature == 0.0
@@ -0,0 +1,106 @@
+'''
+Fast cold start: heavy libraries are imported when they are first needed, and warmed up in the background.
+
+crewai (with LiteLLM and OpenAI behind it), pypdf and python-docx take seconds to import, and before they were
+all imported by the first line of the Streamlit script, so the first page (and every worker restart)
+waited on them. Now:
+    1) agents / tasks / crew / file_loader / exporter import them inside the functions that use them
+    2) warm_up() imports them in a background thread once the first page is on screen (Streamlit) or
+       before the first job is claimed (queue workers), so the first real run does not pay for them either
+    3) python -m startup prints an import-time profile (python -X importtime) of a module, to keep it that way:
+           python -m startup crew batch --top 15
+       The startup benchmark (benchmarks/bench_suite.py startup) tracks the cold import times.
+'''
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import config
+
+_lock = threading.Lock()
+_thread = None
+# module -> seconds its warm-up import took (None while it is still running, the error text if it failed)
+warm_up_times = {}
+
+
+def _import_all(modules: tuple):
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            warm_up_times[name] = round(time.perf_counter() - start, 3)
+        except Exception as e: # a missing optional library is imported (and reported) again where it is used
+            warm_up_times[name] = f"{type(e).__name__}: {e}"
+
+'''
+Imports the heavy modules (config.WARM_UP_MODULES) ahead of their first use.
+background=True starts a daemon thread and returns it right away; calling it again does nothing
+(the thread of the first call is returned). background=False imports in the calling thread.
+Python's import lock makes a real import that runs at the same time wait for the warm-up instead of
+importing the module twice.
+'''
+def warm_up(modules: tuple = None, background: bool = True):
+    global _thread
+    modules = tuple(config.WARM_UP_MODULES if modules is None else modules)
+    if not config.WARM_UP_ENABLED or not modules:
+        return None
+    if not background:
+        _import_all(modules)
+        return None
+    with _lock:
+        if _thread is None:
+            for name in modules:
+                warm_up_times.setdefault(name, None)
+            _thread = threading.Thread(target=_import_all, args=(modules,), name="warm-up", daemon=True)
+            _thread.start()
+        return _thread
+
+
+'''
+Runs "python -X importtime -c 'import <module>'" in a fresh interpreter and parses its report.
+Returns {"module", "total_seconds", "imports": [(self_seconds, cumulative_seconds, name), ...]},
+the imports sorted by cumulative time, slowest first.
+'''
+def import_profile(module: str, python: str = sys.executable) -> dict:
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=env, cwd=root)
+    total = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        imports.append((int(self_us) / 1e6, int(cumulative_us) / 1e6, name.strip()))
+    imports.sort(key=lambda row: row[1], reverse=True)
+    return {"module": module, "total_seconds": total, "imports": imports}
+
+# Prints the top slowest imports of an import_profile() result.
+def print_profile(profile: dict, top: int = 20):
+    print(f"import {profile['module']}: {profile['total_seconds']:.3f}s (fresh interpreter, wall time)")
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for self_s, cumulative_s, name in profile["imports"][:top]:
+        print(f"{cumulative_s:10.3f}s {self_s:8.3f}s  {name}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time profile of a module (python -X importtime)")
+    parser.add_argument("modules", nargs="*", default=["crew", "batch", "job_queue"],
+                        help="modules to import (default: crew batch job_queue)")
+    parser.add_argument("--top", type=int, default=20, help="how many of the slowest imports to list")
+    args = parser.parse_args(argv)
+    for module in args.modules:
+        print_profile(import_profile(module), args.top)
+        print()
+
+if __name__ == "__main__":
+    main()
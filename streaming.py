@@ -0,0 +1,59 @@
+'''
+Routes streamed LLM tokens to whoever is listening for the current pipeline stage.
+
+How it works:
+    1) run_stage_graph() calls token_sink(...) around every stage it runs in a worker thread
+    2) a CrewAI event listener (installed once) receives every streamed chunk
+    3) the chunk is forwarded to the sink of the thread that made the LLM call
+Chunks only arrive when the agents' LLMs stream (config.STREAM_TOKENS=1); otherwise
+callers still get stage start/complete events, just no token deltas in between.
+'''
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+
+# Sends one chunk of text to the sink of the current thread (if any).
+def emit_token(delta: str):
+    sink = getattr(_local, "sink", None)
+    if sink is not None and delta:
+        sink(delta)
+
+# Returns the sink of the current thread (so helper threads can forward tokens to it).
+def current_sink():
+    return getattr(_local, "sink", None)
+
+# Everything streamed by LLM calls in this thread while inside the block goes to sink(delta).
+@contextmanager
+def token_sink(sink):
+    previous = getattr(_local, "sink", None)
+    _local.sink = sink
+    try:
+        yield
+    finally:
+        _local.sink = previous
+
+'''
+Registers a listener for CrewAI's LLM stream chunk events (only once per process).
+Returns False if this CrewAI version has no streaming events.
+'''
+def install_token_listener() -> bool:
+    global _installed
+    with _install_lock:
+        if _installed:
+            return True
+        try:
+            from crewai.utilities.events import crewai_event_bus
+            from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+        except ImportError:
+            return False
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def _on_chunk(source, event):
+            emit_token(getattr(event, "chunk", ""))
+
+        _installed = True
+        return True
@@ -1,13 +1,60 @@
 import os
-import json
+import time
 import streamlit as st
-import matplotlib.pyplot as plt
-from dotenv import load_dotenv
-from file_tools.file_loader import detect_and_extract
-from crew import run_pipeline
-from utils import txt_to_docx_bytes
+from file_tools.extraction_cache import get_extraction_cache
+from crew import get_default_pipeline, PipelineSession, PIPELINE_MODES
+from prompt_budget import drop_page_furniture
+from file_tools.exporter import export_document, MIME_TYPES
+from json_parsing import parse_structured
+from schemas import SkillGapAnalysis
+from stage_cache import get_stage_cache
+from job_queue import JobQueue, QueueFullError
+from results_store import get_results_store, text_hash, OUTPUT_FIELDS
+import config
+# background import of crewai / pypdf / python-docx once the first page is on screen
+from startup import warm_up
+
+# Streamlit re-runs this whole script on every widget interaction.
+# Caching by file content means an upload is only extracted once (the extraction cache
+# behind it also survives restarts and is shared with other sessions). Page headers / footers that
+# repeat on every page of a PDF are dropped here, where the page offsets are known.
+@st.cache_data(show_spinner=False, max_entries=32)
+def extract_upload(filename: str, file_bytes: bytes):
+    entry = get_extraction_cache().get(filename, file_bytes)
+    return entry["ext"], drop_page_furniture(entry["text"], entry.get("page_offsets"))
+
+# One long-lived pipeline per server process: agents and the HTTP connection pool are built once
+# and reused by every session and every run.
+@st.cache_resource
+def get_pipeline():
+    return get_default_pipeline()
+
+# One queue handle per server process (it only holds the SQLite path)
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+# One PipelineSession per browser session: it remembers every stage output, so a re-run
+# (e.g. with only the job description changed) only recomputes the stages whose inputs changed.
+def get_session() -> PipelineSession:
+    if "pipeline_session" not in st.session_state:
+        st.session_state["pipeline_session"] = PipelineSession(get_pipeline())
+    return st.session_state["pipeline_session"]
+
+# DOCX + PDF download buttons for a text. The exporter caches the files by content hash,
+# so they are built once per text, not again on every rerun (tab switch, download click, ...).
+def export_buttons(text: str, label: str, file_stem: str, kind: str):
+    for fmt in ("docx", "pdf"):
+        try:
+            st.download_button(
+                f"Download {label}.{fmt}",
+                data=export_document(text, fmt, kind),
+                file_name=f"{file_stem}.{fmt}",
+                mime=MIME_TYPES[fmt]
+            )
+        except Exception as e:
+            st.warning(f"Could not generate {fmt.upper()}: {e}")
 
-load_dotenv()
 # sets the Streamlit page title, icon, and layout width for the app
 st.set_page_config(page_title="ATS Resume Agent (CrewAI)", page_icon="🧠", layout="wide")
 
@@ -26,6 +73,10 @@ with st.sidebar:
     st.subheader("OpenAI Settings")
     st.text_input("Model:", value="gpt-4o-mini", disabled=True)
     st.write("API Key loaded: ✅ Working OpenAI key")
+    # Run in the background job queue (needs `python job_queue.py worker` running) instead of in this app
+    use_queue = st.checkbox("Run in background job queue", value=config.USE_JOB_QUEUE)
+    # "staged" = separate parse/rewrite/refine calls, "fused" = one structured call (compare latency in the timings)
+    pipeline_mode = st.radio("Pipeline mode", PIPELINE_MODES, index=PIPELINE_MODES.index(config.PIPELINE_MODE), horizontal=True)
 
 
 # st.columns([1,1]) creates two equal columns side by side.
@@ -43,7 +94,165 @@ with colR:
 run_btn = st.button("Run ATS Agent")
 
 # st.tabs([...]) creates four tabs which shows different outputs (cleaned text, rewritten, final, and evaluation).
-tabs = st.tabs(["Cleaned Resume", "Rewritten (ATS-optimized)", "Final (Refined Bullets)", "ATS Evaluation", "Cover Letter", "Skill-Gap Analysis"])
+# The last tab is the history of stored runs (see render_history).
+tabs = st.tabs(["Cleaned Resume", "Rewritten (ATS-optimized)", "Final (Refined Bullets)", "ATS Evaluation", "Cover Letter", "Skill-Gap Analysis", "History"])
+
+'''
+Shows the six pipeline outputs in their tabs (with downloads) plus the stage timings.
+results is the six-tuple returned by run_pipeline.
+'''
+def render_results(tabs, results, timings):
+    cleaned, rewritten, final_resume, evaluation, cover_letter, skill_gap_json = results
+
+    with st.expander("Stage timings (seconds)"):
+        st.json(timings)
+        cache = get_stage_cache()
+        if cache is not None:
+            st.write("Stage cache:")
+            st.json(cache.stats())
+
+    with tabs[0]:
+        st.subheader("Cleaned Resume (plain text)") # shows small heading
+        st.code(cleaned, language="markdown") # displays the cleaned resume as code-formatted text (keeps whitespace).
+        st.download_button(
+            "Download cleaned.txt", # lets user download the cleaned text as cleaned_resume.txt
+            data=cleaned.encode("utf-8"), # converts string to bytes for download.
+            file_name="cleaned_resume.txt",
+            mime="text/plain"
+        )
+
+    with tabs[1]:
+        st.subheader("Rewritten Resume (ATS-optimized)")
+        st.code(rewritten, language="markdown")
+        st.download_button(
+            "Download rewritten.txt",
+            data=rewritten.encode("utf-8"),
+            file_name="rewritten_resume.txt",
+            mime="text/plain"
+        )
+
+    with tabs[2]:
+        st.subheader("Final Resume (Refined Bullets)")
+        st.code(final_resume, language="markdown")
+
+        # Offer DOCX & TXT downloads
+        # lets user download plain text file final_resume.txt
+        st.download_button(
+            "Download final.txt",
+            data=final_resume.encode("utf-8"),
+            file_name="final_resume.txt",
+            mime="text/plain"
+        )
+
+        # Then it exports the text as styled Word (.docx) and PDF files (headings, bullets, ...).
+        # If a conversion fails, it shows a warning message with the error.
+        export_buttons(final_resume, "final", "final_resume", "resume")
+
+    with tabs[3]:
+        st.subheader("ATS Evaluation & Suggestions")
+        # Parse evaluation as JSON (tolerates code fences, extra text, single quotes and trailing commas)
+        parsed = parse_structured(evaluation)
+
+        # If parsed is a dictionary (valid JSON):
+        if parsed and isinstance(parsed, dict):
+            st.json(parsed) # st.json(parsed) pretty-prints the JSON structure
+            # Pretty headline
+            # If the parsed JSON contains overall_score, st.metric(...) displays a large metric badge like “Overall ATS Score: 85/100”
+            if "overall_score" in parsed:
+                st.metric("Overall ATS Score", f"{parsed['overall_score']}/100")
+        else:
+            st.write("Raw evaluation output:")
+            st.code(evaluation, language="json")
+
+    with tabs[4]:
+        st.subheader("Generated Cover Letter")
+        st.code(cover_letter, language="markdown")
+
+        st.download_button(
+            "Download cover_letter.txt",
+            cover_letter.encode("utf-8"),
+            "cover_letter.txt",
+            mime="text/plain"
+        )
+
+        export_buttons(cover_letter, "Cover_letter", "Cover_letter", "letter")
+
+    with tabs[5]:
+        st.subheader("Skill-Gap Analysis")
+        parsed = parse_structured(skill_gap_json, SkillGapAnalysis)
+
+        if parsed:
+            st.json(parsed)
+        else:
+            st.write("Raw Output:")
+            st.code(skill_gap_json, language="json")
+
+'''
+History tab: past runs from the results store (results_store.py), newest or best-scored first, or found by
+full-text search; one page at a time (the cursor of every page seen is kept, so "Previous page" works).
+A run can be opened in the result tabs, and one output of two runs can be compared as a diff.
+'''
+def render_history(store, upload):
+    st.caption(f"{store.stats()['runs']} stored runs")
+    col_query, col_title, col_score, col_order = st.columns([3, 2, 1, 1])
+    query = col_query.text_input("Search past outputs", key="history_query").strip()
+    title = col_title.text_input("Job title (exact)", key="history_title").strip()
+    min_score = col_score.number_input("Min score", min_value=0, max_value=100, value=0, key="history_min_score")
+    order = col_order.selectbox("Order", ("relevance", "recent") if query else ("recent", "score"),
+                                key="history_order_search" if query else "history_order")
+    resume_hash = None
+    if upload is not None and st.checkbox("Only runs of the uploaded resume", key="history_this_resume"):
+        resume_hash = text_hash(extract_upload(upload.name, upload.getvalue())[1])
+
+    filters = (query, title, min_score, order, resume_hash)
+    if st.session_state.get("history_filters") != filters: # new filters start again at page 1
+        st.session_state["history_filters"] = filters
+        st.session_state["history_cursors"] = [None]
+    cursors = st.session_state["history_cursors"]
+    options = dict(cursor=cursors[-1], job_title=title or None, min_score=min_score or None, resume_hash=resume_hash)
+    page = store.search(query, order=order, **options) if query else store.list_runs(order=order, **options)
+
+    if not page["runs"]:
+        st.info("No stored runs match.")
+        return
+    st.dataframe(
+        [{"id": r["id"], "when": time.strftime("%Y-%m-%d %H:%M", time.localtime(r["created"])), "file": r["label"],
+          "job title": r["job_title"], "score": r["score"], **({"match": r["snippet"]} if "snippet" in r else {})}
+         for r in page["runs"]],
+        hide_index=True, use_container_width=True
+    )
+    col_prev, col_next = st.columns(2)
+    if col_prev.button("Previous page", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if col_next.button("Next page", disabled=page["next"] is None):
+        cursors.append(page["next"])
+        st.rerun()
+
+    ids = [r["id"] for r in page["runs"]]
+    names = {r["id"]: f"#{r['id']} {r['job_title']} ({r['label'] or 'no file'}, score {r['score']})" for r in page["runs"]}
+    chosen = st.selectbox("Run", ids, format_func=names.get, key="history_run")
+    if st.button("Show this run in the result tabs"):
+        run = store.get(chosen)
+        st.session_state["last_results"] = (run["results"], run["timings"])
+        st.session_state["last_trace"] = None # stored runs keep their timings, not the full trace
+        st.rerun()
+
+    st.markdown("**Compare two runs**")
+    col_a, col_b, col_field = st.columns(3)
+    run_a = col_a.number_input("Run A (id)", min_value=1, step=1, value=ids[min(1, len(ids) - 1)], key="history_diff_a")
+    run_b = col_b.number_input("Run B (id)", min_value=1, step=1, value=ids[0], key="history_diff_b")
+    field = col_field.selectbox("Output", OUTPUT_FIELDS, index=OUTPUT_FIELDS.index("final_resume"), key="history_diff_field")
+    diff = store.diff(int(run_a), int(run_b), field)
+    if diff is None:
+        st.warning("No stored run with that id.")
+    else:
+        st.caption(f"+{diff['added']} / -{diff['removed']} lines, {diff['similarity']:.0%} similar")
+        st.code(diff["diff"] or "(no differences)", language="diff")
+
+# Set when this run of the pipeline failed: its error and partial output stay in the tabs instead of the
+# results of an earlier run; the rest of the page (History, warm-up) still renders.
+run_failed = False
 
 # only runs when user clicked the button
 if run_btn:
@@ -51,130 +260,120 @@ if run_btn:
         st.error("Please upload a resume file.")
     elif not job_title or not job_desc: # if job title or job description is empty, show an error
         st.error("Please provide a target job title and job description.")
+    elif use_queue:
+        # Hand the run to the job queue workers; the page polls for the result below.
+        try:
+            st.session_state["job_id"] = get_job_queue().submit(up.name, up.getvalue(), job_title.strip(), job_desc.strip())
+        except QueueFullError as e:
+            st.error(f"The server is busy: {e}")
     else:
-        ext, raw_text = detect_and_extract(up.name, up.read())
+        ext, raw_text = extract_upload(up.name, up.getvalue())
         if not raw_text.strip():
             st.error("Could not extract any text from the file.")
         else:
-            with st.spinner("Running Crew agents..."):
-                cleaned, rewritten, final_resume, evaluation, cover_letter, skill_gap_json = run_pipeline(
-                    raw_resume_text=raw_text, 
-                    job_title=job_title.strip(), 
-                    job_description=job_desc.strip()
-                )
-            
-            with tabs[0]:
-                st.subheader("Cleaned Resume (plain text)") # shows small heading
-                st.code(cleaned, language="markdown") # displays the cleaned resume as code-formatted text (keeps whitespace).
-                st.download_button(
-                    "Download cleaned.txt", # lets user download the cleaned text as cleaned_resume.txt
-                    data=cleaned.encode("utf-8"), # converts string to bytes for download.
-                    file_name="cleaned_resume.txt",
-                    mime="text/plain"
-                )
-            
-            with tabs[1]:
-                st.subheader("Rewritten Resume (ATS-optimized)")
-                st.code(rewritten, language="markdown")
-                st.download_button(
-                    "Download rewritten.txt",
-                    data=rewritten.encode("utf-8"),
-                    file_name="rewritten_resume.txt",
-                    mime="text/plain"
-                )
-            
-            with tabs[2]:
-                st.subheader("Final Resume (Refined Bullets)")
-                st.code(final_resume, language="markdown")
-
-                # Offer DOCX & TXT downloads
-                # lets user download plain text file final_resume.txt
-                st.download_button(
-                    "Download final.txt",
-                    data=final_resume.encode("utf-8"),
-                    file_name="final_resume.txt",
-                    mime="text/plain"
-                )
-                
-                # Then it tries to convert the text to a real Word file (.docx) using txt_to_docx_bytes(final_resume). 
-                # If that succeeds, it shows a second download button for final_resume.docx. 
-                # If conversion fails, it shows a warning message with the error.
-                
-                try:
-                    docx_bytes = txt_to_docx_bytes(final_resume)
-                    st.download_button(
-                        "Download final.docx",
-                        data=docx_bytes,
-                        file_name="final_resume.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-                except Exception as e:
-                    st.warning(f"Could not generate DOCX: {e}")
-            
-            with tabs[3]:
-                st.subheader("ATS Evaluation & Suggestions")
-                # Try to parse evaluation as JSON-like
-                parsed = None
-                try:
-                    # Allow loose JSON (single quotes); try a quick fix
-                    text = evaluation.strip()
-                    fixed = text.replace("'", '"') # naively converts single quotes to double quotes to help with parsing if the agent returned single-quoted data
-                    parsed = json.load(fixed)
-                except Exception:
-                    pass
-                
-                # If parsed is a dictionary (valid JSON):
-                if parsed and isinstance(parsed, dict):
-                    st.json(parsed) # st.json(parsed) pretty-prints the JSON structure
-                    # Pretty headline
-                    # If the parsed JSON contains overall_score, st.metric(...) displays a large metric badge like “Overall ATS Score: 85/100”
-                    if "overall_score" in parsed:
-                        st.metric("Overall ATS Score", f"{parsed['overall_score']}/100")
-                else:
-                    st.write("Raw evaluation output:")
-                    st.code(evaluation, language="json")
-            
-            with tabs[4]:
-                st.subheader("Generated Cover Letter")
-                st.code(cover_letter, language="markdown")
-
-                st.download_button(
-                    "Download cover_letter.txt",
-                    cover_letter.encode("utf-8"),
-                    "cover_letter.txt",
-                    mime="text/plain"
-                )
-
-                try:
-                    docx_bytes = txt_to_docx_bytes(cover_letter)
-                    st.download_button(
-                        "Download Cover_letter.docx",
-                        data=docx_bytes,
-                        file_name="Cover_letter.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-                except Exception as e:
-                    st.warning(f"Could not generate DOCX: {e}")
-            
-            with tabs[5]:
-                st.subheader("Skill-Gap Analysis")
-                parsed = None
-                try:
-                    fixed = skill_gap_json.replace("'", '"')
-                    parsed = json.loads(fixed)
-                except:
-                    pass
-
-                if parsed:
-                    st.json(parsed)
-                else:
-                    st.write("Raw Output:")
-                    st.code(skill_gap_json, language="json")
-
+            # Each stage fills its own tab while the pipeline runs (live preview),
+            # then the full result (downloads, parsed JSON, ...) is rendered below once everything is done.
+            # Stages whose inputs did not change since the last run of this session are reused, not re-run.
+            stage_tabs = {"parse": 0, "rewrite": 1, "refine": 2, "evaluate": 3, "cover_letter": 4, "skill_gap": 5}
+            previews = {}
+            for stage, i in stage_tabs.items():
+                with tabs[i]:
+                    previews[stage] = st.empty()
+                    previews[stage].info("Waiting for earlier stages...")
+            streamed = {stage: "" for stage in stage_tabs}
+            status = st.status("Running Crew agents...", expanded=False)
 
+            result = None
+            for event in get_session().stream(
+                raw_resume_text=raw_text,
+                job_title=job_title.strip(),
+                job_description=job_desc.strip(),
+                mode=pipeline_mode,
+                label=up.name
+            ):
+                stage = event.get("stage")
+                # Stages without a tab of their own (job_profile, fused) only show up in the status line
+                preview = previews.get(stage)
+                if event["type"] == "stage_start":
+                    if preview is not None:
+                        preview.info("Working...")
+                    status.update(label=f"Running {stage.replace('_', ' ')}...")
+                elif event["type"] == "token" and preview is not None:
+                    streamed[stage] += event["delta"]
+                    preview.code(streamed[stage], language="markdown")
+                elif event["type"] == "stage_complete" and preview is not None:
+                    preview.code(event["output"], language="markdown")
+                elif event["type"] == "error":
+                    status.update(label="Pipeline failed", state="error")
+                    st.error(f"Pipeline failed: {event['error']}")
+                elif event["type"] == "done":
+                    result = event
+                    st.session_state["last_results"] = (event["results"], event["timings"])
+                    st.session_state["last_trace"] = event["trace"]
+                    reused = f" (reused: {', '.join(event['reused'])})" if event["reused"] else ""
+                    status.update(label=f"Done{reused}", state="complete")
 
+            if result is None:
+                run_failed = True
+            else:
+                for placeholder in previews.values():
+                    placeholder.empty()
 
+# A run submitted to the job queue: show its status and check again every couple of seconds.
+if "job_id" in st.session_state:
+    job = get_job_queue().status(st.session_state["job_id"])
+    if job is None:
+        del st.session_state["job_id"]
+    elif job["status"] == "done":
+        del st.session_state["job_id"]
+        result = job["result"]
+        st.session_state["last_trace"] = result.get("trace")
+        st.session_state["last_results"] = (
+            (result["cleaned"], result["rewritten"], result["final_resume"],
+             result["evaluation"], result["cover_letter"], result["skill_gap"]),
+            result["timings"]
+        )
+    elif job["status"] == "failed":
+        del st.session_state["job_id"]
+        st.error(f"Pipeline failed: {job['error']}")
+    else:
+        if job["status"] == "queued":
+            st.info(f"Job queued ({job.get('position', 0)} ahead of you)...")
+        else:
+            st.info("Job running...")
+        time.sleep(config.JOB_POLL_SECONDS * 2)
+        st.rerun()
 
+# The last results live in st.session_state, so they stay on screen across reruns
+# (tab switches, download clicks, sidebar changes) without running anything again.
+if "last_results" in st.session_state and "job_id" not in st.session_state and not run_failed:
+    render_results(tabs, *st.session_state["last_results"])
 
+# Sidebar: where the time, tokens and money of the last run went (one row per stage, see tracing.py)
+if st.session_state.get("last_trace"):
+    with st.sidebar:
+        st.subheader("Last run breakdown")
+        summary = st.session_state["last_trace"]["summary"]
+        total = summary.get("total", {})
+        st.metric("Estimated cost", f"${total.get('cost_usd', 0):.4f}")
+        st.caption(f"{total.get('calls', 0)} LLM calls, {total.get('cache_hits', 0)} cache hits, "
+                   f"{total.get('prompt_tokens', 0) + total.get('completion_tokens', 0)} tokens, "
+                   f"{total.get('tokens_saved', 0)} prompt tokens saved by compression")
+        st.dataframe(
+            [{"stage": stage, **row} for stage, row in summary.items() if stage != "total"],
+            hide_index=True, use_container_width=True
+        )
+        with st.expander("Trace JSON"):
+            st.json(st.session_state["last_trace"])
 
+# Stored runs of every session, the job queue and batch runs (kept across reruns and restarts)
+with tabs[6]:
+    results_store = get_results_store()
+    if results_store is None:
+        st.info("The results store is turned off (ATS_RESULTS_STORE=0).")
+    else:
+        render_history(results_store, up)
 
+# The page is on screen now: import crewai and the file parsers in a background thread, so the first
+# upload or run does not wait for them (once per server process; later reruns return right away).
+warm_up()
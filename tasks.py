@@ -6,24 +6,60 @@ Each task includes:
     3) expected_output → the format/type of answer you expect
 '''
 
-from crewai import Task
+# Pydantic output schemas: the model must answer in these exact JSON shapes
+from schemas import AtsEvaluation, FusedResume, JobProfile, SkillGapAnalysis, SkillRecommendations
+# compact prompt text of a precomputed JobProfile (sent instead of raw JD slices)
+from job_profile import format_job_profile
+# compression + per-stage token budgets for the resume / JD text of every prompt
+from prompt_budget import prepare_prompt_text
+import config
+
+# Builds a CrewAI Task (crewai is imported on first use, see agents._agent).
+def _task(**settings):
+    from crewai import Task
+    return Task(**settings)
+
+# Document text of a prompt, compressed and cut to the stage's token budget (see prompt_budget.py).
+# limit=True uses config.PROMPT_BUDGETS, a number is a token limit, and None leaves the text as it is:
+# chunked runs pass None because the whole text was already compressed before it was split into chunks.
+def _prompt_text(text, stage, limit=True):
+    if limit is None:
+        return text
+    return prepare_prompt_text(text, stage, limit)
+
+# When a long resume is processed in chunks, tells the agent it only sees one part of it.
+# part is a (number, total) tuple, e.g. (2, 3) for the second of three chunks.
+def _part_note(part):
+    if not part:
+        return ""
+    return (f"This is part {part[0]} of {part[1]} of a longer resume. "
+            "Process only this part, keep its section headings, and do not add a summary or other sections.\n\n")
+
+# The job part of a prompt: the precomputed JobProfile when there is one, otherwise the JD
+# compressed and cut to the stage's job budget (config.PROMPT_JOB_BUDGETS).
+def _job_context(job_description, stage, job_profile=None):
+    if job_profile is not None:
+        return f"JOB PROFILE:\n{format_job_profile(job_profile)}"
+    return f"JOB: {prepare_prompt_text(job_description, stage, budgets=config.PROMPT_JOB_BUDGETS)}"
 '''
 Defines a function that creates a resume parsing task.
 It receives:
     1) agent → the parser agent
     2) raw_resume_text → original resume text
-If the resume is longer than 1500 characters, it cuts it down to 1500 chars and adds "..." (To prevent sending HUGE text to the LLM (saves tokens, cost, and errors))
-If shorter, it uses full text.
+The resume is cleaned up and, if it is longer than the parse budget (config.PROMPT_BUDGETS, in tokens), cut at a line
+boundary and ended with "..." (To prevent sending HUGE text to the LLM (saves tokens, cost, and errors))
+If shorter, it uses full text. Chunked runs pass limit=None and part=(i, n) because each chunk is already small.
 The task description explains exactly what the agent must do.
 \n\n adds blank lines to keep text readable for the model.
 Assigns the agent who should perform this task (the parsing agent).
 Describes what the agent’s answer should look like.
 '''
-def parse_resume_task(agent, raw_resume_text):
-    truncated_text = raw_resume_text[:1500] + "..." if len(raw_resume_text)>1500 else raw_resume_text
+def parse_resume_task(agent, raw_resume_text, limit=True, part=None):
+    truncated_text = _prompt_text(raw_resume_text, "parse", limit)
 
-    return Task(
+    return _task(
         description=(
+            _part_note(part) +
             f"Clean this resume text quickly:\n\n{truncated_text}\n\n"
             "Remove artifacts, normalize bullets to '-', keep all content. Be fast and direct."
         ),
@@ -43,14 +79,14 @@ Task description tells the agent to:
 Assigns the ATS writer agent
 Defines expected output
 '''
-def rewrite_for_ats_task(agent, cleaned_resume_text, job_title, job_description):
-    truncated_resume = cleaned_resume_text[:1200] + "..." if len(cleaned_resume_text)>1200 else cleaned_resume_text
-    truncated_jd = job_description[:300] + "..." if len(job_description)>300 else job_description
+def rewrite_for_ats_task(agent, cleaned_resume_text, job_title, job_description, limit=True, part=None, job_profile=None):
+    truncated_resume = _prompt_text(cleaned_resume_text, "rewrite", limit)
 
-    return Task(
+    return _task(
         description=(
+            _part_note(part) +
             f"Rewrite resume for {job_title}:\n\n"
-            f"JOB: {truncated_jd}\n\n"
+            f"{_job_context(job_description, 'rewrite', job_profile)}\n\n"
             f"RESUME: {truncated_resume}\n\n"
             "Match keywords, use action verbs, add metrics. Target 80+ ATS score. Be direct and fast."
         ),
@@ -68,11 +104,12 @@ Tells the agent to:
 Assigns the bullet refiner agent.
 
 '''
-def refine_bullets_task(agent, rewritten_resume_text):
-    truncated_text = rewritten_resume_text[:1000] + "..." if len(rewritten_resume_text) > 1000 else rewritten_resume_text
+def refine_bullets_task(agent, rewritten_resume_text, limit=True, part=None):
+    truncated_text = _prompt_text(rewritten_resume_text, "refine", limit)
 
-    return Task(
+    return _task(
         description=(
+            _part_note(part) +
             f"Polish these bullets with action verbs and metrics:\n\n{truncated_text}\n\n"
             "Add strong verbs and numbers. Be fast and direct."
         ),
@@ -95,27 +132,27 @@ This tells the evaluator agent:
 
 The final output must be JSON
 '''
-def evaluate_ats_task(agent, final_resume_text, job_title, job_description):
-    truncated_resume = final_resume_text[:800] + "..." if len(final_resume_text) > 800 else final_resume_text
-    truncated_jd = job_description[:200] + "..." if len(job_description) > 200 else job_description
-    
-    return Task(
+def evaluate_ats_task(agent, final_resume_text, job_title, job_description, job_profile=None):
+    truncated_resume = _prompt_text(final_resume_text, "evaluate")
+
+    return _task(
         description=(
             f"Score this resume for {job_title}:\n\n"
-            f"JOB: {truncated_jd}\n\n"
+            f"{_job_context(job_description, 'evaluate', job_profile)}\n\n"
             f"RESUME: {truncated_resume}\n\n"
             "Rate 1-5: keywords, structure, metrics, verbs, format. Return JSON with overall_score (0-100), breakdown, missing_keywords, quick_wins."
         ),
         agent=agent,
-        expected_output="JSON evaluation with scores and recommendations."
+        expected_output="JSON evaluation with scores and recommendations.",
+        output_pydantic=AtsEvaluation
     )
 
-def cover_letter_task(agent, final_resume_text, job_title, job_description):
-    return Task(
+def cover_letter_task(agent, final_resume_text, job_title, job_description, job_profile=None):
+    return _task(
         description=(
             f"Write a professional, personalized cover letter for the role of {job_title}.\n\n"
-            f"JOB DESCRIPTION:\n{job_description[:400]}...\n\n"
-            f"RESUME:\n{final_resume_text[:800]}...\n\n"
+            f"{_job_context(job_description, 'cover_letter', job_profile)}\n\n"
+            f"RESUME:\n{_prompt_text(final_resume_text, 'cover_letter')}\n\n"
             "Output a clean, formal cover letter with:\n"
             "- Strong opening\n"
             "- Key accomplishments\n"
@@ -128,13 +165,13 @@ def cover_letter_task(agent, final_resume_text, job_title, job_description):
         expected_output="A well-structured, polished cover letter."
     )
 
-def skill_gap_task(agent, final_resume_text, job_title, job_description):
-    return Task(
+def skill_gap_task(agent, final_resume_text, job_title, job_description, job_profile=None):
+    return _task(
         description=(
             f"Analyze skill gaps for the role: {job_title}.\n\n"
-            f"JOB DESCRIPTION:\n{job_description[:400]}...\n\n"
-            f"RESUME:\n{final_resume_text[:800]}...\n\n"
-            "Compare skills between RESUME and JOB DESCRIPTION.\n"
+            f"{_job_context(job_description, 'skill_gap', job_profile)}\n\n"
+            f"RESUME:\n{_prompt_text(final_resume_text, 'skill_gap')}\n\n"
+            "Compare skills between RESUME and JOB.\n"
             "Return result STRICTLY as JSON with fields:\n"
             "{\n"
             "  'matched_skills': [...],\n"
@@ -146,7 +183,96 @@ def skill_gap_task(agent, final_resume_text, job_title, job_description):
             "Keep the JSON clean. No extra text."
         ),
         agent=agent,
-        expected_output="JSON describing skill gaps and recommendations."
+        expected_output="JSON describing skill gaps and recommendations.",
+        output_pydantic=SkillGapAnalysis
+    )
+
+
+'''
+Recommendation-only skill-gap task.
+The skill lists come from the local analysis (skill_taxonomy.analyze_skill_gap), so the agent gets
+them instead of the resume and only writes what the candidate should do about the gaps.
+'''
+def skill_recommendations_task(agent, job_title, job_description, gap, job_profile=None):
+    priority = "; ".join(f"{g.skill} ({g.reason})" for g in gap.priority_gaps) or "none"
+    return _task(
+        description=(
+            f"A candidate is applying for the role: {job_title}.\n\n"
+            f"{_job_context(job_description, 'skill_gap', job_profile)}\n\n"
+            f"Skills the resume shows: {', '.join(gap.matched_skills) or 'none'}\n"
+            f"Skills only listed, never shown in experience: {', '.join(gap.weak_skills) or 'none'}\n"
+            f"Skills the resume is missing: {', '.join(gap.missing_skills) or 'none'}\n"
+            f"Most important gaps: {priority}\n\n"
+            "Write 3-5 short, concrete recommendations to close these gaps, most important first. "
+            "Return JSON with one field: recommendations (a list of strings). No extra text."
+        ),
+        agent=agent,
+        expected_output="JSON with a recommendations list.",
+        output_pydantic=SkillRecommendations
+    )
+
+
+'''
+Repair task: used (at most once) when a structured stage returned JSON that could not be parsed.
+Sends only the broken output and the target schema, so it is much cheaper than running the stage again.
+'''
+def repair_json_task(agent, broken_output, schema_json, limit=True):
+    return _task(
+        description=(
+            "The text below was supposed to be a single JSON object but it is malformed or has the wrong shape.\n\n"
+            f"TARGET JSON SCHEMA:\n{schema_json}\n\n"
+            f"BROKEN OUTPUT:\n{prepare_prompt_text(broken_output, 'json_repair', limit, compress=False)}\n\n"
+            "Return ONLY the corrected JSON object (double quotes, no trailing commas, no code fences, no extra text). "
+            "Keep the original content; do not invent values."
+        ),
+        agent=agent,
+        expected_output="One valid JSON object matching the schema."
+    )
+
+
+'''
+"Fused" mode: one call does the work of parse + rewrite + refine.
+The agent returns all three versions of the resume at once as a FusedResume JSON object,
+so the resume is sent once instead of three times (less latency, fewer tokens).
+Like the separate tasks, limit=None / part=(i, n) are used when a long resume is processed in chunks.
+'''
+def fused_resume_task(agent, raw_resume_text, job_title, job_description, limit=True, part=None, job_profile=None):
+    truncated_resume = _prompt_text(raw_resume_text, "fused", limit)
+
+    return _task(
+        description=(
+            _part_note(part) +
+            f"Target role: {job_title}\n\n"
+            f"{_job_context(job_description, 'fused', job_profile)}\n\n"
+            f"RAW RESUME:\n{truncated_resume}\n\n"
+            "Do three steps and return all three results:\n"
+            "1) cleaned_resume: remove artifacts, normalize bullets to '-', keep all content.\n"
+            "2) rewritten_resume: rewrite the cleaned resume for the job - match keywords, action verbs, metrics. Target 80+ ATS score.\n"
+            "3) final_resume: polish every bullet of the rewritten resume with a strong verb and a number.\n"
+            "Be fast and direct."
+        ),
+        agent=agent,
+        expected_output="JSON with cleaned_resume, rewritten_resume and final_resume.",
+        output_pydantic=FusedResume
     )
 
 
+'''
+One-time job description analysis (see job_profile.py).
+The result is cached by JD hash and sent to every candidate's prompts instead of the raw JD,
+so this is the only task that reads the long JD text.
+'''
+def job_profile_task(agent, job_title, job_description, limit=True):
+    return _task(
+        description=(
+            f"Analyze this job posting for the role: {job_title}.\n\n"
+            f"JOB DESCRIPTION:\n{_prompt_text(job_description, 'job_profile', limit)}\n\n"
+            "Extract: seniority, a one-sentence summary of the role, required_skills, preferred_skills "
+            "(nice-to-haves), must_haves (hard requirements such as years of experience, degrees, certifications) "
+            "and keywords (the ATS keywords of the posting, most important first, weight 1-5). "
+            "Use short skill names. Do not invent requirements."
+        ),
+        agent=agent,
+        expected_output="JSON job profile.",
+        output_pydantic=JobProfile
+    )
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+import call_policy
+import config
+from call_policy import CallTimeout, call_with_policy, current_attempt, mark_call_started
+from scheduler import LLMScheduler, SimulatedClock, TicketCancelled
+
+
+class ServerError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+'''
+Fake LLM server: behave(model, attempt, hedge) decides what each call does
+("ok" / a string answer, an exception to raise, or ("sleep", seconds, answer)).
+Every call is recorded as (model, attempt, hedge); calls whose attempt got cancelled are counted.
+'''
+class FakeServer:
+    def __init__(self, behave):
+        self.behave = behave
+        self.calls = []
+        self.cancelled = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model, attempt, hedge):
+        with self._lock:
+            self.calls.append((model, attempt, hedge))
+        current_attempt().on_cancel(lambda: self.cancelled.append((model, attempt, hedge)))
+        action = self.behave(model, attempt, hedge)
+        if isinstance(action, Exception):
+            raise action
+        if isinstance(action, tuple):
+            _, seconds, action = action
+            time.sleep(seconds)
+        return action
+
+
+@pytest.fixture(autouse=True)
+def policy(monkeypatch):
+    monkeypatch.setattr(config, "STAGE_TIMEOUTS", {"*": 0.3})
+    monkeypatch.setattr(config, "CALL_MAX_RETRIES", 2)
+    monkeypatch.setattr(config, "BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(config, "BACKOFF_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(config, "FALLBACK_MODELS", {})
+    monkeypatch.setattr(config, "HEDGE_REQUESTS", False)
+    monkeypatch.setattr(config, "HEDGE_MIN_SAMPLES", 10_000) # always hedge after HEDGE_DEFAULT_SECONDS
+    monkeypatch.setattr(config, "HEDGE_DEFAULT_SECONDS", 0.05)
+    monkeypatch.setattr(call_policy, "_latency", call_policy.LatencyTracker())
+
+
+def test_hanging_call_times_out_and_is_cancelled():
+    server = FakeServer(lambda model, attempt, hedge: ("sleep", 2.0, "late"))
+    start = time.monotonic()
+    with pytest.raises(CallTimeout):
+        call_with_policy("parse", server)
+    assert time.monotonic() - start < 1.5 # 3 attempts of 0.3s (+ backoff), not the 2s answers
+    assert [c[1] for c in server.calls] == [0, 1, 2]
+    assert len(server.cancelled) == 3 # every abandoned attempt was cancelled
+
+
+def test_transient_errors_are_retried_with_backoff():
+    server = FakeServer(lambda model, attempt, hedge: ServerError(429) if attempt < 2 else "ok")
+    assert call_with_policy("parse", server) == "ok"
+    assert server.calls == [(None, 0, False), (None, 1, False), (None, 2, False)]
+
+
+def test_other_errors_are_raised_right_away():
+    server = FakeServer(lambda model, attempt, hedge: ServerError(400))
+    with pytest.raises(ServerError):
+        call_with_policy("parse", server)
+    assert len(server.calls) == 1
+
+
+def test_repeated_failure_switches_to_the_fallback_model(monkeypatch):
+    monkeypatch.setattr(config, "FALLBACK_MODELS", {"*": "fallback-model"})
+    server = FakeServer(lambda model, attempt, hedge: "from fallback" if model == "fallback-model" else ServerError(503))
+    assert call_with_policy("evaluate", server) == "from fallback"
+    assert [c[0] for c in server.calls] == [None, None, None, "fallback-model"]
+
+
+def test_hedge_wins_over_a_slow_primary(monkeypatch):
+    monkeypatch.setattr(config, "HEDGE_REQUESTS", True)
+    server = FakeServer(lambda model, attempt, hedge: "hedge" if hedge else ("sleep", 1.0, "primary"))
+    assert call_with_policy("rewrite", server) == "hedge"
+    assert server.calls == [(None, 0, False), (None, 0, True)]
+    assert server.cancelled == [(None, 0, False)] # the slow primary was abandoned
+
+
+def test_queue_wait_does_not_count_against_the_timeout():
+    def call(model, attempt, hedge):
+        time.sleep(0.5) # waiting for a scheduler turn, longer than the 0.3s stage timeout
+        mark_call_started()
+        time.sleep(0.1)
+        return "ok"
+
+    assert call_with_policy("parse", call, queued=True) == "ok"
+    with pytest.raises(CallTimeout): # the same wait counts when the call is not marked as queued
+        call_with_policy("parse", call)
+
+
+def test_abandoned_attempt_leaves_the_scheduler_queue(monkeypatch):
+    monkeypatch.setattr(config, "CALL_MAX_RETRIES", 0)
+    scheduler = LLMScheduler(max_concurrent=1, clock=SimulatedClock())
+    holder = scheduler.acquire(10) # the only slot is taken: every call stays queued
+    outcome = []
+
+    def call(model, attempt, hedge):
+        ticket = scheduler.submit(10)
+        current_attempt().on_cancel(lambda: scheduler.cancel(ticket))
+        try:
+            scheduler.wait(ticket)
+        except TicketCancelled:
+            outcome.append("cancelled")
+            raise
+        return "ok"
+
+    with pytest.raises(CallTimeout):
+        call_with_policy("parse", call)
+    deadline = time.monotonic() + 2
+    while not outcome and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert outcome == ["cancelled"]
+    assert scheduler.stats()["waiting"] == 0
+    scheduler.release(holder)
+    assert scheduler.stats()["in_flight"] == 0 # the abandoned call never took a slot
+
+
+def test_retryable_errors():
+    assert call_policy.is_retryable(CallTimeout())
+    assert call_policy.is_retryable(ServerError(503))
+    assert not call_policy.is_retryable(ServerError(401))
+    assert not call_policy.is_retryable(ValueError("bad prompt"))
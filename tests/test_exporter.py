@@ -0,0 +1,27 @@
+from io import BytesIO
+
+from docx import Document
+from docx.shared import Inches
+
+import config
+from file_tools import exporter
+
+
+def test_user_template_body_is_not_exported(tmp_path, monkeypatch):
+    template = Document()
+    template.add_paragraph("Lorem ipsum sample text")
+    template.add_table(rows=1, cols=2).cell(0, 0).text = "Placeholder cell"
+    template.sections[0].left_margin = Inches(2)
+    template.sections[0].header.paragraphs[0].text = "Company letterhead"
+    path = tmp_path / "template.docx"
+    template.save(str(path))
+    monkeypatch.setattr(config, "EXPORT_DOCX_TEMPLATE", str(path))
+    monkeypatch.setattr(exporter, "_template_bytes", None)
+
+    doc = Document(BytesIO(exporter.render_docx("Jane Doe\nEXPERIENCE\n- Built things", "resume")))
+    text = [p.text for p in doc.paragraphs]
+    assert "Lorem ipsum sample text" not in text and not doc.tables
+    assert "Jane Doe" in text and "Built things" in "\n".join(text)
+    # the page setup and the header of the template are kept
+    assert doc.sections[0].left_margin == Inches(2)
+    assert doc.sections[0].header.paragraphs[0].text == "Company letterhead"
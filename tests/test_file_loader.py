@@ -0,0 +1,28 @@
+import codecs
+
+from file_tools.file_loader import decode_text, detect_and_extract, detect_file_type
+
+
+def test_text_in_any_8_bit_encoding_is_text():
+    text = "Résumé – Zürich\r\nSenior Engineer"
+    assert detect_and_extract("cv.txt", text.encode("utf-8")) == ("txt", text)
+    assert detect_and_extract("cv.txt", text.encode("cp1252")) == ("txt", text)
+    assert detect_and_extract("cv", "Ørsted, Århus".encode("latin-1")) == ("txt", "Ørsted, Århus")
+
+
+def test_utf16_with_byte_order_mark():
+    data = codecs.BOM_UTF16_LE + "Jane Doe".encode("utf-16-le")
+    assert detect_file_type(data) == "txt"
+    assert decode_text(data) == "Jane Doe"
+
+
+def test_binary_files_are_not_text():
+    assert detect_and_extract("photo.txt", b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01") == ("bin", "")
+    assert detect_file_type(bytes(range(1, 30)) * 50) == "bin" # no NUL bytes, but mostly control bytes
+
+
+def test_pdf_magic():
+    assert detect_file_type(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n") == "pdf"
+    assert detect_file_type(b"\x00\x00\r\n  %PDF-1.7\n") == "pdf" # leading whitespace / NULs
+    assert detect_file_type(b"\x1f\x8b\x02junk\x07%PDF-1.5\n") == "pdf" # binary junk before the magic
+    assert detect_file_type(b"Skills: parsing %PDF-1.4 headers in Python\n") == "txt"
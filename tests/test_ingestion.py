@@ -0,0 +1,31 @@
+import pytest
+
+from file_tools.extraction_cache import ExtractionCache
+from file_tools.ingestion import ingest
+
+
+@pytest.fixture
+def files(tmp_path):
+    good = tmp_path / "jane.txt"
+    good.write_text("Jane Doe\nSenior Engineer", encoding="utf-8")
+    return [str(good), str(tmp_path / "missing.txt"), ("pasted.txt", b"John Roe\nAnalyst")]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_a_bad_file_does_not_stop_the_batch(files, tmp_path, workers):
+    cache = ExtractionCache(directory=str(tmp_path / "cache"))
+    results = sorted(ingest(files, workers=workers, cache=cache), key=lambda r: r["index"])
+    assert [r["name"] for r in results] == ["jane.txt", "missing.txt", "pasted.txt"]
+    assert results[0]["text"] == "Jane Doe\nSenior Engineer" and results[0]["error"] is None
+    assert results[1]["text"] == "" and "FileNotFoundError" in results[1]["error"]
+    assert results[2]["text"] == "John Roe\nAnalyst"
+    # extracted files are cached: the second run does not extract anything
+    again = list(ingest(files[:1], workers=workers, cache=cache))
+    assert again[0]["cached"] and again[0]["text"] == results[0]["text"]
+
+
+def test_file_key_is_the_key_of_its_bytes(tmp_path):
+    path = tmp_path / "cv.pdf"
+    data = b"%PDF-1.4 " + bytes(range(256)) * 10_000 # several hash chunks
+    path.write_bytes(data)
+    assert ExtractionCache.make_file_key(str(path)) == ExtractionCache.make_key("cv.pdf", data)
@@ -0,0 +1,124 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import config
+import job_queue
+from job_queue import JobQueue, JobRequestHandler, _keep_alive
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+# Sets a column of a job directly, e.g. to make its heartbeat look old.
+def set_column(queue, job_id, column, value):
+    with queue._connect() as conn:
+        conn.execute(f"UPDATE jobs SET {column} = ? WHERE id = ?", (value, job_id))
+
+
+def test_a_long_running_job_with_a_heartbeat_is_not_requeued(queue):
+    job_id = queue.submit("cv.txt", b"Jane Doe", "Engineer", "Python")
+    assert queue.claim("worker-1")["id"] == job_id
+    set_column(queue, job_id, "started", 0.0) # started long ago ...
+    assert queue.heartbeat(job_id, "worker-1") # ... but its worker is alive
+    assert queue.requeue_stale(60) == 0
+    assert queue.status(job_id)["status"] == "running"
+
+
+def test_a_job_without_heartbeat_is_requeued_once(queue):
+    job_id = queue.submit("cv.txt", b"Jane Doe", "Engineer", "Python")
+    queue.claim("worker-1")
+    set_column(queue, job_id, "heartbeat", 0.0) # the worker died
+    assert queue.requeue_stale(60) == 1
+    assert queue.status(job_id)["status"] == "queued"
+    assert not queue.heartbeat(job_id, "worker-1") # the dead worker no longer owns the job
+    assert queue.claim("worker-2")["id"] == job_id
+    assert queue.status(job_id)["attempts"] == 2
+
+
+def test_a_requeued_job_is_not_overwritten_by_its_old_worker(queue):
+    job_id = queue.submit("cv.txt", b"Jane Doe", "Engineer", "Python")
+    queue.claim("slow-worker")
+    set_column(queue, job_id, "heartbeat", 0.0)
+    queue.requeue_stale(60)
+    queue.claim("worker-2")
+    assert not queue.complete(job_id, "slow-worker", {"final_resume": "stale"})
+    assert not queue.fail(job_id, "slow-worker", "late error")
+    assert queue.status(job_id)["status"] == "running"
+    assert queue.complete(job_id, "worker-2", {"final_resume": "fresh"})
+    assert queue.status(job_id)["result"] == {"final_resume": "fresh"}
+
+
+def test_keep_alive_stops_when_the_lease_is_lost(queue, monkeypatch):
+    monkeypatch.setattr(config, "JOB_HEARTBEAT_SECONDS", 0.01)
+    job_id = queue.submit("cv.txt", b"Jane Doe", "Engineer", "Python")
+    queue.claim("worker-1")
+    set_column(queue, job_id, "worker", "worker-2") # someone else owns the job now
+    stop, lost = threading.Event(), threading.Event()
+    thread = threading.Thread(target=_keep_alive, args=(queue, job_id, "worker-1", stop, lost))
+    thread.start()
+    thread.join(timeout=2)
+    assert not thread.is_alive() and lost.is_set()
+
+
+def test_connections_are_closed(queue, monkeypatch):
+    opened = []
+    connect = job_queue.sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(job_queue.sqlite3, "connect", tracking_connect)
+    job_id = queue.submit("cv.txt", b"Jane Doe", "Engineer", "Python")
+    queue.claim("worker-1")
+    queue.heartbeat(job_id, "worker-1")
+    queue.complete(job_id, "worker-1", {})
+    queue.status(job_id)
+    queue.counts()
+    queue.requeue_stale()
+    assert len(opened) == 7
+    for conn in opened:
+        with pytest.raises(job_queue.sqlite3.ProgrammingError): # closed
+            conn.execute("SELECT 1")
+
+
+@pytest.fixture
+def api(queue):
+    JobRequestHandler.queue = queue
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JobRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url + "/jobs", data=json.dumps(body).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("body", [["not", "a", "dict"], "text", 42, None,
+                                  {"resume_b64": 5, "job_title": "Engineer", "job_description": "Python"},
+                                  {"job_title": "Engineer", "job_description": "Python"}])
+def test_bad_bodies_get_400(api, body):
+    status, payload = post(api, body)
+    assert status == 400 and payload["error"].startswith("bad request")
+
+
+def test_submit(api, queue):
+    status, payload = post(api, {"resume_b64": "SmFuZSBEb2U=", "job_title": "Engineer", "job_description": "Python"})
+    assert status == 202
+    assert queue.status(payload["job_id"])["status"] == "queued"
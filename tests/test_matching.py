@@ -0,0 +1,34 @@
+from matching import ResumeIndex
+
+JD = "We need a Python engineer with Kubernetes and PostgreSQL experience."
+
+
+def test_resumes_without_any_keyword_are_not_returned():
+    index = ResumeIndex.build([
+        ("python", "Senior Python engineer, PostgreSQL, Kubernetes"),
+        ("partial", "Backend developer using Python"),
+        ("none", "Pastry chef, French cuisine, bakery management"),
+    ])
+    hits = index.search(JD, "Python Engineer", top_k=10)
+    assert [h["id"] for h in hits] == ["python", "partial"]
+    assert all(h["score"] > 0 for h in hits)
+    assert index.search("Underwater basket weaving", top_k=5) == []
+
+
+def test_same_file_name_in_different_folders(tmp_path):
+    paths = []
+    for folder, text in (("team_a", "Python engineer"), ("team_b", "Kubernetes and PostgreSQL engineer")):
+        (tmp_path / folder).mkdir()
+        path = tmp_path / folder / "cv.txt"
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    index = ResumeIndex.build_from_files(paths)
+    assert sorted(index.ids) == sorted(["team_a/cv.txt", "team_b/cv.txt"])
+    assert len(index.search(JD, top_k=10)) == 2
+
+
+def test_files_in_one_folder_keep_their_name(tmp_path):
+    for name in ("jane.txt", "john.txt"):
+        (tmp_path / name).write_text("Python engineer", encoding="utf-8")
+    index = ResumeIndex.build_from_files([str(tmp_path / "jane.txt"), str(tmp_path / "john.txt")])
+    assert sorted(index.ids) == ["jane.txt", "john.txt"]
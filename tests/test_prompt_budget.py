@@ -0,0 +1,62 @@
+import pytest
+
+import config
+from file_tools.file_loader import join_pages
+from prompt_budget import compress_text, drop_page_furniture
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(config, "PROMPT_DROP_REPEATED_LINES", True)
+
+
+def test_repeated_page_headers_and_footers_are_dropped():
+    pages = [
+        "Jane Doe\njane@example.com | 555-0100\nEXPERIENCE\nSenior Engineer, Acme\n- Built things\nPage 1 of 2",
+        "Jane Doe\njane@example.com | 555-0100\n- Shipped more things\nEDUCATION\nBSc Physics\nPage 2 of 2",
+    ]
+    text, offsets = join_pages(pages)
+    kept = drop_page_furniture(text, offsets).split("\n")
+    assert kept.count("Jane Doe") == 1
+    assert kept.count("jane@example.com | 555-0100") == 1
+    assert "Page 1 of 2" not in kept and "Page 2 of 2" not in kept # page numbers at a page edge
+    assert "- Shipped more things" in kept and "BSc Physics" in kept
+
+
+def test_line_inside_a_page_is_kept():
+    # the job title is the header line too, but on page 2 it is content, not an edge line
+    pages = [
+        "Jane Doe\nSenior Engineer\nSUMMARY\nBuilds backends",
+        "Jane Doe\nSenior Engineer\nEXPERIENCE\nAcme Corp\n2019 - 2024\nSenior Engineer\nLed a team\nOwned billing\nOn call",
+    ]
+    text, offsets = join_pages(pages)
+    kept = drop_page_furniture(text, offsets).split("\n")
+    assert kept.count("Jane Doe") == 1
+    assert kept.count("Senior Engineer") == 2 # the header copy on page 2 goes, the one under Acme stays
+
+
+def test_single_page_and_unpaged_text_is_unchanged():
+    text = "Senior Engineer\nJane Doe\nEXPERIENCE\nSenior Engineer\nAcme\nSenior Engineer"
+    assert drop_page_furniture(text, [0]) == text
+    assert drop_page_furniture(text) == text
+    assert compress_text(text).count("Senior Engineer") == 3 # compress_text no longer drops repeated lines
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(config, "PROMPT_DROP_REPEATED_LINES", False)
+    text, offsets = join_pages(["Jane Doe\nA", "Jane Doe\nB"])
+    assert drop_page_furniture(text, offsets) == text
+
+
+def test_page_numbers_only_at_page_edges():
+    pages = ["Jane Doe\njane@example.com\nEXPERIENCE\nLed team of\n12\nengineers\nShipped billing\nOwned search\n1",
+             "- 2 -\nEDUCATION\nBSc Physics"]
+    text, offsets = join_pages(pages)
+    kept = drop_page_furniture(text, offsets).split("\n")
+    assert "12" in kept # inside the page: content
+    assert "1" not in kept and "- 2 -" not in kept
+
+
+def test_compress_text_keeps_numbers_and_compound_words():
+    text = "Led team of\n12\nengineers\nwell-\nknown co-\nfounder"
+    assert compress_text(text) == "Led team of\n12\nengineers\nwell-known co-founder"
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+import results_store
+from results_store import ResultsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(str(tmp_path / "results.sqlite3"))
+
+
+# The six outputs of run_pipeline for a run with the given final resume and overall score.
+def outputs(final_resume: str, score: int = None, cover_letter: str = "Dear hiring manager") -> tuple:
+    evaluation = json.dumps({"overall_score": score}) if score is not None else "no score"
+    return ("cleaned", "rewritten " + final_resume, final_resume, evaluation, cover_letter, "skill gap")
+
+
+def test_the_same_run_is_stored_once(store):
+    first = store.save("Jane Doe resume", "Engineer", "Python job", outputs("Python engineer"))
+    assert store.save("Jane  Doe\nresume", "Engineer", "Python job", outputs("Python engineer")) == first # same text
+    other = store.save("Jane Doe resume", "Engineer", "Python job", outputs("Senior Python engineer"))
+    assert other != first
+    assert store.stats()["runs"] == 2
+
+
+def test_list_runs_pages_with_cursors(store):
+    ids = [store.save(f"resume {i}", "Engineer", "Python job", outputs(f"resume {i}", score=i % 4 * 10))
+           for i in range(7)]
+    seen, cursor = [], None
+    while True:
+        page = store.list_runs(limit=3, cursor=cursor)
+        seen += [run["id"] for run in page["runs"]]
+        cursor = page["next"]
+        if cursor is None:
+            break
+    assert seen == sorted(ids, reverse=True)
+
+    # by score: highest first, ties newest first, and a new run does not shift the pages already seen
+    first = store.list_runs(limit=4, order="score")
+    store.save("late resume", "Engineer", "Python job", outputs("late", score=0))
+    rest = store.list_runs(limit=10, order="score", cursor=first["next"])
+    ordered = [(run["score"], run["id"]) for run in first["runs"] + rest["runs"]]
+    assert ordered == sorted(ordered, reverse=True)
+    assert len({run_id for _, run_id in ordered}) == 8
+
+
+def test_list_runs_filters(store):
+    store.save("Jane resume", "Engineer", "Python job", outputs("a", score=80))
+    store.save("John resume", "Analyst", "SQL job", outputs("b", score=40))
+    assert [r["job_title"] for r in store.list_runs(job_title="engineer")["runs"]] == ["Engineer"]
+    assert [r["score"] for r in store.list_runs(min_score=50)["runs"]] == [80]
+    jane = results_store.text_hash("Jane resume")
+    assert len(store.list_runs(resume_hash=jane)["runs"]) == 1
+
+
+@pytest.mark.parametrize("order", ["relevance", "recent"])
+def test_search(store, order):
+    kube = store.save("r1", "Engineer", "job", outputs("Deployed services on Kubernetes"))
+    python = store.save("r2", "Engineer", "job", outputs("Wrote Python tools"))
+    both = store.save("r3", "Engineer", "job", outputs("Python services on Kubernetes"))
+    found = [r["id"] for r in store.search("kube", order=order)["runs"]] # the last word is a prefix
+    assert sorted(found) == sorted([kube, both])
+    assert [r["id"] for r in store.search("python kubernetes", order=order)["runs"]] == [both]
+    if store.fts:
+        assert "[" in store.search("python", order=order)["runs"][0]["snippet"]
+        assert [r["id"] for r in store.search("python NOT kubernetes", order=order, raw=True)["runs"]] == [python]
+
+
+def test_search_pages_and_deleted_runs(store):
+    ids = [store.save(f"r{i}", "Engineer", "job", outputs(f"Python project {i}")) for i in range(5)]
+    page = store.search("python", limit=2, order="recent")
+    rest = store.search("python", limit=10, order="recent", cursor=page["next"])
+    assert [r["id"] for r in page["runs"] + rest["runs"]] == sorted(ids, reverse=True)
+    assert store.delete(ids[0]) and not store.delete(ids[0])
+    assert ids[0] not in [r["id"] for r in store.search("python", limit=10)["runs"]]
+    assert store.get(ids[0]) is None
+
+
+def test_diff(store):
+    a = store.save("r", "Engineer", "job", outputs("Jane Doe\nPython engineer\nBerlin"))
+    b = store.save("r", "Engineer", "job", outputs("Jane Doe\nSenior Python engineer\nBerlin"))
+    diff = store.diff(a, b)
+    assert diff["added"] == 1 and diff["removed"] == 1
+    assert "+Senior Python engineer" in diff["diff"]
+    assert store.diff(a, a)["similarity"] == 1.0
+    assert store.diff(a, 999) is None
+    with pytest.raises(ValueError):
+        store.diff(a, b, field="resume_bytes")
+
+
+def test_get_returns_the_outputs(store):
+    run_id = store.save("r", "Engineer", "Python job", outputs("Final text", score=72), timings={"parse": 1.5},
+                        label="cv.pdf")
+    run = store.get(run_id)
+    assert run["final_resume"] == "Final text" and run["score"] == 72 and run["label"] == "cv.pdf"
+    assert run["timings"] == {"parse": 1.5} and run["job_description"] == "Python job"
+
+
+def test_connections_are_closed(store, monkeypatch):
+    opened = []
+    connect = results_store.sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(results_store.sqlite3, "connect", tracking_connect)
+    run_id = store.save("r", "Engineer", "job", outputs("Python"))
+    store.list_runs()
+    store.search("python")
+    store.get(run_id)
+    store.diff(run_id, run_id)
+    store.stats()
+    store.optimize()
+    store.delete(run_id)
+    assert len(opened) == 8
+    for conn in opened:
+        with pytest.raises(results_store.sqlite3.ProgrammingError): # closed
+            conn.execute("SELECT 1")
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+
+import config
+from call_policy import CallTimeout, call_with_policy, current_attempt, mark_call_started
+from scheduler import LLMScheduler, SimulatedClock, TicketCancelled
+
+
+# Dispatches and advances the clock in steps until nothing is queued; returns [(time, ticket)] in grant order.
+def drain(scheduler, clock, step=0.25, limit=10_000):
+    granted = []
+    for _ in range(limit):
+        for ticket in scheduler.dispatch():
+            granted.append((clock.now(), ticket))
+            scheduler.release(ticket)
+        if not scheduler.stats()["waiting"]:
+            return granted
+        clock.advance(step)
+    raise AssertionError("queue did not drain")
+
+# Largest amount started in any window of `window` seconds.
+def max_in_window(granted, window, amount=lambda t: 1):
+    times = [(t, amount(ticket)) for t, ticket in granted]
+    return max(sum(a for u, a in times if t <= u < t + window) for t, _ in times)
+
+
+def test_requests_per_minute_never_exceeded():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(requests_per_minute=60, clock=clock, burst_seconds=6)
+    for _ in range(200):
+        scheduler.submit(100)
+    granted = drain(scheduler, clock)
+    assert len(granted) == 200
+    # token bucket: at most the burst (6) plus the refill (1/s) in any window
+    for window in (1, 10, 60):
+        assert max_in_window(granted, window) <= 6 + window + 1e-9
+
+
+def test_tokens_per_minute_never_exceeded():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(tokens_per_minute=60_000, clock=clock, burst_seconds=6)
+    sizes = [500, 2000, 1200, 3000, 800] * 30
+    for tokens in sizes:
+        scheduler.submit(tokens)
+    granted = drain(scheduler, clock)
+    assert len(granted) == len(sizes)
+    for window in (1, 10, 60):
+        assert max_in_window(granted, window, lambda t: t.tokens) <= 6_000 + 1_000 * window + 1e-6
+
+
+def test_interactive_goes_before_batch():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(requests_per_minute=60, clock=clock, burst_seconds=1, batch_max_wait=0)
+    batch = [scheduler.submit(100, "nightly", "batch") for _ in range(5)]
+    interactive = scheduler.submit(100, "user", "interactive")
+    order = [ticket for _, ticket in drain(scheduler, clock)]
+    assert order[0] is interactive
+    assert order[1:] == batch
+
+
+def test_overdue_batch_call_goes_next_but_not_twice_in_a_row():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(requests_per_minute=60, clock=clock, burst_seconds=1, batch_max_wait=10)
+    scheduler.dispatch() # use up the burst
+    batch = [scheduler.submit(100, "nightly", "batch") for _ in range(3)]
+    clock.advance(10)
+    interactive = [scheduler.submit(100, f"user{i}", "interactive") for i in range(3)]
+    order = [ticket for _, ticket in drain(scheduler, clock)]
+    assert [t.priority for t in order[:4]] == ["batch", "interactive", "batch", "interactive"]
+    assert set(order) == set(batch + interactive)
+
+
+def test_tenants_share_fairly():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(requests_per_minute=60, clock=clock, burst_seconds=1)
+    for _ in range(50):
+        scheduler.submit(1000, "big")
+    small = [scheduler.submit(1000, "small") for _ in range(5)]
+    order = [ticket for _, ticket in drain(scheduler, clock)]
+    # the small tenant does not wait behind the 50 queued calls: its calls alternate with the big tenant's
+    assert max(order.index(t) for t in small) <= 10
+
+
+def test_cancel_queued_ticket_leaves_the_queue():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(max_concurrent=1, clock=clock)
+    running = scheduler.acquire(10)
+    errors = []
+    queued = scheduler.submit(10)
+
+    def waiter():
+        try:
+            scheduler.wait(queued)
+        except TicketCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    scheduler.cancel(queued)
+    thread.join(timeout=2)
+    assert not thread.is_alive() and len(errors) == 1
+    assert scheduler.stats()["waiting"] == 0
+    scheduler.release(running)
+    assert scheduler.stats()["in_flight"] == 0
+    scheduler.cancel(queued) # a second cancel does nothing
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_error_and_cancel_release_a_granted_ticket_once():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(max_concurrent=1, clock=clock)
+    ticket = scheduler.acquire(10)
+    try: # what run_single_task does when kickoff fails
+        raise RuntimeError("provider error")
+    except RuntimeError:
+        scheduler.release(ticket)
+    scheduler.cancel(ticket) # the call policy abandoning the same call later
+    scheduler.release(ticket, 50)
+    assert scheduler.stats()["in_flight"] == 0
+    # the slot is free again: the next call starts right away
+    assert scheduler.acquire(10).granted_at == clock.now()
+
+
+def test_a_timed_out_call_keeps_its_slot_until_it_really_ends(monkeypatch):
+    monkeypatch.setattr(config, "STAGE_TIMEOUTS", {"*": 0.1})
+    monkeypatch.setattr(config, "CALL_MAX_RETRIES", 0)
+    monkeypatch.setattr(config, "HEDGE_REQUESTS", False)
+    monkeypatch.setattr(config, "FALLBACK_MODELS", {})
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(tokens_per_minute=60_000, max_concurrent=1, clock=clock, burst_seconds=6)
+    finish = threading.Event()
+    ended = threading.Event()
+
+    def call(model, attempt, hedge): # what run_single_task does around Crew.kickoff
+        ticket = scheduler.submit(1000)
+        current_attempt().on_cancel(lambda: scheduler.cancel(ticket))
+        scheduler.wait(ticket)
+        mark_call_started()
+        finish.wait(5) # the request keeps running after the policy gave up on it
+        scheduler.release(ticket, 4000)
+        ended.set()
+
+    with pytest.raises(CallTimeout):
+        call_with_policy("parse", call, queued=True)
+    # abandoned, but still in flight: it keeps the only slot and the next call has to wait
+    assert scheduler.stats()["in_flight"] == 1
+    queued = scheduler.submit(100)
+    assert scheduler.dispatch() == []
+    finish.set()
+    assert ended.wait(2)
+    stats = scheduler.stats()
+    assert stats["in_flight"] == 0 and stats["actual_tokens"] == 4000 # the real usage was still charged
+    assert scheduler.dispatch() == [queued]
+
+
+def test_blocked_acquire_wakes_up_when_the_clock_advances():
+    clock = SimulatedClock()
+    scheduler = LLMScheduler(requests_per_minute=60, clock=clock, burst_seconds=1)
+    scheduler.acquire(10)
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (scheduler.acquire(10), done.set()))
+    thread.start()
+    assert not done.wait(0.1) # no request left until the bucket refills
+    clock.advance(1.0)
+    assert done.wait(2)
+    thread.join()
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        LLMScheduler(requests_per_minute=60, clock=SimulatedClock()).submit(10, priority="urgent")
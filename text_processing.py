@@ -0,0 +1,74 @@
+'''
+Small, dependency-free text helpers shared by the local (non-LLM) scoring and matching code.
+
+    tokenize()   -> lowercase word tokens; keeps tech terms like "c++", "c#", "node.js", "ci/cd"
+    lemmatize()  -> light rule-based suffix stripping so "managed", "manages", "managing" all match
+    terms()      -> tokenize + drop stop words + lemmatize
+'''
+import re
+
+# Words that carry no meaning for matching a resume to a job description
+STOPWORDS = frozenset("""
+a about above across after again against all also am an and any are as at be been before being below
+between both but by can could did do does doing down during each either etc few for from further had
+has have having he her here hers him his how i if in into is it its itself just let may me might more
+most must my no nor not now of off on once only or other our ours out over own per same she should so
+some such than that the their them then there these they this those through to too under until up us
+very via was we were what when where which while who whom why will with within without would you your
+""".split())
+
+# Words that show up in almost every job description and say nothing about the role
+JD_BOILERPLATE = frozenset("""
+ability able candidate candidates company environment excellent experience experienced good great hire
+hiring ideal including job join knowledge looking need needs new opportunity plus position preferred required seeking want
+requirement requirements responsibilities responsibility role skill skills strong team understanding
+work working year years well using use within across
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./\-]*[a-z0-9+#]|[a-z0-9]")
+_VOWELS = set("aeiou")
+
+
+# Splits text into lowercase tokens.
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+'''
+Very small rule-based lemmatizer (closer to a light stemmer).
+It only needs to map word variants onto the same key, so both the resume and the JD
+are passed through the same rules. Tokens with digits or symbols (python3, c++, node.js)
+and short tokens (sql, aws) are left as they are.
+'''
+def lemmatize(token: str) -> str:
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    word = token
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith(("sses", "xes", "ches", "shes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            stem = word[:-len(suffix)]
+            if any(c in _VOWELS for c in stem):
+                word = stem
+                # running -> runn -> run
+                if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                    word = word[:-1]
+            break
+
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+# Returns the lemmatized, non-stop-word terms of a text (in order, with repeats).
+def terms(text: str, extra_stopwords=frozenset()) -> list:
+    out = []
+    for token in tokenize(text):
+        if token in STOPWORDS or token in extra_stopwords or token.isdigit():
+            continue
+        out.append(lemmatize(token))
+    return out
@@ -0,0 +1,41 @@
+'''
+Local token counting (no API call).
+
+Uses tiktoken with the encoding of the configured MODEL when it is available.
+If tiktoken is not installed, or its encoding files cannot be loaded (offline container),
+it falls back to the usual ~4 characters per token estimate.
+'''
+import math
+import threading
+
+from agents import MODEL
+
+_encoders = {}
+_lock = threading.Lock()
+
+
+# Returns the tiktoken encoder for a model, or None if tiktoken can't be used.
+def get_encoder(model: str = MODEL):
+    with _lock:
+        if model in _encoders:
+            return _encoders[model]
+        encoder = None
+        try:
+            import tiktoken
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError: # unknown model name -> encoding used by current OpenAI models
+                encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            encoder = None
+        _encoders[model] = encoder # failures are remembered too, so we don't retry on every call
+        return encoder
+
+# Counts the tokens of text for the given model.
+def count_tokens(text: str, model: str = MODEL) -> int:
+    if not text:
+        return 0
+    encoder = get_encoder(model)
+    if encoder is None:
+        return math.ceil(len(text) / 4)
+    return len(encoder.encode(text, disallowed_special=()))
@@ -0,0 +1,300 @@
+'''
+Tracing for every LLM call (Crew.kickoff) of the pipeline.
+
+Each call becomes one "span" with:
+    stage, model, wall_seconds (kickoff time), queue_seconds (time spent waiting for the scheduler, see scheduler.py),
+    prompt_tokens, completion_tokens, cost_usd (estimated from MODEL_PRICES), cache_hit, retries
+Spans are exported three ways (and so are the prompt tokens saved by prompt_budget.py, see record_prompt_budget):
+    1) structured logs: one JSON line per span on the "ats.trace" logger (config.TRACE_LOG=1 prints them to stderr)
+    2) metrics: process-wide counters served in the Prometheus text format (start_metrics_server / render_metrics)
+    3) per-run traces: ResumePipeline groups the spans of one run in a RunTrace (shown in Streamlit,
+       and written to config.TRACE_DIR as JSON when set)
+
+Like streaming.py, the current run is kept per thread; run_stage_graph() and the chunk helpers
+forward it to their worker threads with run_trace(...).
+'''
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# Estimated price per 1M tokens (input, output) in USD. Unknown models are counted with cost 0.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+logger = logging.getLogger("ats.trace")
+if config.TRACE_LOG and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_local = threading.local()
+
+
+# Estimated cost of one call in USD.
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = MODEL_PRICES.get((model or "").split("/")[-1], (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+_usage_seen = {} # id(agent) -> last cumulative (prompt, completion, requests)
+_usage_lock = threading.Lock()
+
+'''
+Returns (prompt_tokens, completion_tokens, requests) used by ONE kickoff.
+CrewOutput.token_usage adds up everything the agent's LLM has done so far, and pooled agents are
+reused across runs, so the numbers of the previous kickoff of the same agent are subtracted.
+'''
+def kickoff_usage(agent, result) -> tuple:
+    usage = getattr(result, "token_usage", None)
+    if usage is None:
+        return 0, 0, 0
+    total = (int(getattr(usage, "prompt_tokens", 0) or 0),
+             int(getattr(usage, "completion_tokens", 0) or 0),
+             int(getattr(usage, "successful_requests", 0) or 0))
+    with _usage_lock:
+        previous = _usage_seen.get(id(agent), (0, 0, 0))
+        _usage_seen[id(agent)] = total
+    if any(now < before for now, before in zip(total, previous)):
+        return total # counters were reset (a new agent got the same id)
+    return tuple(now - before for now, before in zip(total, previous))
+
+
+'''
+All spans of one pipeline run (thread-safe: stages add spans from several threads).
+summary() groups them by stage for the UI; to_dict()/save() give the full trace.
+'''
+class RunTrace:
+    # tenant / priority: who the run is for; the scheduler (scheduler.py) queues its LLM calls by them
+    def __init__(self, run_id: str = None, tenant: str = None, priority: str = None):
+        self.id = run_id or uuid.uuid4().hex[:12]
+        self.tenant = tenant
+        self.priority = priority
+        self.started = time.time()
+        self.spans = []
+        self.prompt_budget = {} # stage -> {"original_tokens", "sent_tokens", "tokens_saved"}
+        self._lock = threading.Lock()
+
+    def add(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def add_prompt_budget(self, stage: str, original_tokens: int, sent_tokens: int):
+        with self._lock:
+            row = self.prompt_budget.setdefault(stage, {"original_tokens": 0, "sent_tokens": 0, "tokens_saved": 0})
+            row["original_tokens"] += original_tokens
+            row["sent_tokens"] += sent_tokens
+            row["tokens_saved"] += original_tokens - sent_tokens
+
+    # Totals per stage plus an overall "total" row (tokens_saved: prompt tokens removed by prompt_budget.py).
+    def summary(self) -> dict:
+        fields = ("calls", "cache_hits", "retries", "wall_seconds", "queue_seconds",
+                  "prompt_tokens", "completion_tokens", "cost_usd", "tokens_saved")
+        rows = {}
+        with self._lock:
+            spans = list(self.spans)
+            budget = {stage: dict(row) for stage, row in self.prompt_budget.items()}
+        for stage, row in budget.items():
+            for key in (stage or "other", "total"):
+                rows.setdefault(key, dict.fromkeys(fields, 0))["tokens_saved"] += row["tokens_saved"]
+        for span in spans:
+            for key in (span["stage"] or "other", "total"):
+                row = rows.setdefault(key, dict.fromkeys(fields, 0))
+                row["calls"] += 1
+                row["cache_hits"] += int(span["cache_hit"])
+                for field in fields[2:-1]:
+                    row[field] += span[field]
+        for row in rows.values():
+            for field in ("wall_seconds", "queue_seconds"):
+                row[field] = round(row[field], 3)
+            row["cost_usd"] = round(row["cost_usd"], 6)
+        return rows
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+            budget = {stage: dict(row) for stage, row in self.prompt_budget.items()}
+        return {"run_id": self.id, "started": self.started, "tenant": self.tenant, "priority": self.priority,
+                "spans": spans, "prompt_budget": budget,
+                "summary": self.summary()}
+
+    # Writes the trace as <directory>/trace_<run id>.json and returns the path.
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace_{self.id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+# Returns the RunTrace of the current thread (or None outside of a traced run).
+def current_trace():
+    return getattr(_local, "trace", None)
+
+# Every span recorded in this thread while inside the block is added to trace.
+@contextmanager
+def run_trace(trace):
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+'''
+Process-wide metrics in the Prometheus text format (no client library needed).
+Counters are labelled by stage; kickoff latency is also kept as a histogram.
+'''
+class Metrics:
+    BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {} # (name, labels tuple) -> value
+        self._histograms = {} # stage -> [bucket counts..., sum, count]
+
+    def _inc(self, name: str, labels: tuple, value: float = 1):
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def observe(self, span: dict):
+        stage = (("stage", span["stage"] or "other"),)
+        with self._lock:
+            self._inc("ats_llm_calls_total", stage + (("cache", "hit" if span["cache_hit"] else "miss"),))
+            self._inc("ats_llm_retries_total", stage, span["retries"])
+            self._inc("ats_llm_tokens_total", stage + (("kind", "prompt"),), span["prompt_tokens"])
+            self._inc("ats_llm_tokens_total", stage + (("kind", "completion"),), span["completion_tokens"])
+            self._inc("ats_llm_cost_usd_total", stage, span["cost_usd"])
+            self._inc("ats_llm_queue_seconds_total", stage, span["queue_seconds"])
+            if not span["cache_hit"]:
+                hist = self._histograms.setdefault(stage[0][1], [0] * (len(self.BUCKETS) + 2))
+                for i, bound in enumerate(self.BUCKETS):
+                    if span["wall_seconds"] <= bound:
+                        hist[i] += 1
+                hist[-2] += span["wall_seconds"]
+                hist[-1] += 1
+
+    def observe_prompt_budget(self, stage: str, original_tokens: int, sent_tokens: int):
+        labels = (("stage", stage or "other"),)
+        with self._lock:
+            self._inc("ats_prompt_tokens_original_total", labels, original_tokens)
+            self._inc("ats_prompt_tokens_saved_total", labels, original_tokens - sent_tokens)
+
+    def render(self) -> str:
+        def fmt(labels):
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{fmt(labels)} {value:g}")
+            if self._histograms:
+                lines.append("# TYPE ats_llm_kickoff_seconds histogram")
+            for stage, hist in sorted(self._histograms.items()):
+                for i, bound in enumerate(self.BUCKETS):
+                    lines.append(f'ats_llm_kickoff_seconds_bucket{fmt((("stage", stage), ("le", f"{bound:g}")))} {hist[i]}')
+                lines.append(f'ats_llm_kickoff_seconds_bucket{fmt((("stage", stage), ("le", "+Inf")))} {hist[-1]}')
+                lines.append(f'ats_llm_kickoff_seconds_sum{fmt((("stage", stage),))} {hist[-2]:.3f}')
+                lines.append(f'ats_llm_kickoff_seconds_count{fmt((("stage", stage),))} {hist[-1]}')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+def render_metrics() -> str:
+    return _metrics.render()
+
+
+'''
+Records one kickoff: builds the span, logs it, updates the metrics and adds it to the current run.
+Returns the span dict.
+'''
+def record_kickoff(stage: str, model: str, wall_seconds: float, queue_seconds: float = 0.0,
+                   prompt_tokens: int = 0, completion_tokens: int = 0, cache_hit: bool = False, retries: int = 0) -> dict:
+    span = {
+        "stage": stage,
+        "model": model,
+        "start": round(time.time() - wall_seconds, 3),
+        "wall_seconds": round(wall_seconds, 4),
+        "queue_seconds": round(queue_seconds, 4),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": round(estimate_cost(model, prompt_tokens, completion_tokens), 6),
+        "cache_hit": cache_hit,
+        "retries": retries,
+    }
+    trace = current_trace()
+    if trace is not None:
+        span["run_id"] = trace.id
+        trace.add(span)
+    _metrics.observe(span)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": "llm_call", **span}, ensure_ascii=False))
+    return span
+
+
+'''
+Records what prompt_budget.py did to one piece of prompt text of a stage: its tokens before (original)
+and after compression and the budget cut (sent). Added to the current run's trace and to the
+ats_prompt_tokens_original_total / ats_prompt_tokens_saved_total counters.
+'''
+def record_prompt_budget(stage: str, original_tokens: int, sent_tokens: int):
+    trace = current_trace()
+    if trace is not None:
+        trace.add_prompt_budget(stage, original_tokens, sent_tokens)
+    _metrics.observe_prompt_budget(stage, original_tokens, sent_tokens)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # keep the console quiet
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+'''
+Serves GET /metrics on port in a background thread (once per process).
+Returns the server, or None if port is 0 or already taken (e.g. by another worker process).
+'''
+def start_metrics_server(port: int = config.METRICS_PORT, host: str = "0.0.0.0"):
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError:
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
@@ -4,19 +4,20 @@ Creating utils.py file to:
     2) Helper Code (small task): reading files, converting formats, cleaning text, saving files
 
 '''
-from docx import Document # This lets you create and edit .docx Word files
 from io import BytesIO # Creates a “fake file” in memory (without saving to disk).
 
 '''
 This function takes plain text and converts it into a .docx file, and returns it as bytes.
+(Plain paragraphs, no styling: the app's downloads use file_tools/exporter.py for styled DOCX/PDF files.)
 This is helpful when you want to:
     1) Return a file in a web app (like Streamlit)
     2) Send the file to a user
 '''
 def txt_to_docx_bytes(text: str) -> bytes:
+    from docx import Document # This lets you create and edit .docx Word files (imported on first use: it is slow to load)
     doc = Document() # This creates a new blank Word document
     for line in text.splitlines(): # Splits the text into lines (wherever there is a newline \n). Goes through each line one by one.
-        if line.strip == "": # If the line is empty → add an empty paragraph (blank line)
+        if line.strip() == "": # If the line is empty → add an empty paragraph (blank line)
             doc.add_paragraph("")
         else:
             doc.add_paragraph(line) # If the line has text → add it as a paragraph in the DOCX